@@ -1,38 +1,233 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import tkinter as tk
-from tkinter import ttk, messagebox
-import numpy as np
 import os
+import re
+import sys
+from storage import CSVBackend, JournaledCSV
+from timeline import task_timeline, timeline_figure
 
+# matplotlib and tkinter are imported on the first chart (see _pyplot and EventAnalyzer._show_plot),
+# so adding a guest never pays for them
 
 
-# Set the working directory explicitly
-WORKING_DIR = r"C:\Users\ramak\Desktop\event_planner"
+# Where the CSV files live (EVENT_PRO_DATA_DIR); created when first used
+WORKING_DIR = os.environ.get("EVENT_PRO_DATA_DIR", os.path.join(os.path.expanduser("~"), "event_planner"))
+
+
+def headless():
+    '''True when charts are saved as PNG files instead of shown: EVENT_PRO_HEADLESS=1, or no display'''
+    if "EVENT_PRO_HEADLESS" in os.environ:
+        return os.environ["EVENT_PRO_HEADLESS"] not in ("", "0")
+    if os.name != "posix" or sys.platform == "darwin":
+        return False
+    return not (os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def _pyplot():
+    '''matplotlib.pyplot, imported on first use; with the Agg backend when headless'''
+    import matplotlib
+    if headless():
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+def next_id(filename, count=1):
+    '''Reserve ids for the records in filename; the counter is kept in meta.csv beside it'''
+    folder, name = os.path.split(filename)
+    return CSVBackend(folder or ".").allocate_ids(os.path.splitext(name)[0], count)
+
+
+def record_key(record):
+    '''Columns identifying record in its file (rows saved before ids get one on load, see DataHandler.load_with_ids)'''
+    return {"id": record["id"]}
 
-# Ensure the directory exists (optional if you're certain it does)
-os.makedirs(WORKING_DIR, exist_ok=True)
 
 class DataHandler:
+    '''CSV files kept as a snapshot plus a journal of changes (see storage.JournaledCSV).
+
+    Adding or changing a record appends one line to the journal instead of rewriting
+    the file; loading replays the journal, so nothing acknowledged is lost in a crash.
+    '''
+
+    def __init__(self):
+        self._files = {}
+
+    def _file(self, filename):
+        if filename not in self._files:
+            self._files[filename] = JournaledCSV(filename)
+        return self._files[filename]
+
     def save_to_csv(self, data, filename):
-        '''Append or overwrite records in CSV'''
+        '''Overwrite the CSV with records, atomically'''
         try:
             df = pd.DataFrame(data if isinstance(data, list) else [data])
-            df.to_csv(filename, mode='w', index=False)
+            self._file(filename).replace(df)
+            return f'Data saved to {filename}.'
+        except Exception as e:
+            return f'Error saving data: {e}'
+
+    def append_record(self, record, filename):
+        '''Journal one new record'''
+        try:
+            self._file(filename).append(record)
+            return f'Data saved to {filename}.'
+        except Exception as e:
+            return f'Error saving data: {e}'
+
+    def update_records(self, changes, filename):
+        '''Journal [(match, values)] changes to existing records'''
+        try:
+            self._file(filename).update(changes)
             return f'Data saved to {filename}.'
         except Exception as e:
             return f'Error saving data: {e}'
 
+    def compact(self, filename):
+        '''Fold the journal into the CSV'''
+        try:
+            self._file(filename).compact()
+            return f'Data saved to {filename}.'
+        except Exception as e:
+            return f'Error saving data: {e}'
+
+    def load_with_ids(self, filename):
+        '''load_from_csv, first giving rows saved before ids existed an id (a one-off rewrite of the file).
+
+        Changes are journaled by id, so every row needs one: a key like the email can
+        match more rows on disk than the record changed in memory.
+        '''
+        df = self.load_from_csv(filename)
+        if isinstance(df, pd.DataFrame) and ('id' not in df.columns or pd.to_numeric(df['id'], errors='coerce').isna().any()):
+            try:
+                self._file(filename).backfill_ids()
+            except Exception as e:
+                return f'Error loading data: {e}'
+            df = self.load_from_csv(filename)
+        return df
+
     def load_from_csv(self, filename):
         '''Return pandas DataFrame'''
         try:
-            df = pd.read_csv(filename)
+            csv = self._file(filename)
+            if not os.path.exists(filename) and not csv.has_journal():
+                raise FileNotFoundError(f"No such file: {filename!r}")
+            df = csv.load()
             return df if not df.empty else "No data found."
         except Exception as e:
             return f'Error loading data: {e}'
 
 
+class Record:
+    '''One row of a CLI CSV file; subclasses name their columns in FIELDS.
+
+    Columns live in __slots__ rather than a dict per row, which keeps 10^5+ loaded
+    rows small. Records still read like dicts (record["email"], "role" in record):
+    a missing value is None, and columns the class does not know go in extra.
+    '''
+    __slots__ = ("extra",)
+    FIELDS = ()
+
+    def __init__(self, **values):
+        self.extra = None
+        for field in self.FIELDS:
+            setattr(self, field, None)
+        for key, value in values.items():
+            self[key] = value
+
+    @classmethod
+    def from_frame(cls, df):
+        '''Records for the rows of a loaded CSV (or [] for a load_from_csv message)'''
+        if not isinstance(df, pd.DataFrame):
+            return []
+        columns = list(df.columns)
+        values = df.astype(object).where(df.notna(), None)
+        return [cls(**dict(zip(columns, row))) for row in values.itertuples(index=False, name=None)]
+
+    def __getitem__(self, key):
+        if key in self.FIELDS:
+            return getattr(self, key)
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in self.FIELDS:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self):
+        '''The row as written to the CSV; empty optional columns are left out'''
+        row = {field: getattr(self, field) for field in self.FIELDS if getattr(self, field) is not None}
+        row.update(self.extra or {})
+        return row
+
+
+class Event(Record):
+    FIELDS = ("id", "name", "date", "time", "location", "description")
+    __slots__ = FIELDS
+
+
+class Attendee(Record):
+    FIELDS = ("id", "event_id", "name", "email", "rsvp", "role", "dietary")
+    __slots__ = FIELDS
+
+
+class Task(Record):
+    FIELDS = ("id", "event_id", "task_name", "status", "deadline", "assigned_to", "priority")
+    __slots__ = FIELDS
+
+
+class RecordTable:
+    '''Records in load order plus dict indexes over them.
+
+    unique maps an index name to a key function; the first record with a key wins,
+    as a front-to-back scan would find it. groups maps a column to a bucket of records
+    per value (e.g. every attendee of one event). Indexed columns must not be changed
+    in place.
+    '''
+
+    def __init__(self, records=(), unique=None, groups=()):
+        self.records = []
+        self._keys = unique or {}
+        self._unique = {name: {} for name in self._keys}
+        self._groups = {column: {} for column in groups}
+        for record in records:
+            self.add(record)
+
+    def add(self, record):
+        self.records.append(record)
+        for name, key in self._keys.items():
+            self._unique[name].setdefault(key(record), record)
+        for column, buckets in self._groups.items():
+            buckets.setdefault(record[column], []).append(record)
+        return record
+
+    def find(self, index, key):
+        '''The record with key in the unique index, or None'''
+        return self._unique[index].get(key)
+
+    def group(self, column, value):
+        '''Records whose column equals value, in load order'''
+        return self._groups[column].get(value, [])
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+
 class TaskManager:
     def __init__(self, task_file=os.path.join(WORKING_DIR, "tasks.csv")):
 
@@ -41,9 +236,9 @@ class TaskManager:
         self.tasks = self.load_tasks()
 
     def load_tasks(self):
-        '''Load existing tasks from CSV'''
-        df = self.data_handler.load_from_csv(self.task_file)
-        return df.to_dict('records') if isinstance(df, pd.DataFrame) else []
+        '''Load existing tasks from CSV, indexed by (event_id, task_name) and bucketed per event'''
+        df = self.data_handler.load_with_ids(self.task_file)
+        return RecordTable(Task.from_frame(df), unique={"name": lambda t: (t.event_id, t.task_name)}, groups=("event_id",))
 
     def create_task(self, event_id):
         '''Create a new task for an event'''
@@ -51,12 +246,13 @@ class TaskManager:
         status = input("Enter Status (Not Started/In Progress/Completed/Delayed): ")
         deadline = input("Enter Deadline (YYYY-MM-DD): ")
 
-        task = {
-            "event_id": event_id,
-            "task_name": task_name,
-            "status": status,
-            "deadline": deadline
-        }
+        task = Task(
+            id=next_id(self.task_file),
+            event_id=event_id,
+            task_name=task_name,
+            status=status,
+            deadline=deadline
+        )
 
         # Optional additional fields
         assign_to = input("Assign to (optional): ")
@@ -67,8 +263,8 @@ class TaskManager:
         if priority:
             task["priority"] = priority
 
-        self.tasks.append(task)
-        self.data_handler.save_to_csv(self.tasks, self.task_file)
+        self.tasks.add(task)
+        self.data_handler.append_record(task.to_dict(), self.task_file)
         print(f'Task "{task_name}" created for Event ID {event_id}.')
 
     def update_task_status(self):
@@ -79,21 +275,27 @@ class TaskManager:
         task_name = input("Enter Task Name to update: ")
         new_status = input("Enter New Status (Not Started/In Progress/Completed/Delayed): ")
 
-        found = False
-        for task in self.tasks:
-            if task["event_id"] == event_id and task["task_name"] == task_name:
+        if self.update_task_statuses({(event_id, task_name): new_status}):
+            print(f'Task "{task_name}" updated: {new_status}')
+        else:
+            print("Task not found.")
+
+    def update_task_statuses(self, updates):
+        '''Apply {(event_id, task_name): new_status} with one lookup per task and a single journal write'''
+        changes = []
+        for key, new_status in updates.items():
+            task = self.tasks.find("name", key)
+            if task is not None:
                 task["status"] = new_status
-                self.data_handler.save_to_csv(self.tasks, self.task_file)
-                print(f'Task "{task_name}" updated: {new_status}')
-                found = True
-                break
+                changes.append((record_key(task), {"status": new_status}))
 
-        if not found:
-            print("Task not found.")
+        if changes:
+            self.data_handler.update_records(changes, self.task_file)
+        return len(changes)
 
     def display_tasks(self, event_id):
         '''Display all tasks for an event'''
-        event_tasks = [t for t in self.tasks if t["event_id"] == event_id]
+        event_tasks = self.tasks.group("event_id", event_id)
 
         if event_tasks:
             print(f"\nTasks for Event ID {event_id}:")
@@ -114,33 +316,116 @@ class TaskManager:
         return status_formats.get(status, status)
 
 
+class DataContext:
+    '''CSV files loaded once and kept until they change on disk.
+
+    A file is read on first use; later calls only stat it (and its journal) and read it
+    again if the modification time or size moved. Frames are shared between callers,
+    so filter or copy them rather than editing them in place.
+    '''
+
+    def __init__(self, data_handler=None):
+        self.data_handler = data_handler or DataHandler()
+        self._loaded = {}
+
+    @staticmethod
+    def stamp(filename):
+        '''(mtime, size) of the CSV and of its journal; None for a file that is not there'''
+        stamps = []
+        for path in (filename, filename + ".journal"):
+            try:
+                info = os.stat(path)
+                stamps.append((info.st_mtime_ns, info.st_size))
+            except OSError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def exists(self, filename):
+        return self.stamp(filename) != (None, None)
+
+    def get(self, filename):
+        '''What DataHandler.load_from_csv returns for filename, reading the file only if it changed'''
+        stamp = self.stamp(filename)
+        loaded = self._loaded.get(filename)
+        if loaded is None or loaded[0] != stamp:
+            loaded = (stamp, self.data_handler.load_from_csv(filename))
+            self._loaded[filename] = loaded
+        return loaded[1]
+
+
+def event_report_text(event, attendees, tasks):
+    """Text of the report for one event (a one-row frame) from its attendees and tasks"""
+    report = f"Event Report: {event['name'].values[0]}\n"
+    report += f"Date: {event['date'].values[0]} Time: {event['time'].values[0]}\n"
+    report += f"Location: {event['location'].values[0]}\n\n"
+
+    # Attendee stats
+    total_attendees = len(attendees)
+    report += f"Total Attendees: {total_attendees}\n"
+
+    if not attendees.empty:
+        rsvp_counts = attendees['rsvp'].value_counts()
+        for status, count in rsvp_counts.items():
+            report += f"- {status}: {count} ({count / total_attendees * 100:.1f}%)\n"
+
+    # Task stats
+    report += f"\nTask Status:\n"
+    if not tasks.empty:
+        task_status = tasks['status'].value_counts()
+        total_tasks = len(tasks)
+        for status, count in task_status.items():
+            report += f"- {status}: {count} ({count / total_tasks * 100:.1f}%)\n"
+
+        # Areas for improvement
+        report += "\nAreas for Improvement:\n"
+        if 'Not Started' in task_status or 'Delayed' in task_status:
+            report += "- Some tasks are not started or delayed. Consider better task prioritization.\n"
+
+        # Check if any tasks are close to or past the event date
+        if not tasks.empty and 'deadline' in tasks.columns:
+            deadlines = pd.to_datetime(tasks['deadline'], errors='coerce')
+            event_date = pd.to_datetime(event['date'].values[0], errors='coerce')
+            late_tasks = tasks[deadlines >= event_date]
+            if not late_tasks.empty:
+                report += f"- {len(late_tasks)} tasks are scheduled too close to the event date. Consider earlier planning.\n"
+    else:
+        report += "- No tasks tracked for this event. Consider adding task tracking for better planning.\n"
+    return report
+
+
 class EventAnalyzer:
     def __init__(self,
                  event_file=os.path.join(WORKING_DIR, "events.csv"),
                  attendee_file=os.path.join(WORKING_DIR, "attendees.csv"),
-                 task_file=os.path.join(WORKING_DIR, "tasks.csv")):
+                 task_file=os.path.join(WORKING_DIR, "tasks.csv"),
+                 data=None):
 
         self.data_handler = DataHandler()
         self.event_file = event_file
         self.attendee_file = attendee_file
         self.task_file = task_file
+        # Shared by every chart and report, so clicking through the menu reads each file once
+        self.data = data or DataContext(self.data_handler)
 
-    def load_data(self):
-        """Load all necessary data for analysis"""
-        events_df = self.data_handler.load_from_csv(self.event_file)
-        attendees_df = self.data_handler.load_from_csv(self.attendee_file)
+    def load_events(self):
+        return self.data.get(self.event_file)
 
-        # Check if task file exists and load it
-        if os.path.exists(self.task_file):
-            tasks_df = self.data_handler.load_from_csv(self.task_file)
-        else:
-            tasks_df = pd.DataFrame(columns=['event_id', 'task_name', 'status', 'deadline'])
+    def load_attendees(self):
+        return self.data.get(self.attendee_file)
 
-        return events_df, attendees_df, tasks_df
+    def load_tasks(self):
+        # A missing task file just means no tasks have been tracked yet
+        if not self.data.exists(self.task_file):
+            return pd.DataFrame(columns=['event_id', 'task_name', 'status', 'deadline'])
+        return self.data.get(self.task_file)
+
+    def load_data(self):
+        """Load all necessary data for analysis"""
+        return self.load_events(), self.load_attendees(), self.load_tasks()
 
     def visualize_rsvp_status(self, event_id=None):
         """Visualize RSVP status distribution for one or all events"""
-        _, attendees_df, _ = self.load_data()
+        attendees_df = self.load_attendees()
 
         if isinstance(attendees_df, str):  # Error message or no data
             return "No attendee data available for visualization."
@@ -155,7 +440,7 @@ class EventAnalyzer:
         rsvp_counts = attendees_df['rsvp'].value_counts()
 
         # Create figure and plot
-        fig, ax = plt.subplots(figsize=(8, 6))
+        fig, ax = _pyplot().subplots(figsize=(8, 6))
         rsvp_counts.plot(kind='pie', autopct='%1.1f%%', ax=ax)
         ax.set_title('RSVP Status Distribution')
         ax.set_ylabel('')  # Hide 'None' ylabel
@@ -165,7 +450,7 @@ class EventAnalyzer:
 
     def visualize_attendee_categories(self, event_id, category='role'):
         """Visualize attendee distribution by category (role, dietary preference, etc.)"""
-        _, attendees_df, _ = self.load_data()
+        attendees_df = self.load_attendees()
 
         if isinstance(attendees_df, str):  # Error message or no data
             return "No attendee data available for visualization."
@@ -183,7 +468,7 @@ class EventAnalyzer:
         category_counts = attendees_df[category].value_counts()
 
         # Create figure and plot
-        fig, ax = plt.subplots(figsize=(10, 6))
+        fig, ax = _pyplot().subplots(figsize=(10, 6))
         category_counts.plot(kind='bar', ax=ax)
         ax.set_title(f'Attendees by {category.title()}')
         ax.set_xlabel(category.title())
@@ -194,7 +479,7 @@ class EventAnalyzer:
 
     def visualize_task_status(self, event_id):
         """Visualize task completion status for an event"""
-        _, _, tasks_df = self.load_data()
+        tasks_df = self.load_tasks()
 
         if isinstance(tasks_df, str) or tasks_df.empty:  # Error message or no data
             return "No task data available for visualization."
@@ -208,7 +493,7 @@ class EventAnalyzer:
         status_counts = tasks_df['status'].value_counts()
 
         # Create figure and plot
-        fig, ax = plt.subplots(figsize=(8, 6))
+        fig, ax = _pyplot().subplots(figsize=(8, 6))
         status_counts.plot(kind='pie', autopct='%1.1f%%', ax=ax)
         ax.set_title('Task Status Distribution')
         ax.set_ylabel('')  # Hide 'None' ylabel
@@ -218,7 +503,7 @@ class EventAnalyzer:
 
     def analyze_event_timeline(self, event_id):
         """Analyze event timeline and task deadlines"""
-        events_df, _, tasks_df = self.load_data()
+        events_df, tasks_df = self.load_events(), self.load_tasks()
 
         if isinstance(events_df, str) or isinstance(tasks_df, str):
             return "Required data not available for analysis."
@@ -232,29 +517,10 @@ class EventAnalyzer:
         if tasks.empty:
             return f"No tasks found for event ID {event_id}."
 
-        # Convert deadlines to datetime
-        tasks['deadline'] = pd.to_datetime(tasks['deadline'])
-        event_date = pd.to_datetime(event['date'].values[0])
-
-        # Create figure and plot
-        fig, ax = plt.subplots(figsize=(12, 6))
-
-        # Plot event date as a vertical line
-        ax.axvline(x=event_date, color='r', linestyle='--', label='Event Date')
-
-        # Plot tasks as points
-        for i, task in tasks.iterrows():
-            status_color = 'green' if task['status'] == 'Completed' else 'orange' if task[
-                                                                                         'status'] == 'In Progress' else 'red'
-            ax.scatter(task['deadline'], i, color=status_color, s=100)
-            ax.text(task['deadline'], i, f"  {task['task_name']}", va='center')
-
-        ax.set_title('Event Timeline and Task Deadlines')
-        ax.set_xlabel('Date')
-        ax.set_yticks([])  # Hide y-ticks
-
-        # Format x-axis as dates
-        fig.autofmt_xdate()
+        # Lead time, days left and late flags for every task at once; the figure draws all
+        # bars and markers in one collection each (see timeline.py)
+        event_date = event['date'].values[0]
+        fig = timeline_figure(task_timeline(tasks, event_date), event_date)
 
         self._show_plot(fig)
         return "Event timeline analysis displayed."
@@ -274,42 +540,7 @@ class EventAnalyzer:
         attendees = attendees_df[attendees_df['event_id'] == event_id]
         tasks = tasks_df[tasks_df['event_id'] == event_id]
 
-        # Generate report text
-        report = f"Event Report: {event['name'].values[0]}\n"
-        report += f"Date: {event['date'].values[0]} Time: {event['time'].values[0]}\n"
-        report += f"Location: {event['location'].values[0]}\n\n"
-
-        # Attendee stats
-        total_attendees = len(attendees)
-        report += f"Total Attendees: {total_attendees}\n"
-
-        if not attendees.empty:
-            rsvp_counts = attendees['rsvp'].value_counts()
-            for status, count in rsvp_counts.items():
-                report += f"- {status}: {count} ({count / total_attendees * 100:.1f}%)\n"
-
-        # Task stats
-        report += f"\nTask Status:\n"
-        if not tasks.empty:
-            task_status = tasks['status'].value_counts()
-            total_tasks = len(tasks)
-            for status, count in task_status.items():
-                report += f"- {status}: {count} ({count / total_tasks * 100:.1f}%)\n"
-
-            # Areas for improvement
-            report += "\nAreas for Improvement:\n"
-            if 'Not Started' in task_status or 'Delayed' in task_status:
-                report += "- Some tasks are not started or delayed. Consider better task prioritization.\n"
-
-            # Check if any tasks are close to or past the event date
-            if not tasks.empty and 'deadline' in tasks.columns:
-                tasks['deadline'] = pd.to_datetime(tasks['deadline'])
-                event_date = pd.to_datetime(event['date'].values[0])
-                late_tasks = tasks[tasks['deadline'] >= event_date]
-                if not late_tasks.empty:
-                    report += f"- {len(late_tasks)} tasks are scheduled too close to the event date. Consider earlier planning.\n"
-        else:
-            report += "- No tasks tracked for this event. Consider adding task tracking for better planning.\n"
+        report = event_report_text(event, attendees, tasks)
 
         # Display the report
         self._show_text_report(report, f"Event Report - {event['name'].values[0]}")
@@ -317,7 +548,21 @@ class EventAnalyzer:
         return "Event report generated."
 
     def _show_plot(self, fig):
-        """Display a matplotlib figure in a Tkinter window"""
+        """Display a matplotlib figure in a Tkinter window, or save it as a PNG when headless"""
+        if headless():
+            title = fig.axes[0].get_title() if fig.axes else "chart"
+            folder = os.path.join(WORKING_DIR, "charts")
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, re.sub(r"\W+", "_", title).strip("_").lower() + ".png")
+            fig.savefig(path, bbox_inches="tight")
+            _pyplot().close(fig)
+            print(f"Chart saved to {path}")
+            return path
+
+        import tkinter as tk
+        from tkinter import ttk
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
         root = tk.Tk()
         root.title("Event Analysis Visualization")
         root.geometry("800x600")
@@ -333,7 +578,14 @@ class EventAnalyzer:
         #root.mainloop()
 
     def _show_text_report(self, report_text, title):
-        """Display a text report in a Tkinter window"""
+        """Display a text report in a Tkinter window, or print it when headless"""
+        if headless():
+            print(f"\n{title}\n{report_text}")
+            return
+
+        import tkinter as tk
+        from tkinter import ttk
+
         root = tk.Tk()
         root.title(title)
         root.geometry("700x500")
@@ -359,25 +611,26 @@ class EventAnalyzer:
 class EventManager:
     def __init__(self,
                  event_file=os.path.join(WORKING_DIR, "events.csv"),
-                 attendee_file=os.path.join(WORKING_DIR, "attendees.csv")):
+                 attendee_file=os.path.join(WORKING_DIR, "attendees.csv"),
+                 task_file=os.path.join(WORKING_DIR, "tasks.csv")):
 
         self.data_handler = DataHandler()
         self.event_file = event_file
         self.attendee_file = attendee_file
         self.events = self.load_events()
         self.attendees = self.load_attendees()
-        self.task_manager = TaskManager()
-        self.event_analyzer = EventAnalyzer()
+        self.task_manager = TaskManager(task_file)
+        self.event_analyzer = EventAnalyzer(event_file, attendee_file, task_file)
 
     def load_events(self):
-        '''Load existing events from CSV'''
-        df = self.data_handler.load_from_csv(self.event_file)
-        return df.to_dict('records') if isinstance(df, pd.DataFrame) else []
+        '''Load existing events from CSV, indexed by id'''
+        df = self.data_handler.load_with_ids(self.event_file)
+        return RecordTable(Event.from_frame(df), unique={"id": lambda e: e.id})
 
     def load_attendees(self):
-        '''Load existing attendees from CSV'''
-        df = self.data_handler.load_from_csv(self.attendee_file)
-        return df.to_dict('records') if isinstance(df, pd.DataFrame) else []
+        '''Load existing attendees from CSV, indexed by email and bucketed per event'''
+        df = self.data_handler.load_with_ids(self.attendee_file)
+        return RecordTable(Attendee.from_frame(df), unique={"email": lambda a: a.email}, groups=("event_id",))
 
     def create_event(self):
         '''Get event details from user and create event'''
@@ -387,17 +640,17 @@ class EventManager:
         location = input("Enter Event Location: ")
         description = input("Enter Event Description: ")
 
-        event_id = len(self.events) + 1
-        event = {
-            "id": event_id,
-            "name": name,
-            "date": date,
-            "time": time,
-            "location": location,
-            "description": description
-        }
-        self.events.append(event)
-        self.data_handler.save_to_csv(self.events, self.event_file)
+        event_id = next_id(self.event_file)
+        event = Event(
+            id=event_id,
+            name=name,
+            date=date,
+            time=time,
+            location=location,
+            description=description
+        )
+        self.events.add(event)
+        self.data_handler.append_record(event.to_dict(), self.event_file)
         print(f'Event "{name}" created successfully!')
 
     def add_attendee(self):
@@ -411,12 +664,13 @@ class EventManager:
         role = input("Enter Professional Role (optional): ")
         dietary = input("Enter Dietary Preferences (optional): ")
 
-        attendee = {
-            "event_id": event_id,
-            "name": name,
-            "email": email,
-            "rsvp": rsvp
-        }
+        attendee = Attendee(
+            id=next_id(self.attendee_file),
+            event_id=event_id,
+            name=name,
+            email=email,
+            rsvp=rsvp
+        )
 
         # Add optional fields if provided
         if role:
@@ -424,8 +678,8 @@ class EventManager:
         if dietary:
             attendee["dietary"] = dietary
 
-        self.attendees.append(attendee)
-        self.data_handler.save_to_csv(self.attendees, self.attendee_file)
+        self.attendees.add(attendee)
+        self.data_handler.append_record(attendee.to_dict(), self.attendee_file)
         print(f'Attendee "{name}" added to Event {event_id}.')
 
     def update_rsvp(self):
@@ -433,15 +687,12 @@ class EventManager:
         email = input("Enter Attendee Email: ")
         new_rsvp = input("Enter New RSVP Status (Pending/Confirmed/Declined): ")
 
-        found = False
-        for attendee in self.attendees:
-            if attendee["email"] == email:
-                attendee["rsvp"] = new_rsvp
-                self.data_handler.save_to_csv(self.attendees, self.attendee_file)
-                print(f'RSVP updated for {email}: {new_rsvp}')
-                found = True
-                break
-        if not found:
+        attendee = self.attendees.find("email", email)
+        if attendee is not None:
+            attendee["rsvp"] = new_rsvp
+            self.data_handler.update_records([(record_key(attendee), {"rsvp": new_rsvp})], self.attendee_file)
+            print(f'RSVP updated for {email}: {new_rsvp}')
+        else:
             print("Attendee not found.")
 
     def display_events(self):
@@ -458,7 +709,7 @@ class EventManager:
     def display_attendees(self):
         '''List attendees for an event'''
         event_id = int(input("Enter Event ID: "))
-        attendees = [a for a in self.attendees if a["event_id"] == event_id]
+        attendees = self.attendees.group("event_id", event_id)
         if attendees:
             for att in attendees:
                 print(f'Name: {att["name"]}, Email: {att["email"]}, RSVP: {att["rsvp"]}')
@@ -1,11 +1,22 @@
+import os
 import streamlit as st
 import pandas as pd
+import metrics
 from logic import EventLogic
-import time
+import importer
+import exporter
+from functools import partial
 
 # --- PAGE CONFIG ---
 st.set_page_config(page_title="Event Pro", page_icon="📅", layout="wide")
 
+# --- INSTRUMENTATION ---
+# Every DataHandler/EventLogic/backend call of this render is collected (see metrics.py);
+# the timing panel shows only with EVENT_PRO_ADMIN=1 set on the server (its reset clears every session's totals)
+metrics.configure_logging()
+metrics.METRICS.begin_run()
+ADMIN = os.environ.get("EVENT_PRO_ADMIN") == "1"
+
 # --- CUSTOM CSS ---
 def local_css():
     st.markdown("""
@@ -83,6 +94,14 @@ def local_css():
 local_css()
 logic = EventLogic()
 
+# Rows saved before every record had an id get one, once per server process
+@st.cache_resource
+def backfill_ids():
+    logic.ensure_ids()
+    return True
+
+backfill_ids()
+
 # --- HEADER HELPER ---
 def page_header(title, subtitle):
     st.markdown(f"""
@@ -97,9 +116,9 @@ def page_header(title, subtitle):
 
 # --- EVENT CARD HELPER (WITH TRASH BUTTON) ---
 def render_event_card(event, unique_idx):
-    date_obj = pd.to_datetime(event['date'])
-    day = date_obj.day
-    month = date_obj.strftime("%b")
+    date_obj = event['date']
+    day = date_obj.day if not pd.isna(date_obj) else "--"
+    month = date_obj.strftime("%b") if not pd.isna(date_obj) else "TBD"
     
     with st.container(border=True):
         # Added extra column (c4) for Delete Button
@@ -116,7 +135,7 @@ def render_event_card(event, unique_idx):
             st.markdown(f"<h3 style='color: white; margin: 0 0 5px 0;'>{event['name']}</h3>", unsafe_allow_html=True)
             st.markdown(f"""
                 <div style='color: white; font-size: 14px;'>
-                    📅 {date_obj.year} &nbsp; | &nbsp; ⏰ {event['time']} <br>
+                    📅 {date_obj.year if not pd.isna(date_obj) else "Date TBD"} &nbsp; | &nbsp; ⏰ {event['time']} <br>
                     📍 {event['location']} <br>
                     <span style='color: #A0A0A0; font-size: 13px; font-style: italic;'>{event['description']}</span>
                 </div>
@@ -135,9 +154,26 @@ def render_event_card(event, unique_idx):
             if st.button("🗑️", key=f"del_{event['id']}_{unique_idx}", help="Delete Event"):
                 logic.delete_event(event['id'])
                 st.toast(f"Deleted '{event['name']}'")
-                time.sleep(1)
                 st.rerun()
 
+# --- BULK IMPORT HELPER ---
+def render_import(kind, event_id, columns):
+    with st.expander(f"📥 Import {kind.title()} (CSV / Excel)"):
+        st.caption(f"Columns: {', '.join(columns)}. Rows without an event_id go to the selected event.")
+        upload = st.file_uploader("File", type=["csv", "xlsx"], key=f"import_{kind}")
+        if upload is not None and st.button("Import", key=f"import_{kind}_go"):
+            try:
+                report = importer.import_file(logic, upload, kind, event_id=event_id, filename=upload.name)
+            except ValueError as e:
+                st.error(str(e))
+                return
+            if report['imported']: st.success(f"Imported {report['imported']} rows ({report['result']})")
+            else: st.info(report['result'])
+            if report['skipped']: st.caption(f"Skipped {report['skipped']} duplicates")
+            if report['errors']:
+                st.warning(f"{len(report['errors'])} rows rejected")
+                st.dataframe(pd.DataFrame(report['errors'][:200], columns=['row', 'problem']), hide_index=True)
+
 # --- INITIALIZE STATE ---
 if 'view_event_id' not in st.session_state: st.session_state['view_event_id'] = None
 
@@ -146,7 +182,24 @@ with st.sidebar:
     st.markdown("<h2 style='color: white;'>Event Pro</h2>", unsafe_allow_html=True)
     menu = st.radio("", ["Dashboard", "Attendees", "Task Manager", "Analytics"], label_visibility="collapsed")
     st.divider()
+    with st.expander("⬇️ Export Data"):
+        ex_view = st.selectbox("Data", exporter.VIEWS, format_func=lambda v: "Events + guests + tasks" if v == "joined" else v.title())
+        ex_format = st.radio("Format", list(exporter.FORMATS), horizontal=True)
+        ex_events_df = logic.get_events()
+        ex_names = dict(zip(ex_events_df['id'], ex_events_df['name']))
+        ex_events = st.multiselect("Events (all if empty)", list(ex_names), format_func=lambda x: ex_names[x])
+        ex_columns = st.multiselect("Columns (all if empty)", exporter.JOINED_COLUMNS if ex_view == "joined" else exporter.SHEET_COLUMNS[ex_view])
+        # The file is only built when the button is clicked
+        st.download_button(
+            "Download", partial(exporter.export_bytes, logic.handler, ex_view, ex_format, ex_columns or None, ex_events or None),
+            file_name=f"{ex_view}.{ex_format}", mime=exporter.FORMATS[ex_format], use_container_width=True)
     st.info("💡 Pro Tip: Use Analytics to track RSVP trends.")
+    if logic.handler.queue is not None:
+        sync = logic.handler.queue.status()
+        if sync['last_error']: st.warning(f"⚠️ Sync failing, {sync['pending']} changes kept locally: {sync['last_error']}")
+        elif sync['pending']: st.caption(f"🔄 Syncing {sync['pending']} changes…")
+        else: st.caption("✅ All changes saved")
+    perf_panel = st.container() if ADMIN else None
 
 # --- PAGE 1: DASHBOARD ---
 if menu == "Dashboard":
@@ -170,25 +223,52 @@ if menu == "Dashboard":
                     desc = st.text_area("Description")
                     if st.form_submit_button("Save Event", use_container_width=True):
                         res = logic.add_event(name, date, time_val, loc, desc)
-                        st.success("Event Saved!")
-                        time.sleep(1)
+                        st.toast("Event Saved!")
                         st.session_state['show_create'] = False
                         st.rerun()
 
-        events_df = logic.get_events()
-        if not events_df.empty:
-            events_df['date'] = pd.to_datetime(events_df['date'])
-            events_df = events_df.sort_values(by='date')
-            for idx, (_, event) in enumerate(events_df.iterrows()):
+        # FILTERS + PAGINATION (only the visible page is fetched and rendered)
+        f1, f2, f3 = st.columns([2.5, 3, 1.2])
+        when = f1.radio("Show", ["Upcoming", "Past", "All"], horizontal=True, label_visibility="collapsed")
+        date_range = f2.date_input("Date range", value=(), label_visibility="collapsed")
+        page_size = f3.selectbox("Per page", [10, 25, 50], label_visibility="collapsed")
+        start = date_range[0] if len(date_range) > 0 else None
+        end = date_range[1] if len(date_range) > 1 else None
+
+        filters = (when, start, end, page_size)
+        if st.session_state.get('events_filters') != filters:
+            st.session_state['events_filters'] = filters
+            st.session_state['events_page'] = 1
+        page = st.session_state.get('events_page', 1)
+
+        events_page, total = logic.get_events_page(page, page_size, when.lower(), start, end)
+        pages = max(1, -(-total // page_size))
+        if page > pages:
+            # e.g. the last event of the last page was just deleted
+            page = st.session_state['events_page'] = pages
+            events_page, total = logic.get_events_page(page, page_size, when.lower(), start, end)
+
+        if total:
+            for idx, (_, event) in enumerate(events_page.iterrows()):
                 render_event_card(event, idx)
+
+            p1, p2, p3 = st.columns([1, 4, 1])
+            if p1.button("← Prev", disabled=page <= 1, use_container_width=True):
+                st.session_state['events_page'] = page - 1
+                st.rerun()
+            p2.markdown(f"<div style='text-align: center; color: #A0A0A0;'>Page {page} of {pages} &nbsp;|&nbsp; {total} events</div>", unsafe_allow_html=True)
+            if p3.button("Next →", disabled=page >= pages, use_container_width=True):
+                st.session_state['events_page'] = page + 1
+                st.rerun()
         else:
             st.info("No events found.")
 
     else:
         # DETAIL VIEW
-        events_df = logic.get_events()
+        # The event, its guests and its tasks are fetched side by side
+        bundle = logic.load_bundle(st.session_state['view_event_id'])
         # Check if exists (in case it was deleted)
-        event_row = events_df[events_df['id'] == st.session_state['view_event_id']]
+        event_row = bundle['events']
         
         if not event_row.empty:
             event = event_row.iloc[0]
@@ -199,7 +279,7 @@ if menu == "Dashboard":
             
             with st.container(border=True):
                 c1, c2, c3 = st.columns(3)
-                c1.markdown(f"**📅 Date:** {event['date']}")
+                c1.markdown(f"**📅 Date:** {event['date'].strftime('%Y-%m-%d') if not pd.isna(event['date']) else 'TBD'}")
                 c2.markdown(f"**⏰ Time:** {event['time']}")
                 c3.markdown(f"**📍 Location:** {event['location']}")
                 st.divider()
@@ -208,7 +288,7 @@ if menu == "Dashboard":
             tab_attendees, tab_tasks = st.tabs(["👥 Guest List", "✅ Tasks"])
             
             with tab_attendees:
-                attendees = logic.get_attendees(event['id'])
+                attendees = bundle['attendees']
                 if not attendees.empty:
                     # Table Styling (Dark)
                     styled_df = attendees[['name', 'email', 'rsvp', 'role']].style.set_properties(**{
@@ -221,7 +301,7 @@ if menu == "Dashboard":
                     st.info("No guests registered yet.")
                     
             with tab_tasks:
-                tasks = logic.get_tasks(event['id'])
+                tasks = bundle['tasks']
                 if not tasks.empty:
                     styled_tasks = tasks[['task_name', 'status', 'priority', 'deadline']].style.set_properties(**{
                         'background-color': '#1A1C24',
@@ -240,33 +320,82 @@ if menu == "Dashboard":
 # --- PAGE 2: ANALYTICS ---
 elif menu == "Analytics":
     page_header("Analytics", "Insights")
-    events_df = logic.get_events()
+    # Both tabs need all three sheets; fetch them side by side up front
+    events_df = logic.load_bundle()['events']
     if not events_df.empty:
-        event_names = dict(zip(events_df['id'], events_df['name']))
-        selected_id = st.selectbox("Select Event", event_names.keys(), format_func=lambda x: event_names[x])
-        c1, c2 = st.columns(2)
-        with c1: st.pyplot(logic.get_rsvp_pie_chart(selected_id))
-        with c2: st.pyplot(logic.get_task_status_chart(selected_id))
+        tab_event, tab_portfolio = st.tabs(["📊 Per Event", "🗂️ All Events"])
+
+        with tab_event:
+            event_names = dict(zip(events_df['id'], events_df['name']))
+            selected_id = st.selectbox("Select Event", event_names.keys(), format_func=lambda x: event_names[x])
+            summary = logic.get_event_summary(selected_id)
+            c1, c2 = st.columns(2)
+            rsvp_chart = logic.get_rsvp_pie_chart(selected_id, summary['rsvp_counts'])
+            task_chart = logic.get_task_status_chart(selected_id, summary['task_counts'])
+            with c1:
+                if rsvp_chart: st.image(rsvp_chart, use_container_width=True)
+                else: st.info("No RSVPs yet.")
+            with c2:
+                if task_chart: st.image(task_chart, use_container_width=True)
+                else: st.info("No tasks yet.")
         
-        # BANNER
-        attendees = logic.get_attendees(selected_id)
-        tasks = logic.get_tasks(selected_id)
-        total = len(attendees)
-        confirmed = len(attendees[attendees['rsvp']=='Confirmed']) if not attendees.empty else 0
-        pending = len(tasks[tasks['status']!='Completed']) if not tasks.empty else 0
-        completed = len(tasks[tasks['status']=='Completed']) if not tasks.empty else 0
+            # BANNER
+            total = summary['guests']
+            confirmed = summary['confirmed']
+            pending = summary['pending_tasks']
+            completed = summary['completed']
+            overdue = summary['overdue_tasks']
         
-        st.markdown(f"""
-            <div class="insight-banner">
-                <h2 style="color: white; margin-bottom: 20px;">Quick Insights</h2>
-                <div style="display: flex; justify-content: space-between;">
-                    <div><div style="opacity:0.7; font-size:12px;">GUESTS</div><div style="font-size:24px; font-weight:bold;">{total}</div></div>
-                    <div><div style="opacity:0.7; font-size:12px;">CONFIRMED</div><div style="font-size:24px; font-weight:bold;">{confirmed}</div></div>
-                    <div><div style="opacity:0.7; font-size:12px;">PENDING TASKS</div><div style="font-size:24px; font-weight:bold;">{pending}</div></div>
-                    <div><div style="opacity:0.7; font-size:12px;">COMPLETED</div><div style="font-size:24px; font-weight:bold;">{completed}</div></div>
+            st.markdown(f"""
+                <div class="insight-banner">
+                    <h2 style="color: white; margin-bottom: 20px;">Quick Insights</h2>
+                    <div style="display: flex; justify-content: space-between;">
+                        <div><div style="opacity:0.7; font-size:12px;">GUESTS</div><div style="font-size:24px; font-weight:bold;">{total}</div></div>
+                        <div><div style="opacity:0.7; font-size:12px;">CONFIRMED</div><div style="font-size:24px; font-weight:bold;">{confirmed}</div></div>
+                        <div><div style="opacity:0.7; font-size:12px;">PENDING TASKS</div><div style="font-size:24px; font-weight:bold;">{pending}</div></div>
+                        <div><div style="opacity:0.7; font-size:12px;">COMPLETED</div><div style="font-size:24px; font-weight:bold;">{completed}</div></div>
+                        <div><div style="opacity:0.7; font-size:12px;">OVERDUE</div><div style="font-size:24px; font-weight:bold;">{overdue}</div></div>
+                    </div>
                 </div>
-            </div>
-        """, unsafe_allow_html=True)
+            """, unsafe_allow_html=True)
+
+            # TIMELINE (Gantt): each task's bar runs from its deadline to the event day
+            st.markdown("**Task Timeline**")
+            event_date, timeline = logic.get_timeline(selected_id)
+            timeline_chart = logic.get_timeline_chart(selected_id)
+            if timeline_chart:
+                c1, c2, c3 = st.columns(3)
+                c1.metric("Days to Event", int(timeline['days_to_event'].iloc[0]) if pd.notna(event_date) else "TBD")
+                c2.metric("Due On/After Event", int(timeline['late'].sum()))
+                c3.metric("Overdue", int(timeline['overdue'].sum()))
+                st.image(timeline_chart, use_container_width=True)
+                with st.expander("Task schedule"):
+                    st.dataframe(timeline, use_container_width=True, hide_index=True)
+            else:
+                st.info("No task deadlines yet.")
+
+        with tab_portfolio:
+            portfolio = logic.get_portfolio()
+            per_event = portfolio['per_event']
+            c1, c2, c3, c4 = st.columns(4)
+            c1.metric("Events", len(per_event))
+            c2.metric("Guests", int(per_event['guests'].sum()))
+            c3.metric("Avg. Confirmed", f"{per_event['confirmed_rate'].mean():.0%}")
+            c4.metric("Overdue Tasks", int(per_event['overdue_tasks'].sum()))
+
+            table = per_event[['name', 'date', 'location', 'guests', 'confirmed_rate', 'tasks', 'completion_rate', 'overdue_tasks']]
+            st.dataframe(table, use_container_width=True, hide_index=True, column_config={
+                'confirmed_rate': st.column_config.ProgressColumn("Confirmed", format="percent", min_value=0, max_value=1),
+                'completion_rate': st.column_config.ProgressColumn("Tasks Done", format="percent", min_value=0, max_value=1),
+            })
+
+            c1, c2 = st.columns(2)
+            with c1:
+                st.markdown("**Guests by Location**")
+                st.bar_chart(portfolio['by_location'])
+            with c2:
+                st.markdown("**Guests by Month**")
+                st.bar_chart(portfolio['by_month'])
     else: st.warning("No data.")
 
 # --- PAGE 3: ATTENDEES ---
@@ -299,6 +428,7 @@ elif menu == "Attendees":
                     logic.add_attendee(selected_id, name, email, rsvp, "Guest", "")
                     st.success("Added")
                     st.rerun()
+        render_import("attendees", selected_id, ['name', 'email', 'rsvp', 'role', 'dietary'])
 
 # --- PAGE 4: TASK MANAGER ---
 elif menu == "Task Manager":
@@ -329,3 +459,17 @@ elif menu == "Task Manager":
                     logic.add_task(selected_id, tname, tstat, tdue)
                     st.success("Added")
                     st.rerun()
+        render_import("tasks", selected_id, ['task_name', 'status', 'deadline', 'priority'])
+
+# --- TIMING PANEL (ADMIN) ---
+this_run = metrics.METRICS.end_run()
+if perf_panel is not None:
+    with perf_panel.expander("🛠️ Performance", expanded=False):
+        c1, c2 = st.columns(2)
+        c1.metric("Round trips", metrics.round_trips(this_run))
+        c2.metric("Rows moved", int(this_run['rows'].sum()) if not this_run.empty else 0)
+        st.caption("This render")
+        st.dataframe(this_run[['calls', 'total_ms', 'rows']].round(1), use_container_width=True)
+        st.caption("Since server start")
+        st.dataframe(metrics.METRICS.totals()[['calls', 'mean_ms', 'p95_ms', 'max_ms', 'rows', 'bytes']].round(1), use_container_width=True)
+        if st.button("Reset totals"): metrics.METRICS.reset()
@@ -0,0 +1,298 @@
+"""Benchmarks for the DataHandler / EventLogic hot paths.
+
+Runs against a local stand-in for the Google Sheets connection (optionally with a
+fixed delay per call to mimic network round trips), or against the SQLite and CSV
+backends, on synthetic data of the requested sizes. Results are printed as JSON;
+pass --baseline with an earlier result to fail when an operation got slower.
+
+    python bench.py --sizes 100,10000,1000000 --latency 0.05 --output bench.json
+    python bench.py --sizes 100,10000 --baseline bench.json
+
+--startup times cold imports of the app and CLI modules instead, each in a fresh
+interpreter, and lists any plotting/GUI module an import pulled in.
+"""
+import argparse
+import json
+import os
+import pickle
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+from data_handler import DataHandler, WorksheetCache
+from storage import GSheetsBackend, SQLiteBackend, CSVBackend
+from logic import EventLogic
+
+
+class LocalWorksheet:
+    """The part of a gspread worksheet GSheetsBackend.append uses"""
+
+    def __init__(self, conn, name):
+        self.conn = conn
+        self.name = name
+
+    def row_values(self, row):
+        self.conn._call("row_values")
+        df = self.conn._get(self.name)
+        return list(df.columns) if df is not None else []
+
+    def append_rows(self, values, value_input_option=None):
+        self.conn._call("append_rows")
+        df = self.conn._get(self.name)
+        self.conn._put(self.name, pd.concat([df, pd.DataFrame(values, columns=df.columns)], ignore_index=True))
+
+
+class LocalSheetsConnection:
+    """Stand-in for st.connection("gsheets") that keeps worksheets in memory or in a folder.
+
+    Every call sleeps for latency seconds first, like a round trip to Google, and is
+    counted in calls.
+    """
+
+    def __init__(self, folder=None, latency=0.0):
+        self.folder = folder
+        self.latency = latency
+        self.calls = Counter()
+        self.client = self
+        self._sheets = {}
+        if folder: os.makedirs(folder, exist_ok=True)
+
+    def _call(self, name):
+        self.calls[name] += 1
+        if self.latency: time.sleep(self.latency)
+
+    def _path(self, worksheet):
+        return os.path.join(self.folder, f"{worksheet}.pkl")
+
+    def _get(self, worksheet):
+        if not self.folder: return self._sheets.get(worksheet)
+        if not os.path.exists(self._path(worksheet)): return None
+        with open(self._path(worksheet), "rb") as f:
+            return pickle.load(f)
+
+    def _put(self, worksheet, df):
+        if not self.folder:
+            self._sheets[worksheet] = df
+            return
+        with open(self._path(worksheet), "wb") as f:
+            pickle.dump(df, f)
+
+    def read(self, worksheet=None, ttl=None):
+        self._call("read")
+        df = self._get(worksheet)
+        return df.copy() if df is not None else pd.DataFrame()
+
+    def update(self, worksheet=None, data=None):
+        self._call("update")
+        self._put(worksheet, data.reset_index(drop=True).copy())
+
+    def create(self, worksheet=None, data=None):
+        self._call("create")
+        self._put(worksheet, data.reset_index(drop=True).copy())
+
+    def _select_worksheet(self, worksheet=None):
+        return LocalWorksheet(self, worksheet)
+
+
+def synthetic_data(n_rows, seed=0):
+    """Events plus n_rows attendees and n_rows tasks spread over them (about 100 rows per event)"""
+    rng = np.random.default_rng(seed)
+    n_events = max(1, n_rows // 100)
+    start = date.today() - timedelta(days=365)
+    events = pd.DataFrame({
+        "id": np.arange(1, n_events + 1),
+        "name": [f"Event {i}" for i in range(1, n_events + 1)],
+        "date": [str(start + timedelta(days=int(d))) for d in rng.integers(0, 730, n_events)],
+        "time": "10:00",
+        "location": rng.choice(["Hall", "Room 2", "Online", ""], n_events),
+        "description": "",
+    })
+    event_ids = rng.integers(1, n_events + 1, n_rows)
+    attendees = pd.DataFrame({
+        "id": np.arange(1, n_rows + 1),
+        "event_id": event_ids,
+        "name": [f"Guest {i}" for i in range(1, n_rows + 1)],
+        "email": [f"guest{i}@example.com" for i in range(1, n_rows + 1)],
+        "rsvp": rng.choice(["Confirmed", "Pending", "Declined"], n_rows),
+        "role": rng.choice(["Guest", "Speaker", "Staff"], n_rows),
+        "dietary": rng.choice(["", "Vegetarian", "Vegan"], n_rows),
+    })
+    tasks = pd.DataFrame({
+        "id": np.arange(1, n_rows + 1),
+        "event_id": rng.permutation(event_ids),
+        "task_name": [f"Task {i}" for i in range(1, n_rows + 1)],
+        "status": rng.choice(["Not Started", "In Progress", "Completed", "Delayed"], n_rows),
+        "deadline": [str(start + timedelta(days=int(d))) for d in rng.integers(0, 730, n_rows)],
+        "priority": rng.choice(["High", "Medium", "Low"], n_rows),
+    })
+    return {"events": events, "attendees": attendees, "tasks": tasks}
+
+
+def make_backend(kind, folder, latency=0.0):
+    """(backend, connection or None) for "sheets", "sheets-file", "sqlite" or "csv" """
+    if kind == "sheets":
+        conn = LocalSheetsConnection(latency=latency)
+        return GSheetsBackend(conn=conn), conn
+    if kind == "sheets-file":
+        conn = LocalSheetsConnection(folder=os.path.join(folder, "sheets"), latency=latency)
+        return GSheetsBackend(conn=conn), conn
+    if kind == "sqlite":
+        return SQLiteBackend(os.path.join(folder, "bench.db")), None
+    if kind == "csv":
+        return CSVBackend(os.path.join(folder, "csv")), None
+    raise ValueError(f"Unknown backend {kind!r}")
+
+
+def seed_backend(backend, data):
+    for table, df in data.items():
+        backend.replace(table, df)
+    # Start the id counters after the seeded rows
+    for table in data:
+        backend.allocate_ids(table, 0)
+
+
+# name -> (reads_only, operation(logic, data, i)); i is the repetition number
+OPERATIONS = {
+    "add_attendee": (False, lambda logic, data, i: logic.add_attendee(1, f"New {i}", f"new{i}@example.com", "Pending", "Guest", "")),
+    "add_attendees_100": (False, lambda logic, data, i: logic.add_attendees(pd.DataFrame({
+        "event_id": 1, "name": [f"Bulk {i}-{k}" for k in range(100)], "email": "", "rsvp": "Pending", "role": "Guest", "dietary": ""}))),
+    "add_task": (False, lambda logic, data, i: logic.add_task(1, f"New task {i}", "Not Started", date.today())),
+    "get_events": (True, lambda logic, data, i: logic.get_events()),
+    "get_events_page": (True, lambda logic, data, i: logic.get_events_page(1, 25, "upcoming")),
+    "get_attendees_event": (True, lambda logic, data, i: logic.get_attendees(1)),
+    "get_attendees_all": (True, lambda logic, data, i: logic.get_attendees()),
+    "get_tasks_event": (True, lambda logic, data, i: logic.get_tasks(1)),
+    "load_bundle": (True, lambda logic, data, i: logic.load_bundle(1)),
+    "load_bundle_all": (True, lambda logic, data, i: logic.load_bundle()),
+    "update_rsvp": (False, lambda logic, data, i: logic.update_rsvp(i + 1, "Confirmed")),
+    "update_task_statuses_100": (False, lambda logic, data, i: logic.update_task_statuses_by_id(
+        {task_id: "Completed" for task_id in range(i * 100 + 1, i * 100 + 101)})),
+    "delete_attendee": (False, lambda logic, data, i: logic.delete_attendee(len(data["attendees"]) - i)),
+    "event_summary": (True, lambda logic, data, i: logic.get_event_summary(1)),
+    "event_summaries": (True, lambda logic, data, i: logic.get_event_summaries()),
+    "portfolio": (True, lambda logic, data, i: logic.get_portfolio()),
+}
+
+
+def run_size(kind, n_rows, operations, repeat=3, latency=0.0):
+    """Time each operation on a freshly seeded store of n_rows attendees and tasks"""
+    data = synthetic_data(n_rows)
+    results = []
+    for op in operations:
+        reads_only, fn = OPERATIONS[op]
+        folder = tempfile.mkdtemp(prefix="event-pro-bench-")
+        try:
+            backend, conn = make_backend(kind, folder, latency)
+            seed_backend(backend, data)
+            cache = WorksheetCache(ttl=3600)
+            logic = EventLogic(DataHandler(backend=backend, cache=cache))
+            # Reads are timed cold (empty cache, so they include the backend load) and warm
+            modes = ("cold", "warm") if reads_only else ("cold",)
+            for mode in modes:
+                timings = []
+                if conn is not None: conn.calls.clear()
+                for i in range(repeat):
+                    if mode == "cold": cache.clear()
+                    started = time.perf_counter()
+                    fn(logic, data, i)
+                    timings.append(time.perf_counter() - started)
+                result = {
+                    "op": op, "mode": mode, "rows": n_rows, "repeat": repeat,
+                    "min_s": min(timings), "median_s": statistics.median(timings), "mean_s": statistics.fmean(timings),
+                }
+                if conn is not None: result["calls_per_op"] = {k: v / repeat for k, v in sorted(conn.calls.items())}
+                results.append(result)
+            if isinstance(backend, SQLiteBackend): backend._db.close()
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+    return results
+
+
+# Modules --startup imports, and the heavy ones none of them should load before a chart is drawn
+STARTUP_MODULES = ("Event_Manager", "logic", "data_handler")
+HEAVY_MODULES = ("matplotlib", "tkinter")
+
+
+def startup_times(modules=STARTUP_MODULES, repeat=3):
+    """Import time of each module in a fresh interpreter, and the HEAVY_MODULES it loaded"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    for module in modules:
+        script = (f"import json, sys, time; started = time.perf_counter(); import {module}; "
+                  f"print(json.dumps([time.perf_counter() - started, [m for m in {HEAVY_MODULES!r} if m in sys.modules]]))")
+        timings = []
+        for _ in range(repeat):
+            out = subprocess.run([sys.executable, "-c", script], cwd=here, capture_output=True, text=True, check=True)
+            seconds, heavy = json.loads(out.stdout.strip().splitlines()[-1])
+            timings.append(seconds)
+        results.append({
+            "op": f"import {module}", "mode": "startup", "rows": 0, "repeat": repeat,
+            "min_s": min(timings), "median_s": statistics.median(timings), "mean_s": statistics.fmean(timings),
+            "heavy_modules": heavy,
+        })
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Results whose median is more than threshold times the baseline's for the same op/mode/rows"""
+    before = {(r["op"], r["mode"], r["rows"]): r["median_s"] for r in baseline["results"]}
+    slower = []
+    for r in results:
+        old = before.get((r["op"], r["mode"], r["rows"]))
+        if old and r["median_s"] > old * threshold:
+            slower.append({"op": r["op"], "mode": r["mode"], "rows": r["rows"], "baseline_s": old, "median_s": r["median_s"]})
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Event Pro storage and logic operations")
+    parser.add_argument("--backend", default="sheets", choices=["sheets", "sheets-file", "sqlite", "csv"])
+    parser.add_argument("--sizes", default="100,1000,10000", help="comma separated row counts (up to 1000000)")
+    parser.add_argument("--ops", default=",".join(OPERATIONS), help="comma separated operations to run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every sheets call")
+    parser.add_argument("--output", help="write the JSON here instead of stdout")
+    parser.add_argument("--startup", action="store_true", help="time cold imports instead of the operations")
+    parser.add_argument("--baseline", help="earlier JSON result to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown factor that counts as a regression")
+    args = parser.parse_args(argv)
+
+    operations = [op.strip() for op in args.ops.split(",") if op.strip()]
+    unknown = [op for op in operations if op not in OPERATIONS]
+    if unknown: parser.error(f"unknown operations: {', '.join(unknown)}")
+
+    results = []
+    if args.startup:
+        results.extend(startup_times(repeat=args.repeat))
+    else:
+        for n_rows in (int(s) for s in args.sizes.split(",")):
+            results.extend(run_size(args.backend, n_rows, operations, args.repeat, args.latency))
+    report = {
+        "meta": {
+            "backend": args.backend, "latency_s": args.latency, "repeat": args.repeat,
+            "python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+            "machine": platform.machine(), "timestamp": datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["regressions"] = compare(results, json.load(f), args.threshold)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f: f.write(text + "\n")
+    else:
+        print(text)
+    return 1 if report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+from functools import lru_cache
+from io import BytesIO
+from metrics import timed
+
+# Task status colours, shared by the donut and anything else drawing task states
+STATUS_COLORS = {
+    "Completed": "#00C853",   # Green
+    "In Progress": "#FFA500", # Orange
+    "Not Started": "#9E9E9E", # Grey
+    "Delayed": "#FF4B4B"      # Red
+}
+RSVP_COLORS = ['#00C853', '#FFAB00', '#D50000']
+
+
+@timed("charts.render_png")
+def render_png(fig):
+    """PNG bytes of fig; the figure is cleared afterwards so nothing keeps its artists alive"""
+    buffer = BytesIO()
+    try:
+        fig.savefig(buffer, format="png", transparent=True, bbox_inches="tight", dpi=150)
+    finally:
+        fig.clear()
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=256)
+def donut_chart(labels, values, colors, autopct):
+    """Donut chart as PNG bytes, cached on its inputs.
+
+    Uses Figure directly instead of pyplot, so there is no global figure registry to
+    lock or leak into (and no GUI backend is picked); equal counts always come back
+    from the cache. matplotlib is imported on the first chart, not when the app starts.
+    """
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(5, 2.5))
+    ax = fig.subplots()
+    fig.patch.set_alpha(0.0)
+    ax.patch.set_alpha(0.0)
+
+    wedges, texts, autotexts = ax.pie(
+        values,
+        labels=labels,
+        autopct=autopct,
+        colors=colors,
+        wedgeprops=dict(width=0.4, edgecolor='none'),
+        textprops={'color': "white", 'fontsize': 9}
+    )
+    ax.axis('equal')
+    for text in autotexts: text.set(size=9, weight="bold", color="white")
+    for text in texts: text.set(color="white")
+    return render_png(fig)
+
+
+def rsvp_donut(rsvp_counts):
+    """RSVP donut for a value_counts-style Series; None when there is nothing to draw"""
+    rsvp_counts = rsvp_counts[rsvp_counts > 0]
+    if rsvp_counts.empty: return None
+    colors = tuple(RSVP_COLORS[:len(rsvp_counts)])
+    return donut_chart(tuple(map(str, rsvp_counts.index)), tuple(int(v) for v in rsvp_counts), colors, '%1.1f%%')
+
+
+def task_status_donut(status_counts):
+    """Task status donut coloured by status; None when there is nothing to draw"""
+    status_counts = status_counts[status_counts > 0]
+    if status_counts.empty: return None
+    colors = tuple(STATUS_COLORS.get(s, '#6C63FF') for s in status_counts.index)
+    return donut_chart(tuple(map(str, status_counts.index)), tuple(int(v) for v in status_counts), colors, '%1.0f%%')
@@ -1,46 +1,405 @@
+import contextvars
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import pandas as pd
 import streamlit as st
-from streamlit_gsheets import GSheetsConnection
+from streamlit.runtime.scriptrunner import get_script_run_ctx, add_script_run_ctx
+from metrics import instrumented, instrument_backend
+from schema import SCHEMAS, normalize
+from write_behind import queue_for, apply_op, append_op, update_op, delete_op
+from storage import backend_from_url, match_rows, group_positions, group_key, frame_chunks, ConflictError
 
+class WorksheetCache:
+    """Keeps recently loaded worksheets in memory for a few seconds.
+
+    One instance is shared by every session in the server process, so a page render
+    (and the sessions around it) fetch each worksheet once per TTL. Writes made through
+    DataHandler drop the entry straight away; edits made elsewhere show up after the TTL.
+
+    Each invalidation also bumps the key's generation. A load takes generation(key)
+    before it reads and hands it to put(), which drops the frame if a write has
+    invalidated the key in between, instead of caching pre-write data.
+    """
+
+    def __init__(self, ttl=30, max_entries=32):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._dependents = {}
+        self._generations = {}
+        self._epoch = 0  # bumped by clear()
+        self._lock = threading.Lock()
+
+    def _live_entry(self, key):
+        entry = self._entries.get(key)
+        if entry is None: return None
+        if time.monotonic() - entry[0] > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live_entry(key)
+            return entry[1] if entry is not None else None
+
+    def get_derived(self, key, name, build):
+        """(frame, build(frame)) for a cached frame; build runs at most once per load.
+
+        Used for lookup structures such as the per-event row index, which then live and
+        die with the frame they were built from. None if key is not cached.
+        """
+        with self._lock:
+            entry = self._live_entry(key)
+            if entry is None: return None
+            if name in entry[2]: return entry[1], entry[2][name]
+        value = build(entry[1])
+        with self._lock:
+            entry[2][name] = value
+        return entry[1], value
+
+    def generation(self, *keys):
+        """Token that changes once any of keys is invalidated (or the cache cleared)"""
+        with self._lock:
+            return self._generation(keys)
+
+    def _generation(self, keys):
+        return (self._epoch,) + tuple(self._generations.get(key, 0) for key in keys)
+
+    def put(self, key, df, depends_on=(), generation=None):
+        """Store df; it is also dropped whenever one of the depends_on keys is invalidated.
+
+        With generation (from generation(key, *depends_on) taken before df was read),
+        df is not stored if any of those keys was invalidated since.
+        """
+        if self.ttl <= 0 or self.max_entries <= 0: return
+        with self._lock:
+            if generation is not None and generation != self._generation((key, *depends_on)): return
+            self._entries[key] = (time.monotonic(), df, {})
+            self._entries.move_to_end(key)
+            for dependency in depends_on:
+                self._dependents.setdefault(dependency, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            pending = [key]
+            while pending:
+                current = pending.pop()
+                self._entries.pop(current, None)
+                self._generations[current] = self._generations.get(current, 0) + 1
+                pending.extend(self._dependents.pop(current, ()))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._dependents.clear()
+            self._epoch += 1
+
+
+# Shared across sessions; tune with EVENT_PRO_CACHE_TTL (seconds, 0 disables) and EVENT_PRO_CACHE_SIZE
+SHARED_CACHE = WorksheetCache(
+    ttl=float(os.environ.get("EVENT_PRO_CACHE_TTL", 30)),
+    max_entries=int(os.environ.get("EVENT_PRO_CACHE_SIZE", 32)),
+)
+
+def in_caller_context(fn):
+    """fn wrapped to run in a worker thread as if called here: same metrics run, same Streamlit session"""
+    context = contextvars.copy_context()
+    script_ctx = get_script_run_ctx(suppress_warning=True)
+
+    def run():
+        if script_ctx is not None: add_script_run_ctx(threading.current_thread(), script_ctx)
+        return context.run(fn)
+    return run
+
+
+@instrumented("handler")
 class DataHandler:
-    def __init__(self):
+    def __init__(self, backend=None, cache=None, schemas=SCHEMAS, write_behind=None):
+        self.cache = cache if cache is not None else SHARED_CACHE
+        # Loaded worksheets are coerced to these dtypes once, before they are cached (see schema.py)
+        self.schemas = schemas
+        # Pick the storage engine from EVENT_PRO_STORAGE unless one is passed in (see storage.backend_from_url)
         try:
-            self.conn = st.connection("gsheets", type=GSheetsConnection)
+            self.backend = backend if backend is not None else backend_from_url(os.environ.get("EVENT_PRO_STORAGE", "gsheets"))
+            # Every store call is timed and counted (see metrics.py)
+            instrument_backend(self.backend)
         except Exception as e:
             st.error(f"⚠️ Connection Error: {e}")
+        # Optional write-behind queue (a WriteBehindQueue, or EVENT_PRO_WRITE_BEHIND=<journal folder>):
+        # writes show up in the cache at once and reach the store in background batches
+        folder = os.environ.get("EVENT_PRO_WRITE_BEHIND")
+        if write_behind is None and folder and hasattr(self, "backend"): write_behind = queue_for(self.backend, folder)
+        self.queue = write_behind
+
+    def _cache_key(self, worksheet_name):
+        return (self.backend.name, worksheet_name)
+
+    def _load(self, worksheet_name):
+        raw = self.queue.load(worksheet_name) if self.queue is not None else self.backend.load(worksheet_name)
+        return normalize(raw, worksheet_name, self.schemas)
 
     def load_data(self, worksheet_name):
         try:
-            df = self.conn.read(worksheet=worksheet_name, ttl="0")
-            return df if not df.empty else pd.DataFrame()
+            key = self._cache_key(worksheet_name)
+            df = self.cache.get(key)
+            if df is None:
+                generation = self.cache.generation(key)
+                df = self._load(worksheet_name)
+                self.cache.put(key, df, generation=generation)
+            # Callers clean columns in place, so never hand out the cached frame itself
+            return df.copy() if not df.empty else self._empty(worksheet_name)
+        except Exception as e:
+            return self._empty(worksheet_name)
+
+    def load_versioned(self, worksheet_name):
+        """Fresh copy of a worksheet plus its revision, for edits saved with save_data(..., expected_revision=...)"""
+        try:
+            self._drain()
+            revision = self.backend.revision(worksheet_name)
+            df = self.backend.load(worksheet_name)
+            return (df if not df.empty else pd.DataFrame()), revision
         except Exception as e:
-            return pd.DataFrame()
+            return pd.DataFrame(), None
 
-    def save_data(self, data, worksheet_name):
+    def query_data(self, worksheet_name, **where):
+        """Rows where every given column equals its value, e.g. query_data("tasks", event_id=3)"""
         try:
-            df = pd.DataFrame(data if isinstance(data, list) else [data])
-            self.conn.update(worksheet=worksheet_name, data=df)
+            key = self._cache_key(worksheet_name)
+            df = self.cache.get(key)
+            if df is None and self.backend.indexed_queries and not (self.queue and self.queue.pending(worksheet_name)):
+                return normalize(self.backend.query(worksheet_name, where), worksheet_name, self.schemas)
+            if df is None:
+                df = self.load_data(worksheet_name)
+
+            if len(where) == 1:
+                # Single-key lookups (event_id=...) use a row index built once per cached load;
+                # with the cache off, index the frame just loaded rather than fetching it again
+                (column, value), = where.items()
+                if self.cache.get(key) is not None:
+                    df, groups = self.load_derived(worksheet_name, ("groups", column), lambda frame: group_positions(frame, column))
+                else:
+                    groups = group_positions(df, column)
+                positions = groups.get(group_key(value))
+                return df.iloc[positions].copy() if positions is not None else pd.DataFrame(columns=df.columns)
+            return df[match_rows(df, where)].copy() if not df.empty else self._empty(worksheet_name)
+        except Exception as e:
+            return self._empty(worksheet_name)
+
+    def load_many(self, worksheet_names):
+        """{name: load_data(name)}, fetching the worksheets that are not cached side by side.
+
+        A page that needs three sheets then waits about as long as the slowest read
+        rather than the sum of all three.
+        """
+        return self._side_by_side({ws: partial(self.load_data, ws) for ws in worksheet_names})
+
+    def query_many(self, queries):
+        """{name: query_data(name, **where)} for {name: where}, run side by side like load_many"""
+        return self._side_by_side({ws: partial(self.query_data, ws, **where) for ws, where in queries.items()})
+
+    def _side_by_side(self, reads):
+        # Cached sheets are served in place; only reads that go to the store get a thread
+        remote = [ws for ws in reads if self.cache.get(self._cache_key(ws)) is None]
+        results = {}
+        if len(remote) > 1:
+            with ThreadPoolExecutor(max_workers=len(remote)) as pool:
+                futures = {ws: pool.submit(in_caller_context(reads[ws])) for ws in remote}
+                results = {ws: future.result() for ws, future in futures.items()}
+        return {ws: results[ws] if ws in results else read() for ws, read in reads.items()}
+
+    def iter_data(self, worksheet_name, columns=None, chunksize=10000, **where):
+        """Stream a worksheet in chunks (see StorageBackend.iter_chunks); raises if the store is unreachable.
+
+        A worksheet that is already in the read cache is sliced from memory instead.
+        """
+        df = self.cache.get(self._cache_key(worksheet_name))
+        if df is None: self._drain()
+        if df is not None:
+            yield from frame_chunks(df, columns, where, chunksize)
+        else:
+            yield from self.backend.iter_chunks(worksheet_name, columns, where, chunksize)
+
+    def load_derived(self, worksheet_name, name, build):
+        """(sheet, build(sheet)) where build runs once per load and its result is kept with the cached sheet.
+
+        The sheet returned is the cached frame itself: read from it, never modify it.
+        """
+        key = self._cache_key(worksheet_name)
+        found = self.cache.get_derived(key, name, build)
+        if found is None:
+            generation = self.cache.generation(key)
+            try:
+                df = self._load(worksheet_name)
+            except Exception as e:
+                df = self._empty(worksheet_name)
+            self.cache.put(key, df, generation=generation)
+            found = self.cache.get_derived(key, name, build) or (df, build(df))
+        return found
+
+    def cached_result(self, name, worksheet_names, build):
+        """build() cached like a worksheet and dropped as soon as one of worksheet_names is written.
+
+        For aggregates computed from several sheets; treat the result as read-only.
+        """
+        key = (self.backend.name, name)
+        value = self.cache.get(key)
+        if value is None:
+            depends_on = [self._cache_key(ws) for ws in worksheet_names]
+            generation = self.cache.generation(key, *depends_on)
+            value = build()
+            self.cache.put(key, value, depends_on=depends_on, generation=generation)
+        return value
+
+    def save_data(self, data, worksheet_name, expected_revision=None):
+        """Overwrites the worksheet; with expected_revision, refuses if someone else wrote it since it was loaded"""
+        try:
+            self._drain()
+            df = self._to_frame(data)
+            self.backend.replace(worksheet_name, df, expected_revision)
             return "Saved to Cloud"
+        except ConflictError as e:
+            return f"Conflict: {e}. Reload and try again."
         except Exception as e:
             return f"Error saving: {e}"
+        finally:
+            self._invalidate(worksheet_name)
+
+    def append_rows(self, data, worksheet_name):
+        """Appends rows to the end of a worksheet without rewriting the existing ones"""
+        if self.queue is not None:
+            df = self._to_frame(data)
+            if df.empty: return "Nothing to append"
+            result = self._queued(worksheet_name, append_op(worksheet_name, df))
+            return result if isinstance(result, str) else "Saved (syncing)"
+        try:
+            df = self._to_frame(data)
+            if df.empty: return "Nothing to append"
+            self.backend.append(worksheet_name, df)
+            return "Saved to Cloud"
+        except Exception as e:
+            return f"Error saving: {e}"
+        finally:
+            self._invalidate(worksheet_name)
+
+    def allocate_ids(self, worksheet_name, count=1):
+        """Reserves count new ids for worksheet_name and returns the first; raises if the store is unreachable"""
+        return self.backend.allocate_ids(worksheet_name, count)
+
+    def backfill_ids(self, worksheet_name):
+        """Gives every row of worksheet_name that has no id one"""
+        try:
+            self._drain()
+            filled = self.backend.backfill_ids(worksheet_name)
+            return f"Assigned {filled} ids"
+        except Exception as e:
+            return f"Error assigning ids: {e}"
+        finally:
+            self._invalidate(worksheet_name)
+
+    def update_data(self, worksheet_name, where, changes):
+        """Sets the values in changes on every row matching where"""
+        if self.queue is not None:
+            result = self._queued(worksheet_name, update_op(worksheet_name, list(where), pd.DataFrame([{**where, **changes}])))
+            return result if isinstance(result, str) else ("Updated" if result else "No matching rows")
+        try:
+            updated = self.backend.update(worksheet_name, where, changes)
+            return "Updated" if updated else "No matching rows"
+        except Exception as e:
+            return f"Error updating: {e}"
+        finally:
+            self._invalidate(worksheet_name)
+
+    def update_many(self, worksheet_name, keys, updates):
+        """Applies a batch of updates (rows of key columns + new values) in a single write"""
+        if self.queue is not None:
+            result = self._queued(worksheet_name, update_op(worksheet_name, keys, self._to_frame(updates)))
+            return result if isinstance(result, str) else f"Updated {result} rows"
+        try:
+            updated = self.backend.update_many(worksheet_name, list(keys), self._to_frame(updates))
+            return f"Updated {updated} rows"
+        except Exception as e:
+            return f"Error updating: {e}"
+        finally:
+            self._invalidate(worksheet_name)
 
     def delete_data(self, worksheet_name, column_name, value_to_delete):
-        """Removes rows where column_name matches value_to_delete"""
-        try:
-            df = self.load_data(worksheet_name)
-            if df.empty: return "Sheet is empty"
-            
-            # 1. Normalize the column to standard Integers (removes .0 issues)
-            # Coerce errors turns bad data into NaN, then we fill with 0, then make int, then string
-            df[column_name] = pd.to_numeric(df[column_name], errors='coerce').fillna(0).astype(int).astype(str)
-            
-            # 2. Normalize the value to delete
-            val_str = str(int(value_to_delete))
-            
-            # 3. Filter
-            df = df[df[column_name] != val_str]
-            
-            self.conn.update(worksheet=worksheet_name, data=df)
+        """Removes rows where column_name matches value_to_delete (a single value or a list)"""
+        values = value_to_delete if isinstance(value_to_delete, (list, tuple, set)) else [value_to_delete]
+        if self.queue is not None:
+            result = self._queued(worksheet_name, delete_op(worksheet_name, column_name, values))
+            return result if isinstance(result, str) else "Deleted"
+        try:
+            self.backend.delete(worksheet_name, column_name, list(values))
+            return "Deleted"
+        except Exception as e:
+            return f"Error deleting: {e}"
+        finally:
+            self._invalidate(worksheet_name)
+
+    def delete_many(self, plan):
+        """Deletes from several worksheets at once; plan is {worksheet: (column, values)}"""
+        if self.queue is not None:
+            results = [self._queued(ws, delete_op(ws, col, values)) for ws, (col, values) in plan.items()]
+            return next((r for r in results if isinstance(r, str)), "Deleted")
+        try:
+            self.backend.delete_many({ws: (col, list(values)) for ws, (col, values) in plan.items()})
             return "Deleted"
         except Exception as e:
             return f"Error deleting: {e}"
+        finally:
+            for worksheet_name in plan: self._invalidate(worksheet_name)
+
+    def flush(self):
+        """Send queued writes now (write-behind only)"""
+        try:
+            self._drain()
+            return "Saved to Cloud"
+        except Exception as e:
+            return f"Error saving: {e}"
+
+    def _drain(self):
+        # Writes that bypass the queue (whole-sheet saves, ...) go out after the queued ones
+        if self.queue is not None and self.queue.pending(): self.queue.flush()
+
+    def _queued(self, worksheet_name, op):
+        """Write-behind path of the write methods: queue op and apply it to the cached sheet.
+
+        Returns the number of rows it affects, or an error message. Updates and deletes
+        that match nothing are not queued at all.
+        """
+        try:
+            with self.queue.edit_lock:
+                key = self._cache_key(worksheet_name)
+                current = self.cache.get(key)
+                if current is None: current = self._load(worksheet_name)
+                df, affected = apply_op(current, op)
+                if not affected: return 0
+                self.queue.submit(op)
+                # Drops aggregates built on the old sheet, then caches the edited one
+                self.cache.invalidate(key)
+                self.cache.put(key, normalize(df, worksheet_name, self.schemas))
+            return affected
+        except Exception as e:
+            self._invalidate(worksheet_name)
+            return f"Error saving: {e}"
+
+    def _empty(self, worksheet_name):
+        """No rows, but the worksheet's schema columns so callers can still index them"""
+        return normalize(pd.DataFrame(), worksheet_name, self.schemas)
+
+    def _invalidate(self, worksheet_name):
+        # Runs after failed writes too, since the sheet may have been partly changed
+        if hasattr(self, "backend"): self.cache.invalidate(self._cache_key(worksheet_name))
+
+    @staticmethod
+    def _to_frame(data):
+        if isinstance(data, pd.DataFrame): return data
+        return pd.DataFrame(data if isinstance(data, list) else [data])
@@ -0,0 +1,123 @@
+import argparse
+import io
+import sys
+import pandas as pd
+from data_handler import DataHandler
+
+SHEETS = ("events", "attendees", "tasks")
+VIEWS = SHEETS + ("joined",)
+FORMATS = {"csv": "text/csv", "parquet": "application/octet-stream"}
+
+SHEET_COLUMNS = {
+    "events": ['id', 'name', 'date', 'time', 'location', 'description'],
+    "attendees": ['id', 'event_id', 'name', 'email', 'rsvp', 'role', 'dietary'],
+    "tasks": ['id', 'event_id', 'task_name', 'status', 'deadline', 'priority'],
+}
+# The joined view has one row per attendee or task, carrying its event's details
+EVENT_DETAILS = ['name', 'date', 'time', 'location']
+JOINED_COLUMNS = ['record', 'event_id'] + [f"event_{c}" for c in EVENT_DETAILS] + [
+    'id', 'name', 'email', 'rsvp', 'role', 'dietary', 'task_name', 'status', 'deadline', 'priority']
+# Parquet column types; everything else is written as text
+INT_COLUMNS = {'id', 'event_id'}
+
+
+def iter_view(handler, view, columns=None, event_ids=None, chunksize=10000):
+    """Yield a worksheet (or the joined view) in chunks, keeping only columns and the given events"""
+    if view not in VIEWS: raise ValueError(f"Unknown view {view!r}; pick one of {', '.join(VIEWS)}")
+    where = {}
+    if event_ids: where["id" if view == "events" else "event_id"] = [int(i) for i in event_ids]
+    if view != "joined":
+        yield from handler.iter_data(view, columns=columns, chunksize=chunksize, **where)
+        return
+
+    # Events are the small side of the join, so they are held in memory as the lookup
+    event_where = {'id': where['event_id']} if where else {}
+    parts = list(handler.iter_data("events", columns=['id'] + EVENT_DETAILS, chunksize=chunksize, **event_where))
+    events = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=['id'] + EVENT_DETAILS)
+    events = events.rename(columns={'id': 'event_id', **{c: f"event_{c}" for c in EVENT_DETAILS}})
+    events['event_id'] = pd.to_numeric(events['event_id'], errors='coerce')
+    events = events.drop_duplicates('event_id')
+    for record, sheet in (("attendee", "attendees"), ("task", "tasks")):
+        for chunk in handler.iter_data(sheet, chunksize=chunksize, **where):
+            chunk = chunk.assign(record=record, event_id=pd.to_numeric(chunk['event_id'], errors='coerce'))
+            joined = chunk.merge(events, on='event_id', how='left')
+            yield joined.reindex(columns=columns or JOINED_COLUMNS)
+
+
+def write_csv(chunks, out):
+    """Write chunks to a path or text stream as one CSV; returns rows written"""
+    rows = 0
+    for chunk in chunks:
+        chunk.to_csv(out, mode='w' if rows == 0 and isinstance(out, str) else 'a', header=rows == 0, index=False)
+        rows += len(chunk)
+    return rows
+
+
+def _arrow_frame(chunk):
+    """Chunk with the fixed column types used for Parquet, so every row group shares one schema"""
+    chunk = chunk.copy()
+    for col in chunk.columns:
+        if col in INT_COLUMNS: chunk[col] = pd.to_numeric(chunk[col], errors='coerce').astype("Int64")
+        else: chunk[col] = chunk[col].astype("string")
+    return chunk
+
+
+def write_parquet(chunks, out):
+    """Write chunks to a path or binary stream as one Parquet file (a row group per chunk); returns rows written"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Parquet export needs the pyarrow package (pip install pyarrow).")
+    writer, rows = None, 0
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(_arrow_frame(chunk), preserve_index=False)
+            if writer is None: writer = pq.ParquetWriter(out, table.schema)
+            writer.write_table(table.cast(writer.schema))
+            rows += len(chunk)
+    finally:
+        if writer is not None: writer.close()
+    return rows
+
+
+def export(handler, view, out, fmt="csv", columns=None, event_ids=None, chunksize=10000):
+    """Stream view into out (a path or stream) as csv or parquet; returns rows written"""
+    if fmt not in FORMATS: raise ValueError(f"Unknown format {fmt!r}; pick csv or parquet")
+    chunks = iter_view(handler, view, columns, event_ids, chunksize)
+    return write_csv(chunks, out) if fmt == "csv" else write_parquet(chunks, out)
+
+
+def export_bytes(handler, view, fmt="csv", columns=None, event_ids=None, chunksize=10000):
+    """The export as bytes, for download buttons"""
+    if fmt == "csv":
+        buffer = io.StringIO()
+        export(handler, view, buffer, fmt, columns, event_ids, chunksize)
+        return buffer.getvalue().encode("utf-8")
+    buffer = io.BytesIO()
+    export(handler, view, buffer, fmt, columns, event_ids, chunksize)
+    return buffer.getvalue()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export Event Pro data to CSV or Parquet (storage from EVENT_PRO_STORAGE)")
+    parser.add_argument("view", choices=VIEWS)
+    parser.add_argument("-o", "--output", default="-", help="file to write; '-' writes CSV to stdout")
+    parser.add_argument("-f", "--format", choices=list(FORMATS), help="defaults to the output file's extension")
+    parser.add_argument("-c", "--columns", help="comma separated columns to keep")
+    parser.add_argument("-e", "--event", type=int, action="append", dest="event_ids", help="only this event (repeatable)")
+    parser.add_argument("--chunksize", type=int, default=10000)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("parquet" if args.output.endswith(".parquet") else "csv")
+    columns = [c.strip() for c in args.columns.split(",")] if args.columns else None
+    out = args.output
+    if out == "-":
+        if fmt != "csv": parser.error("Parquet needs an output file")
+        out = sys.stdout
+    rows = export(DataHandler(), args.view, out, fmt, columns, args.event_ids, args.chunksize)
+    print(f"Exported {rows} rows", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import pandas as pd
+
+# What each import kind accepts: required columns, defaults, allowed values and
+# the other header spellings seen in registration exports
+ATTENDEE_SPEC = {
+    "columns": ['event_id', 'name', 'email', 'rsvp', 'role', 'dietary'],
+    "required": ['name'],
+    "defaults": {'email': "", 'rsvp': "Pending", 'role': "Guest", 'dietary': ""},
+    "choices": {'rsvp': ["Confirmed", "Pending", "Declined"]},
+    "aliases": {'full name': 'name', 'guest': 'name', 'attendee': 'name', 'e-mail': 'email', 'email address': 'email',
+                'status': 'rsvp', 'rsvp status': 'rsvp', 'dietary preferences': 'dietary', 'diet': 'dietary'},
+}
+TASK_SPEC = {
+    "columns": ['event_id', 'task_name', 'status', 'deadline', 'priority'],
+    "required": ['task_name'],
+    "defaults": {'status': "Not Started", 'deadline': "", 'priority': "Medium"},
+    "choices": {'status': ["Not Started", "In Progress", "Completed", "Delayed"], 'priority': ["High", "Medium", "Low"]},
+    "aliases": {'task': 'task_name', 'task name': 'task_name', 'due': 'deadline', 'due date': 'deadline'},
+}
+SPECS = {"attendees": ATTENDEE_SPEC, "tasks": TASK_SPEC}
+EVENT_ALIASES = {'event id': 'event_id', 'event': 'event_id'}
+
+
+def read_chunks(file, filename=None, chunksize=1000):
+    """Yield the rows of an uploaded CSV/XLSX file in DataFrames of at most chunksize rows"""
+    filename = filename or getattr(file, "name", "") or ""
+    if filename.lower().endswith((".xlsx", ".xls")):
+        try:
+            df = pd.read_excel(file, dtype=str)
+        except ImportError:
+            raise ValueError("Reading Excel files needs the openpyxl package (pip install openpyxl).")
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+    else:
+        yield from pd.read_csv(file, dtype=str, chunksize=chunksize, skipinitialspace=True)
+
+
+def normalize_chunk(chunk, kind, event_id=None, first_row=2, event_ids=None):
+    """Clean one chunk: map headers, fill defaults, canonicalise choices, drop bad rows.
+
+    Returns (clean rows, [(row number in the file, problem)]). first_row is the file row
+    number of the chunk's first record (row 1 is the header). With event_ids, rows for
+    any other event are rejected too.
+    """
+    spec = SPECS[kind]
+    chunk = chunk.rename(columns=lambda c: str(c).strip().lower()).rename(columns={**EVENT_ALIASES, **spec["aliases"]})
+    chunk = chunk.loc[:, ~chunk.columns.duplicated()]
+    rows = pd.DataFrame(index=chunk.index)
+    for col in spec["columns"]:
+        values = chunk[col] if col in chunk.columns else pd.Series(pd.NA, index=chunk.index, dtype=object)
+        rows[col] = values.astype(object).where(values.notna(), None).map(lambda v: v.strip() if isinstance(v, str) else v)
+    row_numbers = pd.Series(range(first_row, first_row + len(chunk)), index=chunk.index)
+    problems = pd.Series("", index=chunk.index)
+
+    # The selected event is the fallback for files without an event_id column
+    if event_id is not None: rows['event_id'] = rows['event_id'].fillna(event_id)
+    ids = pd.to_numeric(rows['event_id'], errors='coerce')
+    problems[ids.isna() | (ids % 1 != 0)] = "missing or invalid event_id"
+    if event_ids is not None: problems[~ids.isin(event_ids) & (problems == "")] = "unknown event_id"
+    rows['event_id'] = ids
+
+    for col in spec["required"]:
+        blank = rows[col].isna() | (rows[col].astype(str) == "")
+        problems[blank & (problems == "")] = f"missing {col}"
+
+    for col, default in spec["defaults"].items():
+        rows[col] = rows[col].where(rows[col].notna() & (rows[col].astype(str) != ""), default)
+
+    # Blanks already hold the default; anything else must be one of the allowed values
+    for col, allowed in spec["choices"].items():
+        lookup = {a.lower(): a for a in allowed}
+        rows[col] = rows[col].astype(str).str.lower().map(lookup)
+        problems[rows[col].isna() & (problems == "")] = f"invalid {col}"
+
+    if kind == "attendees":
+        bad_email = (rows['email'] != "") & ~rows['email'].astype(str).str.contains("@", regex=False)
+        problems[bad_email & (problems == "")] = "invalid email"
+    if kind == "tasks":
+        dates = pd.to_datetime(rows['deadline'].replace("", None), errors='coerce', format='mixed')
+        bad_date = dates.isna() & (rows['deadline'] != "")
+        problems[bad_date & (problems == "")] = "invalid deadline"
+        rows['deadline'] = dates.dt.strftime("%Y-%m-%d").fillna("")
+
+    ok = problems == ""
+    errors = list(zip(row_numbers[~ok].tolist(), problems[~ok].tolist()))
+    rows = rows[ok].copy()
+    rows['event_id'] = rows['event_id'].astype(int)
+    return rows, errors
+
+
+def import_file(logic, file, kind, event_id=None, filename=None, chunksize=1000):
+    """Validate a whole CSV/XLSX file chunk by chunk, then save the good rows in one write.
+
+    Rows for events that do not exist are reported as errors. Attendees already
+    registered for an event (same email) and repeats inside the file are skipped.
+    Returns {'imported', 'skipped', 'errors', 'result'}.
+    """
+    clean, errors, next_row = [], [], 2
+    event_ids = set(pd.to_numeric(logic.get_events()['id'], errors='coerce').dropna().astype(int))
+    for chunk in read_chunks(file, filename, chunksize):
+        rows, problems = normalize_chunk(chunk, kind, event_id, first_row=next_row, event_ids=event_ids)
+        next_row += len(chunk)
+        clean.append(rows)
+        errors.extend(problems)
+
+    rows = pd.concat(clean, ignore_index=True) if clean else pd.DataFrame(columns=SPECS[kind]["columns"])
+    before = len(rows)
+    if kind == "attendees" and not rows.empty:
+        has_email = rows['email'] != ""
+        rows = rows[~(has_email & rows.duplicated(subset=['event_id', 'email']))]
+        known = set()
+        for eid in rows['event_id'].unique():
+            existing = logic.get_attendees(int(eid))
+            if not existing.empty: known.update((int(eid), e) for e in existing['email'].dropna().astype(str))
+        if known:
+            keys = pd.Series(list(zip(rows['event_id'], rows['email'])), index=rows.index)
+            rows = rows[~keys.isin(known) | (rows['email'] == "")]
+
+    if rows.empty:
+        result = "Nothing to import"
+    elif kind == "attendees":
+        result = logic.add_attendees(rows)
+    else:
+        result = logic.add_tasks(rows)
+    return {'imported': len(rows), 'skipped': before - len(rows), 'errors': errors, 'result': result}
@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+import threading
+
+
+def _plain(value):
+    """JSON fallback for numpy scalars, timestamps and the like"""
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+def atomic_write(path, write):
+    """Replace path with what write(file) produces; readers see the old file or the new one, never half of it"""
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp): os.remove(tmp)
+        raise
+
+
+class Journal:
+    """Append-only log of mutations, one JSON object per line.
+
+    Each append is flushed and fsynced before it returns, so a write that was
+    acknowledged survives a crash. A line cut short by a crash is ignored on read.
+    """
+
+    def __init__(self, path, fsync=True):
+        self.path = path
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+
+    def append(self, record):
+        self.extend([record])
+
+    def extend(self, records):
+        if not records: return
+        lines = "".join(json.dumps(r, default=_plain) + "\n" for r in records)
+        with self._lock, open(self.path, "a", encoding="utf-8", newline="") as f:
+            f.write(lines)
+            f.flush()
+            if self.fsync: os.fsync(f.fileno())
+
+    def records(self):
+        """Every complete record, oldest first"""
+        if not os.path.exists(self.path): return []
+        out = []
+        with self._lock, open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"): break  # torn final write
+                try:
+                    out.append(json.loads(line))
+                except ValueError:
+                    break
+        return out
+
+    def size(self):
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def rewrite(self, records):
+        """Atomically replace the journal with records (e.g. the ones still pending)"""
+        with self._lock:
+            atomic_write(self.path, lambda f: f.write("".join(json.dumps(r, default=_plain) + "\n" for r in records)))
+
+    def clear(self):
+        self.rewrite([])
@@ -1,153 +1,274 @@
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 from data_handler import DataHandler
+from charts import rsvp_donut, task_status_donut, render_png
+from timeline import task_timeline, timeline_figure
+from metrics import instrumented
 
+@instrumented("logic")
 class EventLogic:
-    def __init__(self):
-        self.handler = DataHandler()
+    def __init__(self, handler=None):
+        self.handler = handler if handler is not None else DataHandler()
         self.sheet_events = "events"
         self.sheet_tasks = "tasks"
         self.sheet_attendees = "attendees"
 
+    def ensure_ids(self):
+        """Gives rows written before ids existed (attendees, tasks, old events) their own id"""
+        for sheet in (self.sheet_events, self.sheet_attendees, self.sheet_tasks):
+            self.handler.backfill_ids(sheet)
+
+    def _new_id(self, sheet, count=1):
+        try:
+            return self.handler.allocate_ids(sheet, count)
+        except Exception as e:
+            return None
+
     # ================= EVENTS =================
+    # Sheets arrive typed by the schema layer (schema.py): int32 ids, datetime64 dates, categorical statuses
     def get_events(self):
-        df = self.handler.load_data(self.sheet_events)
-        required_cols = ['id', 'name', 'date', 'time', 'location', 'description']
-        
-        if df.empty: return pd.DataFrame(columns=required_cols)
-        
-        for col in required_cols:
-            if col not in df.columns: df[col] = ""
-        
-        if 'id' in df.columns:
-             df['id'] = pd.to_numeric(df['id'], errors='coerce').fillna(0).astype(int)
-        return df
+        return self.handler.load_data(self.sheet_events)
+
+    def load_bundle(self, event_id=None):
+        """{'events', 'attendees', 'tasks'} for one event (or every event), read from the store side by side"""
+        sheets = (self.sheet_events, self.sheet_attendees, self.sheet_tasks)
+        if not event_id:
+            frames = self.handler.load_many(sheets)
+        else:
+            event_id = int(event_id)
+            frames = self.handler.query_many({self.sheet_events: {"id": event_id},
+                                              self.sheet_attendees: {"event_id": event_id},
+                                              self.sheet_tasks: {"event_id": event_id}})
+        return {"events": frames[self.sheet_events], "attendees": frames[self.sheet_attendees], "tasks": frames[self.sheet_tasks]}
+
+    def get_events_page(self, page=1, page_size=10, when="all", start=None, end=None):
+        """One page of events in date order and the number of events matching the filters.
+
+        when is "upcoming" (today on), "past" (newest first) or "all". The sheet's date
+        index is built once per load, so picking a page is a binary search plus a slice;
+        only the rows on the page are copied and converted.
+        """
+        df, (dates, order) = self.handler.load_derived(self.sheet_events, "date_index", self._date_index)
+        lo, hi = 0, len(dates)
+        today = np.datetime64(pd.Timestamp.today().normalize())
+        if when == "upcoming": lo = max(lo, np.searchsorted(dates, today, 'left'))
+        if when == "past": hi = min(hi, np.searchsorted(dates, today, 'left'))
+        if start is not None: lo = max(lo, np.searchsorted(dates, np.datetime64(pd.Timestamp(start)), 'left'))
+        if end is not None: hi = min(hi, np.searchsorted(dates, np.datetime64(pd.Timestamp(end)), 'right'))
+
+        # Undated events only show up in the unfiltered "all" view, after the dated ones
+        if when == "all" and start is None and end is None: hi = len(order)
+        window = order[lo:hi] if hi > lo else order[:0]
+        if when == "past": window = window[::-1]
+
+        first = (max(int(page), 1) - 1) * page_size
+        return df.iloc[window[first:first + page_size]].copy(), len(window)
+
+    @staticmethod
+    def _date_index(df):
+        """(sorted valid dates, row positions ordered by date with undated rows last)"""
+        if df.empty or 'date' not in df.columns: return np.array([], dtype='datetime64[ns]'), np.array([], dtype=int)
+        dates = df['date'].values.astype('datetime64[ns]')
+        order = np.argsort(dates, kind='stable')
+        valid = int((~np.isnat(dates)).sum())
+        return dates[order[:valid]], order
 
     def add_event(self, name, date, time, location, description):
-        events_df = self.get_events()
-        events = events_df.to_dict('records')
-        new_id = 1 if not events else max([int(e['id']) for e in events]) + 1
+        new_id = self._new_id(self.sheet_events)
+        if new_id is None: return "Error saving: could not reserve an id"
         new_event = {"id": new_id, "name": name, "date": str(date), "time": str(time), "location": location, "description": description}
-        events.append(new_event)
-        return self.handler.save_data(events, self.sheet_events)
+        return self.handler.append_rows([new_event], self.sheet_events)
 
     def delete_event(self, event_id):
-        res = self.handler.delete_data(self.sheet_events, "id", event_id)
-        self.handler.delete_data(self.sheet_attendees, "event_id", event_id)
-        self.handler.delete_data(self.sheet_tasks, "event_id", event_id)
-        return res
+        return self.delete_events([event_id])
+
+    def delete_events(self, event_ids):
+        """Deletes events with their attendees and tasks; all three sheets are rewritten together"""
+        ids = [int(i) for i in event_ids]
+        if not ids: return "Nothing to delete"
+        return self.handler.delete_many({
+            self.sheet_events: ("id", ids),
+            self.sheet_attendees: ("event_id", ids),
+            self.sheet_tasks: ("event_id", ids),
+        })
 
     # ================= ATTENDEES =================
     def get_attendees(self, event_id=None):
-        df = self.handler.load_data(self.sheet_attendees)
-        cols = ['event_id', 'name', 'email', 'rsvp', 'role', 'dietary']
-        if df.empty: return pd.DataFrame(columns=cols)
-        
-        if 'event_id' in df.columns:
-             df['event_id'] = pd.to_numeric(df['event_id'], errors='coerce').fillna(0).astype(int)
+        # Per-event lookups go through the backend so indexed engines skip the full scan
+        if event_id: df = self.handler.query_data(self.sheet_attendees, event_id=int(event_id))
+        else: df = self.handler.load_data(self.sheet_attendees)
         if event_id: return df[df['event_id'] == int(event_id)]
         return df
 
     def add_attendee(self, event_id, name, email, rsvp, role, dietary):
-        df = self.handler.load_data(self.sheet_attendees)
-        attendees = df.to_dict('records') if not df.empty else []
-        new_att = {"event_id": int(event_id), "name": name, "email": email, "rsvp": rsvp, "role": role, "dietary": dietary}
-        attendees.append(new_att)
-        return self.handler.save_data(attendees, self.sheet_attendees)
+        new_id = self._new_id(self.sheet_attendees)
+        if new_id is None: return "Error saving: could not reserve an id"
+        new_att = {"id": new_id, "event_id": int(event_id), "name": name, "email": email, "rsvp": rsvp, "role": role, "dietary": dietary}
+        return self.handler.append_rows([new_att], self.sheet_attendees)
+
+    def add_attendees(self, rows):
+        """Adds many attendees in one write; rows holds event_id, name, email, rsvp, role, dietary"""
+        return self._add_many(rows, self.sheet_attendees)
+
+    def update_rsvp(self, attendee_id, rsvp):
+        return self.handler.update_data(self.sheet_attendees, {"id": int(attendee_id)}, {"rsvp": rsvp})
+
+    def delete_attendee(self, attendee_id):
+        return self.handler.delete_data(self.sheet_attendees, "id", attendee_id)
 
     # ================= TASKS =================
     def get_tasks(self, event_id=None):
-        df = self.handler.load_data(self.sheet_tasks)
-        cols = ['event_id', 'task_name', 'status', 'deadline', 'priority']
-        if df.empty: return pd.DataFrame(columns=cols)
-        
-        if 'event_id' in df.columns:
-             df['event_id'] = pd.to_numeric(df['event_id'], errors='coerce').fillna(0).astype(int)
+        # Per-event lookups go through the backend so indexed engines skip the full scan
+        if event_id: df = self.handler.query_data(self.sheet_tasks, event_id=int(event_id))
+        else: df = self.handler.load_data(self.sheet_tasks)
         if event_id: return df[df['event_id'] == int(event_id)]
         return df
 
     def add_task(self, event_id, task_name, status, deadline, priority="Medium"):
-        df = self.handler.load_data(self.sheet_tasks)
-        tasks = df.to_dict('records') if not df.empty else []
-        new_task = {"event_id": int(event_id), "task_name": task_name, "status": status, "deadline": str(deadline), "priority": priority}
-        tasks.append(new_task)
-        return self.handler.save_data(tasks, self.sheet_tasks)
+        new_id = self._new_id(self.sheet_tasks)
+        if new_id is None: return "Error saving: could not reserve an id"
+        new_task = {"id": new_id, "event_id": int(event_id), "task_name": task_name, "status": status, "deadline": str(deadline), "priority": priority}
+        return self.handler.append_rows([new_task], self.sheet_tasks)
+
+    def add_tasks(self, rows):
+        """Adds many tasks in one write; rows holds event_id, task_name, status, deadline, priority"""
+        return self._add_many(rows, self.sheet_tasks)
+
+    def _add_many(self, rows, sheet):
+        if rows.empty: return "Nothing to append"
+        # One block of ids for the whole batch, then a single append
+        start = self._new_id(sheet, len(rows))
+        if start is None: return "Error saving: could not reserve an id"
+        rows = rows.assign(id=range(start, start + len(rows)), event_id=rows['event_id'].astype(int))
+        return self.handler.append_rows(rows[['id'] + [c for c in rows.columns if c != 'id']], sheet)
 
     def update_task_status(self, event_id, task_name, new_status):
-        df = self.handler.load_data(self.sheet_tasks)
-        if df.empty: return "No tasks found."
-        
-        if 'event_id' in df.columns:
-            df['event_id'] = pd.to_numeric(df['event_id'], errors='coerce').fillna(0).astype(int)
-        
-        updated = False
-        for index, row in df.iterrows():
-            if row['event_id'] == int(event_id) and row['task_name'] == task_name:
-                df.at[index, 'status'] = new_status
-                updated = True
-        
-        if updated: return self.handler.save_data(df, self.sheet_tasks)
-        return "Task not found."
+        res = self.update_task_statuses([(event_id, task_name, new_status)])
+        return "Task not found." if res == "Updated 0 rows" else res
+
+    def update_task_statuses(self, updates):
+        """Sets many task statuses in one write; updates is a list of (event_id, task_name, new_status)"""
+        if not updates: return "No tasks found."
+        changes = pd.DataFrame(updates, columns=['event_id', 'task_name', 'status'])
+        changes['event_id'] = changes['event_id'].astype(int)
+        return self.handler.update_many(self.sheet_tasks, ['event_id', 'task_name'], changes)
+
+    def update_task_statuses_by_id(self, updates):
+        """Same as update_task_statuses but keyed on task id: {task_id: new_status}"""
+        if not updates: return "No tasks found."
+        changes = pd.DataFrame({'id': [int(i) for i in updates], 'status': list(updates.values())})
+        return self.handler.update_many(self.sheet_tasks, ['id'], changes)
+
+    def delete_task(self, task_id):
+        return self.handler.delete_data(self.sheet_tasks, "id", task_id)
+
+    # ================= SUMMARY =================
+    def _summarize(self, attendees, tasks):
+        """Per-event totals plus RSVP and task-status counts; one groupby pass over each frame"""
+        rsvp = pd.crosstab(attendees['event_id'], self._labels(attendees['rsvp'])) if not attendees.empty else pd.DataFrame()
+        status = pd.crosstab(tasks['event_id'], self._labels(tasks['status'])) if not tasks.empty else pd.DataFrame()
+
+        totals = pd.DataFrame(index=rsvp.index.union(status.index))
+        totals['guests'] = rsvp.sum(axis=1)
+        totals['confirmed'] = rsvp['Confirmed'] if 'Confirmed' in rsvp else 0
+        totals['tasks'] = status.sum(axis=1)
+        totals['completed'] = status['Completed'] if 'Completed' in status else 0
+        totals['pending_tasks'] = totals['tasks'] - totals['completed']
+
+        # Overdue = deadline already passed and not done yet
+        if not tasks.empty:
+            late = (tasks['deadline'] < pd.Timestamp.today().normalize()) & (tasks['status'] != 'Completed')
+            totals['overdue_tasks'] = late.groupby(tasks['event_id']).sum()
+        else:
+            totals['overdue_tasks'] = 0
+
+        totals = totals.fillna(0).astype(int)
+        totals.index.name = 'event_id'
+        return totals, rsvp, status
+
+    @staticmethod
+    def _labels(values):
+        """Categorical column with missing values labelled "Unknown" """
+        if not values.isna().any(): return values
+        if "Unknown" not in values.cat.categories: values = values.cat.add_categories(["Unknown"])
+        return values.fillna("Unknown")
+
+    def get_event_summary(self, event_id):
+        """Everything the Analytics page shows for one event, from a single load of each sheet"""
+        bundle = self.load_bundle(event_id)
+        attendees, tasks = bundle["attendees"], bundle["tasks"]
+        totals, rsvp, status = self._summarize(attendees, tasks)
+
+        summary = {'guests': 0, 'confirmed': 0, 'tasks': 0, 'completed': 0, 'pending_tasks': 0, 'overdue_tasks': 0}
+        if int(event_id) in totals.index: summary.update(totals.loc[int(event_id)].to_dict())
+        summary['rsvp_counts'] = self._counts(rsvp, event_id)
+        summary['task_counts'] = self._counts(status, event_id)
+        return summary
+
+    def get_event_summaries(self):
+        """Totals, RSVP counts (rsvp_*) and task-status counts (status_*) for every event, one row each"""
+        totals, rsvp, status = self._summarize(self.get_attendees(), self.get_tasks())
+        return totals.join(rsvp.add_prefix('rsvp_')).join(status.add_prefix('status_')).fillna(0).astype(int)
+
+    # ================= PORTFOLIO =================
+    def get_portfolio(self):
+        """Cross-event analytics, cached until any of the three sheets is written.
+
+        Returns {'per_event': one row per event with confirmed/completion rates and overdue tasks,
+                 'by_location': guests per location, 'by_month': guests per event month}.
+        """
+        return self.handler.cached_result("portfolio", [self.sheet_events, self.sheet_attendees, self.sheet_tasks], self._build_portfolio)
+
+    def _build_portfolio(self):
+        events = self.get_events()[['id', 'name', 'date', 'location']]
+        totals = self.get_event_summaries()[['guests', 'confirmed', 'tasks', 'completed', 'overdue_tasks']]
+
+        per_event = events.merge(totals, left_on='id', right_index=True, how='left')
+        per_event[totals.columns] = per_event[totals.columns].fillna(0).astype(int)
+        per_event['confirmed_rate'] = (per_event['confirmed'] / per_event['guests'].where(per_event['guests'] > 0)).fillna(0.0)
+        per_event['completion_rate'] = (per_event['completed'] / per_event['tasks'].where(per_event['tasks'] > 0)).fillna(0.0)
+        per_event['month'] = per_event['date'].dt.strftime('%Y-%m')
+
+        counts = ['guests', 'confirmed']
+        by_location = per_event.groupby(per_event['location'].replace("", "Unknown").fillna("Unknown"))[counts].sum()
+        by_month = per_event.dropna(subset=['month']).groupby('month')[counts].sum().sort_index()
+        return {'per_event': per_event, 'by_location': by_location, 'by_month': by_month}
+
+    @staticmethod
+    def _counts(table, event_id):
+        if table.empty or int(event_id) not in table.index: return pd.Series(dtype=int)
+        counts = table.loc[int(event_id)]
+        return counts[counts > 0].sort_values(ascending=False)
 
     # ================= ANALYTICS (MATCHING DONUTS) =================
-    def get_rsvp_pie_chart(self, event_id):
-        attendees = self.get_attendees(event_id)
-        if attendees.empty: return None
-        
-        rsvp_counts = attendees['rsvp'].value_counts()
-        
-        fig, ax = plt.subplots(figsize=(5, 2.5))
-        fig.patch.set_alpha(0.0)
-        ax.patch.set_alpha(0.0)
-        
-        colors = ['#00C853', '#FFAB00', '#D50000']
-        
-        wedges, texts, autotexts = ax.pie(
-            rsvp_counts, 
-            labels=rsvp_counts.index, 
-            autopct='%1.1f%%', 
-            colors=colors[:len(rsvp_counts)],
-            wedgeprops=dict(width=0.4, edgecolor='none'),
-            textprops={'color': "white", 'fontsize': 9}
-        )
-        ax.axis('equal')
-        plt.setp(autotexts, size=9, weight="bold", color="white")
-        plt.setp(texts, color="white")
-        return fig
-
-    def get_task_status_chart(self, event_id):
-        tasks = self.get_tasks(event_id)
-        if tasks.empty: return None
-
-        status_counts = tasks['status'].value_counts()
-        
-        # Use the same size as RSVP for symmetry
-        fig, ax = plt.subplots(figsize=(5, 2.5))
-        fig.patch.set_alpha(0.0)
-        ax.patch.set_alpha(0.0)
-        
-        # Status Color Mapping
-        color_map = {
-            "Completed": "#00C853",   # Green
-            "In Progress": "#FFA500", # Orange
-            "Not Started": "#9E9E9E", # Grey
-            "Delayed": "#FF4B4B"      # Red
-        }
-        # Generate color list based on data
-        chart_colors = [color_map.get(s, '#6C63FF') for s in status_counts.index]
-
-        # Draw Donut Chart
-        wedges, texts, autotexts = ax.pie(
-            status_counts, 
-            labels=status_counts.index, 
-            autopct='%1.0f%%', 
-            colors=chart_colors,
-            wedgeprops=dict(width=0.4, edgecolor='none'),
-            textprops={'color': "white", 'fontsize': 9}
-        )
-        
-        ax.axis('equal')
-        plt.setp(autotexts, size=9, weight="bold", color="white")
-        plt.setp(texts, color="white")
-        
-        return fig
+    # Charts come back as PNG bytes (see charts.py) so repeated views are served from cache
+    def get_rsvp_pie_chart(self, event_id, rsvp_counts=None):
+        if rsvp_counts is None:
+            attendees = self.get_attendees(event_id)
+            rsvp_counts = attendees['rsvp'].value_counts()
+        return rsvp_donut(rsvp_counts)
+
+    def get_task_status_chart(self, event_id, status_counts=None):
+        if status_counts is None:
+            tasks = self.get_tasks(event_id)
+            status_counts = tasks['status'].value_counts()
+        return task_status_donut(status_counts)
+
+    # ================= TIMELINE =================
+    def get_timeline(self, event_id):
+        """(event date, task_timeline() of the event's tasks), cached until events or tasks are written"""
+        def build():
+            bundle = self.load_bundle(event_id)
+            event_date = bundle['events']['date'].iloc[0] if not bundle['events'].empty else pd.NaT
+            return event_date, task_timeline(bundle['tasks'], event_date)
+        return self.handler.cached_result(("timeline", int(event_id), pd.Timestamp.today().date()),
+                                          [self.sheet_events, self.sheet_tasks], build)
+
+    def get_timeline_chart(self, event_id):
+        """Gantt-style PNG of the event's tasks (None when no task has a deadline), cached like get_timeline"""
+        def build():
+            event_date, timeline = self.get_timeline(event_id)
+            if timeline['deadline'].isna().all(): return None
+            return render_png(timeline_figure(timeline, event_date, text_color="white"))
+        return self.handler.cached_result(("timeline_chart", int(event_id), pd.Timestamp.today().date()),
+                                          [self.sheet_events, self.sheet_tasks], build)
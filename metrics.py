@@ -0,0 +1,193 @@
+import bisect
+import contextvars
+import functools
+import inspect
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import pandas as pd
+
+# Upper bounds (milliseconds) of the latency histogram buckets; the last one catches the rest
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf"))
+
+# Backend methods that talk to the store; each call is one round trip (or one transaction)
+BACKEND_CALLS = ("load", "save", "replace", "append", "query", "update", "update_many",
+                 "delete", "delete_many", "revision", "allocate_ids", "backfill_ids")
+
+logger = logging.getLogger("event_pro.metrics")
+
+
+class CallStats:
+    __slots__ = ("calls", "errors", "total_s", "max_s", "rows", "bytes", "histogram")
+
+    def __init__(self):
+        self.calls = self.errors = self.rows = self.bytes = 0
+        self.total_s = self.max_s = 0.0
+        self.histogram = [0] * len(BUCKETS_MS)
+
+    def add(self, seconds, rows, size, ok):
+        self.calls += 1
+        self.errors += not ok
+        self.total_s += seconds
+        self.max_s = max(self.max_s, seconds)
+        self.rows += rows
+        self.bytes += size
+        self.histogram[bisect.bisect_left(BUCKETS_MS, seconds * 1000)] += 1
+
+    def percentile_ms(self, q):
+        """Upper bound of the bucket holding the q-th fraction of calls"""
+        target, seen = q * self.calls, 0
+        for bound, count in zip(BUCKETS_MS, self.histogram):
+            seen += count
+            if seen >= target and count: return min(bound, self.max_s * 1000)
+        return 0.0
+
+
+class Metrics:
+    """Call counts, latency histograms and rows/bytes moved for every instrumented call.
+
+    Totals cover the whole process. Calls made inside begin_run() ... end_run() (one
+    Streamlit script run) are also collected for that run alone.
+    """
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._run = contextvars.ContextVar("metrics_run", default=None)
+        self._run_ids = itertools.count(1)
+
+    def record(self, name, seconds, rows=0, size=0, ok=True):
+        with self._lock:
+            self._stats.setdefault(name, CallStats()).add(seconds, rows, size, ok)
+        run = self._run.get()
+        if run is not None: run["stats"].setdefault(name, CallStats()).add(seconds, rows, size, ok)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps({"event": "call", "name": name, "ms": round(seconds * 1000, 3), "rows": rows,
+                                     "bytes": size, "ok": ok, "run": run["id"] if run else None}))
+
+    def begin_run(self, label=""):
+        """Start collecting the calls of one page render in this thread/context"""
+        run = {"id": next(self._run_ids), "label": label, "started": time.perf_counter(), "stats": {}}
+        self._run.set(run)
+        return run
+
+    def end_run(self):
+        """Finish the current run; logs and returns its table (see table())"""
+        run = self._run.get()
+        if run is None: return self.table({})
+        self._run.set(None)
+        seconds = time.perf_counter() - run["started"]
+        table = self.table(run["stats"])
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({"event": "run", "run": run["id"], "label": run["label"], "ms": round(seconds * 1000, 3),
+                                    "round_trips": round_trips(table), "rows": int(table["rows"].sum()) if not table.empty else 0}))
+        return table
+
+    def current_run(self):
+        """Table of the calls made so far in the current run"""
+        run = self._run.get()
+        return self.table(run["stats"] if run else {})
+
+    def totals(self):
+        """Table of every call since start (or the last reset)"""
+        with self._lock:
+            return self.table(self._stats)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    @staticmethod
+    def table(stats):
+        """One row per call name: calls, errors, total/mean/p50/p95/max ms, rows and bytes moved"""
+        columns = ["calls", "errors", "total_ms", "mean_ms", "p50_ms", "p95_ms", "max_ms", "rows", "bytes"]
+        rows = {name: [s.calls, s.errors, s.total_s * 1000, s.total_s * 1000 / s.calls, s.percentile_ms(0.5),
+                       s.percentile_ms(0.95), s.max_s * 1000, s.rows, s.bytes]
+                for name, s in list(stats.items()) if s.calls}
+        return pd.DataFrame.from_dict(rows, orient="index", columns=columns).sort_values("total_ms", ascending=False)
+
+    def histogram(self, name):
+        """{bucket upper bound in ms: calls} for one call name"""
+        with self._lock:
+            stats = self._stats.get(name)
+            return dict(zip(BUCKETS_MS, stats.histogram)) if stats else {}
+
+
+METRICS = Metrics()
+
+
+def round_trips(table):
+    """Backend calls in a table from Metrics.table()"""
+    if table.empty: return 0
+    return int(table.loc[table.index.str.startswith("backend."), "calls"].sum())
+
+
+def _moved(value):
+    """(rows, bytes) of a DataFrame (or list of records) passed in or returned"""
+    if isinstance(value, pd.DataFrame): return len(value), int(value.memory_usage(index=False).sum())
+    if isinstance(value, tuple) and value and isinstance(value[0], pd.DataFrame): return _moved(value[0])
+    if isinstance(value, list) and value and isinstance(value[0], dict): return len(value), 0
+    return 0, 0
+
+
+def timed(name, metrics=METRICS):
+    """Decorator recording each call of a function under name"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started, ok, result = time.perf_counter(), False, None
+            try:
+                result = fn(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                rows, size = _moved(result)
+                if not rows:
+                    for arg in itertools.chain(args, kwargs.values()):
+                        rows, size = _moved(arg)
+                        if rows: break
+                metrics.record(name, time.perf_counter() - started, rows, size, ok)
+        wrapper.__wrapped_name__ = name
+        return wrapper
+    return decorate
+
+
+def instrumented(prefix, metrics=METRICS):
+    """Class decorator timing every public method as "<prefix>.<method>" (generators are left alone)"""
+    def decorate(cls):
+        for attr, value in list(vars(cls).items()):
+            if attr.startswith("_") or not inspect.isfunction(value) or inspect.isgeneratorfunction(value): continue
+            setattr(cls, attr, timed(f"{prefix}.{attr}", metrics)(value))
+        return cls
+    return decorate
+
+
+def instrument_backend(backend, metrics=METRICS):
+    """Time the store calls of one backend instance as "backend.<method>".
+
+    Wraps the instance rather than the class, so calls a backend makes on itself
+    (an update loading the table first, ...) are counted as the round trips they are.
+    """
+    if getattr(backend, "_instrumented", False): return backend
+    for attr in BACKEND_CALLS:
+        method = getattr(backend, attr, None)
+        if method is not None: setattr(backend, attr, timed(f"backend.{attr}", metrics)(method))
+    backend._instrumented = True
+    return backend
+
+
+def configure_logging(path=None):
+    """Write the structured log (one JSON object per line) to path, or EVENT_PRO_METRICS_LOG if set.
+
+    Per-call lines are DEBUG, per-run summaries INFO; set EVENT_PRO_METRICS_LEVEL=INFO for summaries only.
+    """
+    path = path or os.environ.get("EVENT_PRO_METRICS_LOG")
+    if not path or any(getattr(h, "baseFilename", None) == os.path.abspath(path) for h in logger.handlers): return
+    handler = logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(os.environ.get("EVENT_PRO_METRICS_LEVEL", "DEBUG"))
+    logger.propagate = False
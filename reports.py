@@ -0,0 +1,172 @@
+"""Headless event reports for many events at once.
+
+Loads the CLI's CSV files once, then writes a report per event (text, HTML and/or
+PDF, with RSVP, task-status and timeline charts as PNGs) into its own folder. Each
+event is rendered in a worker process with matplotlib's Agg canvas, so no display
+is needed and large batches use every core:
+
+    python reports.py -o nightly/ --format txt,html,pdf
+    python reports.py -o out/ --event 3 --event 7 --since 2025-01-01
+"""
+import argparse
+import html
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import Event_Manager
+from Event_Manager import EventAnalyzer, event_report_text
+from timeline import task_timeline, timeline_figure
+
+FORMATS = ("txt", "html", "pdf")
+
+
+def event_folder(out_dir, event_id, name):
+    slug = re.sub(r"\W+", "-", str(name)).strip("-").lower() or "event"
+    return os.path.join(out_dir, f"{int(event_id)}-{slug}")
+
+
+def _frame(df, columns):
+    """A loaded CSV, or an empty frame with columns when load_from_csv returned a message"""
+    return df if isinstance(df, pd.DataFrame) else pd.DataFrame(columns=columns)
+
+
+def build_jobs(events, attendees, tasks, out_dir, formats, event_ids=None, since=None, until=None):
+    """One job per selected event, carrying just that event's rows; the sheets are split in one pass each"""
+    if event_ids: events = events[events['id'].isin([int(i) for i in event_ids])]
+    dates = pd.to_datetime(events['date'], errors='coerce')
+    keep = pd.Series(True, index=events.index)
+    if since is not None: keep &= dates >= pd.Timestamp(since)
+    if until is not None: keep &= dates <= pd.Timestamp(until)
+    events = events[keep]
+
+    attendees_by_event = dict(tuple(attendees.groupby('event_id'))) if not attendees.empty else {}
+    tasks_by_event = dict(tuple(tasks.groupby('event_id'))) if not tasks.empty else {}
+    jobs = []
+    for position in range(len(events)):
+        event = events.iloc[[position]]
+        event_id = event['id'].values[0]
+        jobs.append({
+            "event": event,
+            "attendees": attendees_by_event.get(event_id, attendees.iloc[:0]),
+            "tasks": tasks_by_event.get(event_id, tasks.iloc[:0]),
+            "folder": event_folder(out_dir, event_id, event['name'].values[0]),
+            "formats": tuple(formats),
+        })
+    return jobs
+
+
+def _pie(counts, title):
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(6, 4.5))
+    ax = fig.subplots()
+    ax.pie(counts.values, labels=[str(label) for label in counts.index], autopct='%1.1f%%')
+    ax.set_title(title)
+    return fig
+
+
+def charts_for(event, attendees, tasks):
+    """[(file name, Figure)] for the charts the event has data for"""
+    charts = []
+    if not attendees.empty and 'rsvp' in attendees.columns:
+        charts.append(("rsvp.png", _pie(attendees['rsvp'].value_counts(), 'RSVP Status Distribution')))
+    if not tasks.empty:
+        charts.append(("tasks.png", _pie(tasks['status'].value_counts(), 'Task Status Distribution')))
+        event_date = event['date'].values[0]
+        charts.append(("timeline.png", timeline_figure(task_timeline(tasks, event_date), event_date)))
+    return charts
+
+
+def _html(title, text, images):
+    body = "".join(f'<p><img src="{name}" alt="{name}"></p>\n' for name in images)
+    return (f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{html.escape(title)}</title></head>\n"
+            f"<body>\n<h1>{html.escape(title)}</h1>\n<pre>{html.escape(text)}</pre>\n{body}</body></html>\n")
+
+
+def _write_text(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def _pdf(path, title, text, charts):
+    from matplotlib.backends.backend_pdf import PdfPages
+    from matplotlib.figure import Figure
+
+    with PdfPages(path) as pdf:
+        page = Figure(figsize=(8.27, 11.69))
+        page.text(0.07, 0.95, title, fontsize=14, weight='bold', va='top')
+        page.text(0.07, 0.91, text, fontsize=9, family='monospace', va='top')
+        pdf.savefig(page)
+        for _, fig in charts:
+            pdf.savefig(fig)
+
+
+def render_event(job):
+    """Write one event's report files and charts; returns the paths written. Runs in a worker process"""
+    event, attendees, tasks = job["event"], job["attendees"], job["tasks"]
+    folder = job["folder"]
+    os.makedirs(folder, exist_ok=True)
+    title = f"Event Report - {event['name'].values[0]}"
+    text = event_report_text(event, attendees, tasks)
+    charts = charts_for(event, attendees, tasks)
+
+    written = []
+    for name, fig in charts:
+        path = os.path.join(folder, name)
+        fig.savefig(path, bbox_inches="tight")
+        written.append(path)
+    outputs = {
+        "txt": lambda path: _write_text(path, text),
+        "html": lambda path: _write_text(path, _html(title, text, [name for name, _ in charts])),
+        "pdf": lambda path: _pdf(path, title, text, charts),
+    }
+    for fmt in job["formats"]:
+        path = os.path.join(folder, f"report.{fmt}")
+        outputs[fmt](path)
+        written.append(path)
+    return written
+
+
+def generate(analyzer, out_dir, formats=("txt", "html"), event_ids=None, since=None, until=None, workers=None):
+    """Reports for the selected events from one load of the analyzer's files; returns {event folder: paths}"""
+    unknown = set(formats) - set(FORMATS)
+    if unknown: raise ValueError(f"Unknown formats: {', '.join(sorted(unknown))}")
+    events, attendees, tasks = analyzer.load_data()
+    events = _frame(events, ['id', 'name', 'date', 'time', 'location'])
+    attendees = _frame(attendees, ['event_id', 'rsvp'])
+    tasks = _frame(tasks, ['event_id', 'task_name', 'status', 'deadline'])
+    jobs = build_jobs(events, attendees, tasks, out_dir, formats, event_ids, since, until)
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        return {job["folder"]: render_event(job) for job in jobs}
+    # A few jobs per hand-off keeps the pickling overhead low for hundreds of small events
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(render_event, jobs, chunksize=max(1, len(jobs) // (4 * workers)))
+        return {job["folder"]: paths for job, paths in zip(jobs, results)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write event reports and charts without a display")
+    parser.add_argument("-o", "--output", required=True, help="folder to write one sub-folder per event into")
+    parser.add_argument("-f", "--format", default="txt,html", help=f"comma separated, from {', '.join(FORMATS)}")
+    parser.add_argument("-d", "--data-dir", default=Event_Manager.WORKING_DIR, help="folder holding the CLI's CSV files")
+    parser.add_argument("-e", "--event", type=int, action="append", dest="event_ids", help="only this event (repeatable)")
+    parser.add_argument("--since", help="only events on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--until", help="only events on or before this date (YYYY-MM-DD)")
+    parser.add_argument("-w", "--workers", type=int, help="render processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    formats = [f.strip() for f in args.format.split(",") if f.strip()]
+    unknown = [f for f in formats if f not in FORMATS]
+    if unknown: parser.error(f"unknown formats: {', '.join(unknown)}")
+    analyzer = EventAnalyzer(*(os.path.join(args.data_dir, f"{t}.csv") for t in ("events", "attendees", "tasks")))
+    written = generate(analyzer, args.output, formats, args.event_ids, args.since, args.until, args.workers)
+    print(f"Wrote reports for {len(written)} events to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+import pandas as pd
+
+# Column types for each worksheet:
+#   "id"       int32 keys (blank or bad values become 0)
+#   "category" small fixed vocabularies such as RSVP or task status
+#   "date"     datetime64; unparseable values become NaT
+#   "text"     strings, blank when missing
+SCHEMAS = {
+    "events": {"id": "id", "name": "text", "date": "date", "time": "text", "location": "text", "description": "text"},
+    "attendees": {"id": "id", "event_id": "id", "name": "text", "email": "text", "rsvp": "category", "role": "category", "dietary": "text"},
+    "tasks": {"id": "id", "event_id": "id", "task_name": "text", "status": "category", "deadline": "date", "priority": "category"},
+}
+
+
+def _coerce(values, kind):
+    if kind == "id":
+        return pd.to_numeric(values, errors='coerce').fillna(0).astype('int32')
+    if kind == "category":
+        return values.astype('category')
+    if kind == "date":
+        return pd.to_datetime(values, errors='coerce', format='mixed')
+    return values.fillna("").astype(str)
+
+
+def normalize(df, worksheet_name, schemas=SCHEMAS):
+    """df with the worksheet's schema columns present (in schema order, extras after) and typed.
+
+    Worksheets without a schema come back unchanged. Run once per load; the result is
+    what gets cached, so readers never convert these columns again.
+    """
+    columns = schemas.get(worksheet_name)
+    if columns is None: return df
+    typed = pd.DataFrame({col: _coerce(df[col] if col in df.columns else pd.Series(None, index=df.index, dtype=object), kind)
+                          for col, kind in columns.items()}, index=df.index)
+    extras = [c for c in df.columns if c not in columns]
+    return typed.join(df[extras]) if extras else typed
@@ -0,0 +1,844 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from journal import Journal, atomic_write
+
+# Small key/value table stored next to the data (id counters and table revisions live here)
+META_TABLE = "meta"
+
+_meta_locks = {}
+_meta_locks_guard = threading.Lock()
+
+
+def meta_lock(name, path=None):
+    """Lock for the meta table of the backend called name.
+
+    Process-wide by default; with path it is a FileLock on that file, so other
+    processes using the same folder wait for it as well.
+    """
+    with _meta_locks_guard:
+        lock = _meta_locks.get(name)
+        if lock is None:
+            lock = _meta_locks[name] = FileLock(path) if path else threading.RLock()
+        return lock
+
+
+class FileLock:
+    """Re-entrant lock shared by this process's threads and, through an OS lock on path, other processes"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        try:
+            if self._depth == 0:
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    _lock_file(fd)
+                except BaseException:
+                    os.close(fd)
+                    raise
+                self._fd = fd
+            self._depth += 1
+        except BaseException:
+            self._lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0:
+            fd, self._fd = self._fd, None
+            _unlock_file(fd)
+            os.close(fd)
+        self._lock.release()
+
+
+try:
+    import fcntl
+
+    def _lock_file(fd):
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+    def _unlock_file(fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+except ImportError:  # Windows
+    import msvcrt
+
+    def _lock_file(fd):
+        while True:
+            try:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue  # LK_LOCK gives up after ten seconds; keep waiting
+
+    def _unlock_file(fd):
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class ConflictError(Exception):
+    """The table was written by someone else since it was read"""
+
+
+class StorageBackend:
+    """Interface every storage engine behind DataHandler implements.
+
+    Tables are addressed by their worksheet name ("events", "attendees", "tasks").
+    Methods raise on failure; DataHandler turns errors into status messages.
+
+    Every write bumps the table's revision. Writes that read the table first
+    (update, delete, ...) check the revision is unchanged before saving and, if
+    another writer got in between, redo their change on fresh data. The check, the
+    save and the bump hold that table's lock; only the bump holds the meta lock, so
+    writes to different tables upload side by side.
+    """
+
+    # True when query() is cheaper than loading the table and filtering it
+    indexed_queries = False
+
+    @property
+    def name(self):
+        """Identifies the data this backend points at; used as the read-cache key"""
+        return f"{type(self).__name__}:{id(self)}"
+
+    def load(self, table):
+        """Return the whole table as a DataFrame"""
+        raise NotImplementedError
+
+    def save(self, table, df):
+        """Overwrite the whole table with df. Low level: no revision check or bump"""
+        raise NotImplementedError
+
+    def revision(self, table):
+        """How many writes the table has seen; changes whenever its content does"""
+        return self._meta_value(self._load_meta(), f"rev:{table}")
+
+    def replace(self, table, df, expected_revision=None, bump=True):
+        """Overwrite the table, failing with ConflictError if its revision is no longer expected_revision.
+
+        bump=False leaves the revision to the caller, which must still hold _table_lock(table) when it bumps.
+        """
+        with self._table_lock(table):
+            current = self.revision(table)
+            if expected_revision is not None and current != expected_revision:
+                raise ConflictError(f"{table} changed (revision {expected_revision} -> {current})")
+            self.save(table, df)
+            if bump: self._bump_revision(table)
+
+    def append(self, table, df):
+        """Add the rows of df to the end of the table"""
+        raise NotImplementedError
+
+    def update(self, table, where, changes):
+        """Set changes on rows matching every column/value in where. Returns rows changed"""
+        raise NotImplementedError
+
+    def update_many(self, table, keys, updates):
+        """Apply many row updates in one write.
+
+        updates is a DataFrame holding the key columns plus the columns to change;
+        each row sets its values on the stored rows with the same keys. Returns rows changed.
+        """
+        raise NotImplementedError
+
+    def delete(self, table, column, values):
+        """Remove rows whose numeric key in column is one of values. Returns rows removed"""
+        raise NotImplementedError
+
+    def query(self, table, where):
+        """Return rows matching every column/value in where"""
+        raise NotImplementedError
+
+    def iter_chunks(self, table, columns=None, where=None, chunksize=10000):
+        """Yield the table in DataFrames of at most chunksize rows.
+
+        columns picks (and orders) the columns returned; where filters like query() and
+        also accepts a list of values per column. Engines that can read part of a table
+        override this so memory stays bounded by chunksize; the default slices a full load.
+        """
+        yield from frame_chunks(self.load(table), columns, where, chunksize)
+
+    def allocate_ids(self, table, count=1):
+        """Reserve count new ids for table and return the first one.
+
+        The counter is kept in the meta table and only ever moves forward, so ids are
+        never reused after deletes. The first call seeds it from the highest id in table.
+        Safe across threads; across processes only where _meta_lock is (see CSVBackend).
+        """
+        key = f"next_id:{table}"
+        with self._meta_lock():
+            meta = self._load_meta()
+            start = self._meta_value(meta, key) or self._max_id(table) + 1
+            self.save(META_TABLE, self._with_meta(meta, key, start + count))
+        return start
+
+    def backfill_ids(self, table):
+        """Give rows without an id a fresh one. Returns how many rows were changed"""
+        def fill(df):
+            if df.empty: return None, 0
+            ids = pd.to_numeric(df['id'], errors='coerce') if 'id' in df.columns else pd.Series(np.nan, index=df.index)
+            missing = ids.isna() | (ids <= 0)
+            if not missing.any(): return None, 0
+            start = self.allocate_ids(table, int(missing.sum()))
+            ids[missing] = np.arange(start, start + missing.sum())
+            return df.assign(id=ids.astype(int)), int(missing.sum())
+        return self._transact(table, fill)
+
+    def _transact(self, table, change, retries=3, bump=True):
+        """Read-modify-write with conflict detection.
+
+        change(df) returns (new_df, result); new_df None means nothing to write.
+        If the table is written between our read and our save, change is re-run
+        on the fresh table, so concurrent appends/updates/deletes all survive.
+        """
+        for attempt in range(retries):
+            expected = self.revision(table)
+            new_df, result = change(self.load(table))
+            if new_df is None: return result
+            try:
+                self.replace(table, new_df, expected, bump)
+                return result
+            except ConflictError:
+                continue
+        raise ConflictError(f"{table} kept changing during the write; gave up after {retries} tries")
+
+    def _meta_lock(self):
+        """Held around every read-modify-write of the meta table"""
+        return meta_lock(self.name)
+
+    def _table_lock(self, table):
+        """Held by writers of table from their revision check to their revision bump"""
+        return meta_lock(f"{self.name}/{table}")
+
+    def _bump_revision(self, *tables):
+        """Bump the revision of each table in one meta write"""
+        with self._meta_lock():
+            meta = self._load_meta()
+            for table in tables:
+                key = f"rev:{table}"
+                meta = self._with_meta(meta, key, self._meta_value(meta, key) + 1)
+            self.save(META_TABLE, meta)
+
+    def _load_meta(self):
+        try:
+            meta = self.load(META_TABLE)
+        except Exception:
+            meta = pd.DataFrame()
+        return meta if not meta.empty else pd.DataFrame(columns=['key', 'value'])
+
+    @staticmethod
+    def _meta_value(meta, key):
+        found = meta.loc[meta['key'] == key, 'value']
+        return int(found.iloc[0]) if not found.empty else 0
+
+    @staticmethod
+    def _with_meta(meta, key, value):
+        return pd.concat([meta[meta['key'] != key], pd.DataFrame([{"key": key, "value": value}])], ignore_index=True)
+
+    def _max_id(self, table):
+        df = self.load(table)
+        if df.empty or 'id' not in df.columns: return 0
+        top = pd.to_numeric(df['id'], errors='coerce').max()
+        return 0 if pd.isna(top) else int(top)
+
+    def delete_many(self, plan):
+        """Run several deletes given as {table: (column, values)}. Returns {table: rows removed}
+
+        The tables are independent, so their read-filter-write cycles run side by side,
+        and their revisions are bumped together in one meta write once all are saved.
+        """
+        if not plan: return {}
+        removed = {}
+        saved = threading.Barrier(len(plan) + 1)
+        bumped = threading.Event()
+
+        def delete(table, column, values):
+            # Keep the table locked until its bump, so no one saves over the delete in between
+            with self._table_lock(table):
+                try:
+                    removed[table] = self._transact(table, lambda df: apply_delete(df, column, values), bump=False)
+                    return removed[table]
+                finally:
+                    saved.wait()
+                    bumped.wait()
+
+        with ThreadPoolExecutor(max_workers=len(plan)) as pool:
+            futures = {table: pool.submit(delete, table, column, values) for table, (column, values) in plan.items()}
+            try:
+                saved.wait()
+                # A failed delete may still have saved, so only tables known to be untouched are skipped
+                changed = [table for table in plan if removed.get(table) != 0]
+                if changed: self._bump_revision(*changed)
+            finally:
+                bumped.set()
+            return {table: future.result() for table, future in futures.items()}
+
+
+# Row edits on an in-memory table. Each returns (new table, rows affected), or
+# (None, 0) when nothing matched; the table passed in may be modified.
+def apply_update(df, where, changes):
+    if df.empty: return None, 0
+    mask = match_rows(df, where)
+    if not mask.any(): return None, 0
+    for column, value in changes.items():
+        df.loc[mask, column] = value
+    return df, int(mask.sum())
+
+
+def apply_update_many(df, keys, updates):
+    if df.empty or updates.empty or not set(keys).issubset(df.columns): return None, 0
+
+    # Line every stored row up with its update (if any) through one left merge on the keys
+    updates = updates.drop_duplicates(subset=keys, keep='last')
+    left = pd.DataFrame({k: key_values(df[k], updates[k]) for k in keys})
+    right = updates.assign(**{k: key_values(updates[k], updates[k]) for k in keys})
+    merged = left.merge(right, on=keys, how='left', indicator=True)
+    hit = (merged['_merge'] == 'both').values
+    if not hit.any(): return None, 0
+
+    for column in updates.columns.difference(keys):
+        df.loc[hit, column] = merged.loc[hit, column].values
+    return df, int(hit.sum())
+
+
+def apply_delete(df, column, values):
+    if df.empty or column not in df.columns: return None, 0
+
+    # Coerce turns bad data into NaN, then we fill with 0 so keys compare as plain ints
+    keys = pd.to_numeric(df[column], errors='coerce').fillna(0).astype(int)
+    mask = keys.isin([int(v) for v in values])
+    if not mask.any(): return None, 0
+    return df[~mask], int(mask.sum())
+
+
+def replay(df, ops):
+    """df with journaled row changes applied in order (see JournaledCSV).
+
+    Appends whose id the table already holds are skipped and updates set values
+    rather than change them, so replaying ops a second time is harmless.
+    """
+    i = 0
+    while i < len(ops):
+        j = i + 1
+        if ops[i]["op"] == "append":
+            while j < len(ops) and ops[j]["op"] == "append": j += 1
+            rows = pd.DataFrame([op["row"] for op in ops[i:j]])
+            if "id" in rows.columns and "id" in df.columns:
+                stored = pd.to_numeric(df["id"], errors='coerce').dropna()
+                rows = rows[~pd.to_numeric(rows["id"], errors='coerce').isin(stored)]
+            if not rows.empty: df = pd.concat([df, rows], ignore_index=True) if not df.empty else rows
+        else:
+            # A run of updates keyed and shaped alike is one merge, however long
+            shape = lambda op: (tuple(op["match"]), tuple(op["set"]))
+            while j < len(ops) and ops[j]["op"] == "update" and shape(ops[j]) == shape(ops[i]): j += 1
+            updates = pd.DataFrame([{**op["match"], **op["set"]} for op in ops[i:j]])
+            new_df, _ = apply_update_many(df.copy(), list(ops[i]["match"]), updates)
+            if new_df is not None: df = new_df
+        i = j
+    return df
+
+
+def match_rows(df, where):
+    """Boolean mask of rows matching every column/value pair in where"""
+    mask = pd.Series(True, index=df.index)
+    for column, value in where.items():
+        if column not in df.columns: return pd.Series(False, index=df.index)
+        if isinstance(value, (list, tuple, set)):
+            if all(isinstance(v, (int, np.integer)) for v in value):
+                mask &= pd.to_numeric(df[column], errors='coerce').isin([int(v) for v in value])
+            else:
+                mask &= df[column].astype(str).isin([str(v) for v in value])
+        elif isinstance(value, (int, np.integer)):
+            # Sheets hand back numeric keys as floats ("3.0") or strings, so compare as numbers
+            mask &= pd.to_numeric(df[column], errors='coerce') == int(value)
+        else:
+            mask &= df[column].astype(str) == str(value)
+    return mask
+
+
+def frame_chunks(df, columns=None, where=None, chunksize=10000):
+    """Slices of an in-memory table filtered and projected the way iter_chunks() does"""
+    if where: df = df[match_rows(df, where)]
+    if columns: df = df.reindex(columns=columns)
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize].copy()
+
+
+def group_positions(df, column):
+    """{key: row positions} for every value of column; numeric columns are keyed by int"""
+    if df.empty or column not in df.columns: return {}
+    keys = pd.to_numeric(df[column], errors='coerce')
+    if keys.isna().all(): keys = df[column].astype(str)
+    else: keys = keys.fillna(0).astype(int)
+    return {k: v for k, v in keys.groupby(keys, sort=False).indices.items()}
+
+
+def group_key(value):
+    """value in the form group_positions uses for its keys"""
+    if isinstance(value, (int, np.integer)): return int(value)
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def key_values(series, like):
+    """series normalised so it compares equal to keys of the same kind as like"""
+    if pd.api.types.is_numeric_dtype(like):
+        return pd.to_numeric(series, errors='coerce').astype(float)
+    return series.astype(str)
+
+
+def to_records(df):
+    """Rows of df as plain python lists (no numpy scalars, None for missing)"""
+    df = df.copy()
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].dt.strftime("%Y-%m-%d")
+    df = df.astype(object)
+    return df.where(df.notna(), None).values.tolist()
+
+
+class FrameBackend(StorageBackend):
+    """Base for engines that can only read and write whole tables"""
+
+    def append(self, table, df):
+        self._transact(table, lambda current: (pd.concat([current, df], ignore_index=True), len(df)))
+
+    def update(self, table, where, changes):
+        return self._transact(table, lambda df: apply_update(df, where, changes))
+
+    def update_many(self, table, keys, updates):
+        return self._transact(table, lambda df: apply_update_many(df, keys, updates))
+
+    def delete(self, table, column, values):
+        return self._transact(table, lambda df: apply_delete(df, column, values))
+
+    def query(self, table, where):
+        df = self.load(table)
+        if df.empty: return df
+        return df[match_rows(df, where)]
+
+
+class GSheetsBackend(FrameBackend):
+    """Google Sheets through st.connection; each table is a worksheet.
+
+    The meta sheet is guarded by a lock in this process only: two servers writing to
+    the same spreadsheet can be handed the same ids.
+    """
+
+    def __init__(self, conn=None):
+        if conn is None:
+            import streamlit as st
+            from streamlit_gsheets import GSheetsConnection
+            conn = st.connection("gsheets", type=GSheetsConnection)
+        self.conn = conn
+
+    @property
+    def name(self):
+        return "gsheets"
+
+    def load(self, table):
+        df = self.conn.read(worksheet=table, ttl="0")
+        return df if not df.empty else pd.DataFrame()
+
+    def save(self, table, df):
+        from gspread.exceptions import WorksheetNotFound
+        try:
+            self.conn.update(worksheet=table, data=df)
+        except WorksheetNotFound:
+            # e.g. the meta sheet on first use
+            self.conn.create(worksheet=table, data=df)
+
+    def append(self, table, df):
+        worksheet = self.conn.client._select_worksheet(worksheet=table)
+        header = worksheet.row_values(1)
+
+        # A blank sheet or a brand new column needs the header rewritten, so do a full save
+        if not header or not set(df.columns).issubset(header):
+            return super().append(table, df)
+
+        # Order values like the sheet header; gspread needs plain python values, not numpy/NaN
+        values = [["" if v is None else v for v in row] for row in to_records(df.reindex(columns=header))]
+        # Sheets applies appends atomically, so there is nothing to merge; just tell readers it changed.
+        # Held across both so a transaction can't read the old revision and save over the new rows
+        with self._table_lock(table):
+            worksheet.append_rows(values, value_input_option="USER_ENTERED")
+            self._bump_revision(table)
+
+
+class JournaledCSV:
+    """A CSV snapshot plus a journal of the rows added and changed since it was written.
+
+    append() and update() add one fsynced line to <path>.journal instead of rewriting
+    the file, and load() replays the journal over the snapshot. Once compact_every
+    changes have piled up the two are folded into a new snapshot, written to a temp
+    file and renamed into place, so a crash leaves either snapshot whole and a journal
+    that still replays on top of it.
+
+    Writes hold the folder's meta.lock, like CSVBackend's, and changes bump the table's
+    revision, so an app sharing the folder through csv:// redoes a write that the CLI
+    got in ahead of instead of saving over it.
+    """
+
+    def __init__(self, path, compact_every=1000):
+        self.path = path
+        self.journal = Journal(path + ".journal")
+        self.compact_every = compact_every
+        self.table = os.path.splitext(os.path.basename(path))[0]
+        self._folder = CSVBackend(os.path.dirname(os.path.abspath(path)))
+        self._journaled = None
+
+    def load(self):
+        df = pd.DataFrame()
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0: df = pd.read_csv(self.path)
+        ops = self.journal.records()
+        self._journaled = len(ops)
+        return replay(df, ops) if ops else df
+
+    def has_journal(self):
+        return self.journal.size() > 0
+
+    def append(self, row):
+        self._log([{"op": "append", "row": row}])
+
+    def update(self, changes):
+        """Set values on the rows matching each (match, values) pair in changes"""
+        self._log([{"op": "update", "match": match, "set": values} for match, values in changes])
+
+    def save(self, df):
+        """Replace the snapshot with df and drop the journal. Low level: no revision bump"""
+        with self._folder._meta_lock():
+            atomic_write(self.path, lambda f: df.to_csv(f, index=False))
+            if self.has_journal(): self.journal.clear()
+            self._journaled = 0
+
+    def replace(self, df):
+        """save() for writers outside CSVBackend: also bumps the table's revision"""
+        with self._folder._meta_lock():
+            self.save(df)
+            self._bump()
+
+    def compact(self):
+        with self._folder._meta_lock():
+            self.save(self.load())
+
+    def backfill_ids(self):
+        """Give rows saved before ids existed a fresh id, in one rewrite. Returns how many rows were changed"""
+        with self._folder._meta_lock():
+            df = self.load()
+            ids = pd.to_numeric(df['id'], errors='coerce') if 'id' in df.columns else pd.Series(np.nan, index=df.index)
+            missing = ids.isna()
+            if not missing.any(): return 0
+            start = self._folder.allocate_ids(self.table, int(missing.sum()))
+            ids[missing] = np.arange(start, start + missing.sum())
+            self.replace(df.assign(id=ids.astype(int)))
+            return int(missing.sum())
+
+    def _log(self, ops):
+        if not ops: return
+        with self._folder._meta_lock():
+            self.journal.extend(ops)
+            self._bump()
+            if self._journaled is None: self._journaled = len(self.journal.records())
+            else: self._journaled += len(ops)
+            if self._journaled >= self.compact_every: self.compact()
+
+    def _bump(self):
+        if self.table != META_TABLE: self._folder._bump_revision(self.table)
+
+
+class CSVBackend(FrameBackend):
+    """One CSV file per table inside a folder, the format the CLI Event Manager uses"""
+
+    def __init__(self, folder="."):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+
+    @property
+    def name(self):
+        return f"csv:{os.path.abspath(self.folder)}"
+
+    def _path(self, table):
+        return os.path.join(self.folder, f"{table}.csv")
+
+    def _meta_lock(self):
+        # The CLI and the app may share the folder from separate processes
+        return meta_lock(self.name, os.path.join(self.folder, "meta.lock"))
+
+    def _table_lock(self, table):
+        # The CLI's journal writes take meta.lock, so table writes here must too
+        return self._meta_lock()
+
+    def delete_many(self, plan):
+        # Every table shares meta.lock, so delete one after another (local files are quick) and bump once
+        removed = {}
+        with self._meta_lock():
+            try:
+                for table, (column, values) in plan.items():
+                    removed[table] = self._transact(table, lambda df: apply_delete(df, column, values), bump=False)
+            finally:
+                changed = [table for table in plan if removed.get(table) != 0]
+                if changed: self._bump_revision(*changed)
+        return removed
+
+    def _file(self, table):
+        return JournaledCSV(self._path(table))
+
+    def load(self, table):
+        # Picks up changes the CLI has journaled but not yet compacted
+        return self._file(table).load()
+
+    def save(self, table, df):
+        self._file(table).save(df)
+
+    def iter_chunks(self, table, columns=None, where=None, chunksize=10000):
+        if self._file(table).has_journal():
+            yield from super().iter_chunks(table, columns, where, chunksize)
+            return
+        path = self._path(table)
+        if not os.path.exists(path) or os.path.getsize(path) == 0: return
+        wanted = set(columns or []) | set(where or {})
+        usecols = (lambda c: c in wanted) if columns else None
+        for chunk in pd.read_csv(path, chunksize=chunksize, usecols=usecols):
+            if where: chunk = chunk[match_rows(chunk, where)]
+            if columns: chunk = chunk.reindex(columns=columns)
+            if not chunk.empty: yield chunk
+
+    def append(self, table, df):
+        path = self._path(table)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return super().append(table, df)
+
+        with self._meta_lock():
+            header = list(pd.read_csv(path, nrows=0).columns)
+            if not set(df.columns).issubset(header) or self._file(table).has_journal():
+                return super().append(table, df)
+            df.reindex(columns=header).to_csv(path, mode='a', header=False, index=False)
+            self._bump_revision(table)
+
+
+class SQLiteBackend(StorageBackend):
+    """Local SQLite file with indexes on the keys EventLogic looks rows up by"""
+
+    COLUMNS = {
+        "events": {"id": "INTEGER", "name": "TEXT", "date": "TEXT", "time": "TEXT", "location": "TEXT", "description": "TEXT"},
+        "attendees": {"id": "INTEGER", "event_id": "INTEGER", "name": "TEXT", "email": "TEXT", "rsvp": "TEXT", "role": "TEXT", "dietary": "TEXT"},
+        "tasks": {"id": "INTEGER", "event_id": "INTEGER", "task_name": "TEXT", "status": "TEXT", "deadline": "TEXT", "priority": "TEXT"},
+        META_TABLE: {"key": "TEXT PRIMARY KEY", "value": "INTEGER"},
+    }
+    INDEXES = {
+        "events": ["id"],
+        "attendees": ["event_id", "id"],
+        "tasks": ["event_id", "id"],
+    }
+    indexed_queries = True
+
+    def __init__(self, path="event_pro.db"):
+        self.path = path
+        # One shared connection; Streamlit serves sessions from several threads
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._columns = {}
+        with self._lock, self._db:
+            for table in self.COLUMNS:
+                self._ensure_table(table, [])
+
+    @property
+    def name(self):
+        return f"sqlite:{os.path.abspath(self.path)}"
+
+    @staticmethod
+    def _q(name):
+        return '"' + str(name).replace('"', '""') + '"'
+
+    def _ensure_table(self, table, columns):
+        """Create the table, its indexes and any missing columns"""
+        if table not in self._columns:
+            known = self.COLUMNS.get(table, {})
+            cols = ", ".join(f"{self._q(c)} {t}" for c, t in known.items()) or f"{self._q('id')} INTEGER"
+            self._db.execute(f"CREATE TABLE IF NOT EXISTS {self._q(table)} ({cols})")
+            self._columns[table] = [row[1] for row in self._db.execute(f"PRAGMA table_info({self._q(table)})")]
+            # Files created by older versions lack some of the known columns
+            for col, kind in known.items():
+                if col not in self._columns[table]:
+                    self._db.execute(f"ALTER TABLE {self._q(table)} ADD COLUMN {self._q(col)} {kind}")
+                    self._columns[table].append(col)
+            for col in self.INDEXES.get(table, []):
+                self._db.execute(f"CREATE INDEX IF NOT EXISTS {self._q(f'idx_{table}_{col}')} ON {self._q(table)} ({self._q(col)})")
+
+        for col in columns:
+            if col not in self._columns[table]:
+                self._db.execute(f"ALTER TABLE {self._q(table)} ADD COLUMN {self._q(col)}")
+                self._columns[table].append(col)
+
+    def _where(self, where):
+        clauses, params = [], []
+        for column, value in where.items():
+            values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+            clauses.append(f"{self._q(column)} = ?" if len(values) == 1 else f"{self._q(column)} IN ({', '.join('?' * len(values))})")
+            params.extend(int(v) if isinstance(v, np.integer) else v for v in values)
+        return " AND ".join(clauses), params
+
+    @contextmanager
+    def _immediate(self):
+        """Transaction holding SQLite's write lock from the start, so other processes on the file wait their turn"""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+                self._db.commit()
+            except Exception:
+                self._db.rollback()
+                raise
+
+    def _meta(self, key):
+        row = self._db.execute(f"SELECT value FROM {self._q(META_TABLE)} WHERE key = ?", (key,)).fetchone()
+        return int(row[0]) if row is not None else None
+
+    def _bump(self, table):
+        self._db.execute(f"INSERT INTO {self._q(META_TABLE)} (key, value) VALUES (?, 1) "
+                         f"ON CONFLICT(key) DO UPDATE SET value = value + 1", (f"rev:{table}",))
+
+    def allocate_ids(self, table, count=1):
+        key = f"next_id:{table}"
+        with self._immediate():
+            self._ensure_table(table, [])
+            start = self._meta(key)
+            if start is None:
+                top = self._db.execute(f"SELECT MAX({self._q('id')}) FROM {self._q(table)}").fetchone()[0] if 'id' in self._columns[table] else None
+                start = int(top or 0) + 1
+            self._db.execute(f"INSERT OR REPLACE INTO {self._q(META_TABLE)} (key, value) VALUES (?, ?)", (key, start + count))
+        return start
+
+    def revision(self, table):
+        with self._lock:
+            return self._meta(f"rev:{table}") or 0
+
+    def replace(self, table, df, expected_revision=None, bump=True):
+        with self._immediate():
+            current = self._meta(f"rev:{table}") or 0
+            if expected_revision is not None and current != expected_revision:
+                raise ConflictError(f"{table} changed (revision {expected_revision} -> {current})")
+            self._ensure_table(table, df.columns)
+            self._db.execute(f"DELETE FROM {self._q(table)}")
+            self._insert(table, df)
+            if bump: self._bump(table)
+
+    def load(self, table):
+        with self._lock:
+            self._ensure_table(table, [])
+            return pd.read_sql_query(f"SELECT * FROM {self._q(table)}", self._db)
+
+    def save(self, table, df):
+        self.replace(table, df)
+
+    def append(self, table, df):
+        with self._lock, self._db:
+            self._ensure_table(table, df.columns)
+            self._insert(table, df)
+            self._bump(table)
+
+    def _insert(self, table, df):
+        if df.empty: return
+        cols = ", ".join(self._q(c) for c in df.columns)
+        marks = ", ".join("?" for _ in df.columns)
+        self._db.executemany(f"INSERT INTO {self._q(table)} ({cols}) VALUES ({marks})", to_records(df))
+
+    def update(self, table, where, changes):
+        with self._lock, self._db:
+            self._ensure_table(table, list(changes))
+            if any(c not in self._columns[table] for c in where): return 0
+            sets = ", ".join(f"{self._q(c)} = ?" for c in changes)
+            clause, params = self._where(where)
+            cur = self._db.execute(f"UPDATE {self._q(table)} SET {sets} WHERE {clause}", list(changes.values()) + params)
+            self._bump(table)
+            return cur.rowcount
+
+    def update_many(self, table, keys, updates):
+        if updates.empty: return 0
+        changes = [c for c in updates.columns if c not in keys]
+        with self._lock, self._db:
+            self._ensure_table(table, changes)
+            if any(k not in self._columns[table] for k in keys): return 0
+            sets = ", ".join(f"{self._q(c)} = ?" for c in changes)
+            clause = " AND ".join(f"{self._q(k)} = ?" for k in keys)
+            cur = self._db.executemany(f"UPDATE {self._q(table)} SET {sets} WHERE {clause}", to_records(updates[changes + list(keys)]))
+            self._bump(table)
+            return cur.rowcount
+
+    def delete(self, table, column, values):
+        with self._lock, self._db:
+            return self._delete(table, column, values)
+
+    def delete_many(self, plan):
+        # One transaction, so a cascade either fully happens or not at all
+        with self._lock, self._db:
+            return {table: self._delete(table, column, values) for table, (column, values) in plan.items()}
+
+    def _delete(self, table, column, values):
+        keys = [int(v) for v in values]
+        removed = 0
+        self._ensure_table(table, [])
+        if column not in self._columns[table]: return 0
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            marks = ", ".join("?" for _ in chunk)
+            cur = self._db.execute(f"DELETE FROM {self._q(table)} WHERE {self._q(column)} IN ({marks})", chunk)
+            removed += cur.rowcount
+        self._bump(table)
+        return removed
+
+    def query(self, table, where):
+        with self._lock:
+            self._ensure_table(table, [])
+            if any(c not in self._columns[table] for c in where):
+                return pd.DataFrame(columns=self._columns[table])
+            clause, params = self._where(where)
+            return pd.read_sql_query(f"SELECT * FROM {self._q(table)} WHERE {clause}", self._db, params=params)
+
+    def iter_chunks(self, table, columns=None, where=None, chunksize=10000):
+        # Pages by rowid, so the connection lock is only held while each page is read
+        where = where or {}
+        last = 0
+        while True:
+            with self._lock:
+                self._ensure_table(table, [])
+                if any(c not in self._columns[table] for c in where): return
+                select = ", ".join(self._q(c) for c in (columns or self._columns[table]) if c in self._columns[table]) or "NULL"
+                clause, params = self._where(where)
+                clause = f" AND {clause}" if clause else ""
+                chunk = pd.read_sql_query(
+                    f"SELECT rowid AS _rowid, {select} FROM {self._q(table)} WHERE rowid > ?{clause} ORDER BY rowid LIMIT ?",
+                    self._db, params=[last] + params + [chunksize])
+            if chunk.empty: return
+            last = int(chunk['_rowid'].iloc[-1])
+            chunk = chunk.drop(columns='_rowid')
+            yield chunk.reindex(columns=columns) if columns else chunk
+
+
+def backend_from_url(url):
+    """Build a backend from a storage URL.
+
+    "gsheets" (default), "sqlite:///path/to/file.db" or "csv:///path/to/folder".
+    The csv path is everything after "csv://": "csv:///srv/data" is the absolute
+    folder /srv/data, "csv://data" is relative to the working directory.
+    """
+    if not url or url == "gsheets":
+        return GSheetsBackend()
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    if url.startswith("csv://"):
+        return CSVBackend(url[len("csv://"):])
+    raise ValueError(f"Unknown storage URL: {url}")
@@ -1,7 +1,14 @@
 import unittest
 import os
+import time
 import pandas as pd
-from data_handler import DataHandler  # Ensure this file exists in the same directory
+from data_handler import DataHandler, WorksheetCache  # Ensure this file exists in the same directory
+from storage import GSheetsBackend, FrameBackend
+import metrics
+import shutil
+import tempfile
+from journal import Journal
+from write_behind import WriteBehindQueue
 
 class TestDataHandler(unittest.TestCase):
     def setUp(self):
@@ -39,5 +46,339 @@ class TestDataHandler(unittest.TestCase):
         if os.path.exists(self.test_file):
             os.remove(self.test_file)
 
+class FakeWorksheet:
+    def __init__(self, header):
+        self.header = header
+        self.appended = []
+
+    def row_values(self, row):
+        return list(self.header)
+
+    def append_rows(self, values, value_input_option=None):
+        self.appended.extend(values)
+
+
+class FakeConnection:
+    def __init__(self, worksheet, existing=None):
+        self.client = self
+        self.worksheet = worksheet
+        self.existing = existing if existing is not None else pd.DataFrame()
+        self.meta = pd.DataFrame()
+        self.updates = []
+
+    def _select_worksheet(self, worksheet=None):
+        return self.worksheet
+
+    def read(self, worksheet=None, ttl=None):
+        return self.meta if worksheet == "meta" else self.existing
+
+    def update(self, worksheet=None, data=None):
+        if worksheet == "meta":
+            self.meta = data
+        else:
+            self.updates.append(data)
+
+
+class TestAppendRows(unittest.TestCase):
+    def connect(self, worksheet):
+        self.conn = FakeConnection(worksheet)
+        self.handler = DataHandler(backend=GSheetsBackend(conn=self.conn))
+
+    def test_append_sends_only_new_rows(self):
+        """Appending writes just the new row, in sheet column order."""
+        ws = FakeWorksheet(["event_id", "name", "email"])
+        self.connect(ws)
+        result = self.handler.append_rows([{"name": "Ada", "event_id": 3, "email": None}], "attendees")
+        self.assertEqual(result, "Saved to Cloud")
+        self.assertEqual(ws.appended, [[3, "Ada", ""]])
+        self.assertEqual(self.conn.updates, [])
+
+    def test_append_to_blank_sheet_falls_back_to_full_save(self):
+        """A sheet without a header is written in full so the header gets created."""
+        ws = FakeWorksheet([])
+        self.connect(ws)
+        self.handler.append_rows({"id": 1, "name": "Launch"}, "events")
+        self.assertEqual(ws.appended, [])
+        self.assertEqual(len(self.conn.updates), 1)
+        self.assertEqual(self.conn.updates[0].iloc[0]["name"], "Launch")
+
+
+class CountingBackend(FrameBackend):
+    """In-memory backend that counts how often each table is fetched"""
+    def __init__(self):
+        self.tables = {}
+        self.loads = 0
+
+    def load(self, table):
+        if table != "meta": self.loads += 1
+        return self.tables.get(table, pd.DataFrame()).copy()
+
+    def save(self, table, df):
+        self.tables[table] = df.reset_index(drop=True)
+
+
+class TestReadCache(unittest.TestCase):
+    def setUp(self):
+        self.backend = CountingBackend()
+        self.backend.tables["attendees"] = pd.DataFrame([{"event_id": 1, "name": "Ada"}, {"event_id": 2, "name": "Bob"}])
+        self.handler = DataHandler(backend=self.backend, cache=WorksheetCache(ttl=60, max_entries=2))
+
+    def test_repeated_reads_fetch_once(self):
+        """Loads and per-event queries of one worksheet share a single fetch."""
+        self.handler.load_data("attendees")
+        self.handler.load_data("attendees")
+        df = self.handler.query_data("attendees", event_id=2)
+        self.assertEqual(self.backend.loads, 1)
+        self.assertEqual(list(df["name"]), ["Bob"])
+
+    def test_event_index_is_built_once_per_load(self):
+        """Per-event lookups reuse one index until the sheet is written."""
+        built = []
+        original = self.handler.cache.get_derived
+        def spy(key, name, build):
+            return original(key, name, lambda frame: built.append(name) or build(frame))
+        self.handler.cache.get_derived = spy
+
+        self.assertEqual(list(self.handler.query_data("attendees", event_id=1)["name"]), ["Ada"])
+        self.assertEqual(list(self.handler.query_data("attendees", event_id="2")["name"]), ["Bob"])
+        self.assertTrue(self.handler.query_data("attendees", event_id=7).empty)
+        self.assertEqual(len(built), 1)
+
+        self.handler.append_rows({"event_id": 1, "name": "Cy"}, "attendees")
+        self.assertEqual(list(self.handler.query_data("attendees", event_id=1)["name"]), ["Ada", "Cy"])
+        self.assertEqual(len(built), 2)
+
+    def test_query_without_cache_fetches_once(self):
+        """With the cache off, a per-event query still reads the sheet only once."""
+        self.handler.cache = WorksheetCache(ttl=0)
+        self.assertEqual(list(self.handler.query_data("attendees", event_id=2)["name"]), ["Bob"])
+        self.assertEqual(self.backend.loads, 1)
+
+    def test_cached_frame_is_not_shared(self):
+        """Editing a loaded frame does not leak into the cache."""
+        df = self.handler.load_data("attendees")
+        df["name"] = "changed"
+        self.assertEqual(list(self.handler.load_data("attendees")["name"]), ["Ada", "Bob"])
+
+    def test_writes_invalidate(self):
+        """A write through the handler is visible on the next read."""
+        self.handler.load_data("attendees")
+        self.handler.append_rows({"event_id": 3, "name": "Cy"}, "attendees")
+        self.assertEqual(len(self.handler.load_data("attendees")), 3)
+        self.assertEqual(self.backend.loads, 3)
+
+    def test_load_overtaken_by_a_write_is_not_cached(self):
+        """A read that started before a write finishes after it: its frame is returned but not cached."""
+        load = self.backend.load
+        def load_then_write(table):
+            df = load(table)
+            if table == "attendees" and self.backend.loads == 1:
+                self.handler.append_rows({"event_id": 3, "name": "Cy"}, "attendees")
+            return df
+        self.backend.load = load_then_write
+
+        self.assertEqual(len(self.handler.load_data("attendees")), 2)
+        self.assertEqual(len(self.handler.load_data("attendees")), 3)
+        self.assertEqual(len(self.handler.query_data("attendees", event_id=3)), 1)
+
+    def test_ttl_and_size_bound(self):
+        """Expired entries are refetched and the oldest entry is evicted first."""
+        self.handler.cache.ttl = 0.01
+        self.handler.load_data("attendees")
+        time.sleep(0.02)
+        self.handler.load_data("attendees")
+        self.assertEqual(self.backend.loads, 2)
+
+        self.handler.cache.ttl = 60
+        for sheet in ["attendees", "tasks", "events"]:
+            self.handler.load_data(sheet)
+        self.assertIsNone(self.handler.cache.get(self.handler._cache_key("attendees")))
+
+
+class RacingBackend(CountingBackend):
+    """Lets another writer slip in a row right after our first read"""
+    def __init__(self):
+        super().__init__()
+        self.raced = False
+
+    def load(self, table):
+        df = super().load(table)
+        if table == "attendees" and not self.raced:
+            self.raced = True
+            self.replace(table, pd.concat([df, pd.DataFrame([{"event_id": 9, "name": "Other session"}])], ignore_index=True))
+        return df
+
+
+class TestOptimisticConcurrency(unittest.TestCase):
+    def setUp(self):
+        self.backend = CountingBackend()
+        self.backend.tables["attendees"] = pd.DataFrame([{"event_id": 1, "name": "Ada"}])
+        self.handler = DataHandler(backend=self.backend, cache=WorksheetCache(ttl=0))
+
+    def test_stale_save_is_refused(self):
+        """A whole-sheet save based on an old read does not clobber a newer write."""
+        df, revision = self.handler.load_versioned("attendees")
+        self.handler.append_rows({"event_id": 2, "name": "Bob"}, "attendees")
+        result = self.handler.save_data(df, "attendees", expected_revision=revision)
+        self.assertTrue(result.startswith("Conflict"))
+        self.assertEqual(len(self.backend.tables["attendees"]), 2)
+
+    def test_fresh_save_goes_through(self):
+        df, revision = self.handler.load_versioned("attendees")
+        self.assertEqual(self.handler.save_data(df, "attendees", expected_revision=revision), "Saved to Cloud")
+        self.assertEqual(self.backend.revision("attendees"), revision + 1)
+
+    def test_concurrent_append_is_merged(self):
+        """When another write lands mid-append, the append is redone on top of it."""
+        self.handler.backend = backend = RacingBackend()
+        backend.tables["attendees"] = pd.DataFrame([{"event_id": 1, "name": "Ada"}])
+        self.handler.append_rows({"event_id": 2, "name": "Bob"}, "attendees")
+        self.assertEqual(list(backend.tables["attendees"]["name"]), ["Ada", "Other session", "Bob"])
+
+
+class SlowBackend(CountingBackend):
+    """Every fetch takes a fixed time, like a round trip to Google"""
+    latency = 0.2
+
+    def load(self, table):
+        if table != "meta": time.sleep(self.latency)
+        return super().load(table)
+
+
+class TestLoadMany(unittest.TestCase):
+    def setUp(self):
+        self.backend = SlowBackend()
+        self.backend.tables["events"] = pd.DataFrame([{"id": 1, "name": "Launch"}, {"id": 2, "name": "Party"}])
+        self.backend.tables["attendees"] = pd.DataFrame([{"id": 1, "event_id": 1, "name": "Ada"}, {"id": 2, "event_id": 2, "name": "Bob"}])
+        self.backend.tables["tasks"] = pd.DataFrame([{"id": 1, "event_id": 2, "task_name": "Venue"}])
+        self.handler = DataHandler(backend=self.backend, cache=WorksheetCache(ttl=60))
+
+    def test_sheets_are_fetched_side_by_side(self):
+        """Three cold reads take about as long as one."""
+        started = time.perf_counter()
+        frames = self.handler.load_many(["events", "attendees", "tasks"])
+        self.assertLess(time.perf_counter() - started, 2 * SlowBackend.latency)
+        self.assertEqual([len(frames[ws]) for ws in ("events", "attendees", "tasks")], [2, 2, 1])
+        self.assertEqual(self.backend.loads, 3)
+
+        # Now cached: no further fetches
+        self.handler.load_many(["events", "attendees", "tasks"])
+        self.assertEqual(self.backend.loads, 3)
+
+    def test_bundle_for_one_event(self):
+        from logic import EventLogic
+        bundle = EventLogic(self.handler).load_bundle(2)
+        self.assertEqual(list(bundle["events"]["name"]), ["Party"])
+        self.assertEqual(list(bundle["attendees"]["name"]), ["Bob"])
+        self.assertEqual(list(bundle["tasks"]["task_name"]), ["Venue"])
+
+    def test_reads_in_threads_count_towards_the_current_run(self):
+        metrics.METRICS.begin_run()
+        self.handler.load_many(["events", "attendees"])
+        self.assertEqual(metrics.round_trips(metrics.METRICS.end_run()), 2)
+
+
+class RecordingBackend(CountingBackend):
+    """Counts the row-level writes that reach the store"""
+    def __init__(self):
+        super().__init__()
+        self.writes = []
+
+    def append(self, table, df):
+        self.writes.append(("append", table, len(df)))
+        return super().append(table, df)
+
+    def update_many(self, table, keys, updates):
+        self.writes.append(("update_many", table, len(updates)))
+        return super().update_many(table, keys, updates)
+
+    def delete(self, table, column, values):
+        self.writes.append(("delete", table, len(values)))
+        return super().delete(table, column, values)
+
+
+class TestWriteBehind(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.backend = RecordingBackend()
+        self.backend.tables["attendees"] = pd.DataFrame([{"id": i, "event_id": 1, "name": n, "rsvp": "Pending"} for i, n in [(1, "Ada"), (2, "Bob"), (3, "Cy")]])
+        # A long delay keeps the worker out of the way; the tests flush by hand
+        self.queue = WriteBehindQueue(self.backend, Journal(os.path.join(self.folder, "journal.jsonl")), delay=3600)
+        self.handler = DataHandler(backend=self.backend, cache=WorksheetCache(ttl=60), write_behind=self.queue)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_burst_is_visible_at_once_and_sent_coalesced(self):
+        """Edits show up in reads straight away and reach the store as one call per kind."""
+        for attendee_id in (1, 2, 3):
+            self.assertEqual(self.handler.update_data("attendees", {"id": attendee_id}, {"rsvp": "Confirmed"}), "Updated")
+        self.handler.append_rows({"id": 4, "event_id": 2, "name": "Dee", "rsvp": "Declined"}, "attendees")
+        self.handler.append_rows({"id": 5, "event_id": 2, "name": "Eve", "rsvp": "Pending"}, "attendees")
+
+        self.assertEqual(self.backend.writes, [])
+        df = self.handler.load_data("attendees")
+        self.assertEqual(list(df["rsvp"]), ["Confirmed"] * 3 + ["Declined", "Pending"])
+        self.assertEqual(len(self.handler.query_data("attendees", event_id=2)), 2)
+
+        self.assertEqual(self.handler.flush(), "Saved to Cloud")
+        self.assertEqual(self.backend.writes, [("update_many", "attendees", 3), ("append", "attendees", 2)])
+        self.assertEqual(list(self.backend.tables["attendees"]["rsvp"]), ["Confirmed"] * 3 + ["Declined", "Pending"])
+        self.assertEqual(Journal(self.queue.journal.path).records(), [])
+
+    def test_uncached_reads_include_queued_writes(self):
+        self.handler.delete_data("attendees", "id", 2)
+        self.handler.cache.clear()
+        self.assertEqual(list(self.handler.load_data("attendees")["name"]), ["Ada", "Cy"])
+        self.assertEqual(len(self.backend.tables["attendees"]), 3)
+
+    def test_no_op_writes_are_not_queued(self):
+        self.assertEqual(self.handler.update_data("attendees", {"id": 99}, {"rsvp": "Confirmed"}), "No matching rows")
+        self.assertEqual(self.queue.pending(), [])
+
+    def test_journal_is_replayed_after_a_crash(self):
+        """Writes queued but never flushed are sent by the next process; stored appends are not repeated."""
+        self.handler.append_rows({"id": 4, "event_id": 2, "name": "Dee", "rsvp": "Pending"}, "attendees")
+        self.handler.update_data("attendees", {"id": 1}, {"rsvp": "Declined"})
+        # Simulate a crash right after the append reached the store, before the journal was trimmed
+        self.backend.append("attendees", pd.DataFrame([{"id": 4, "event_id": 2, "name": "Dee", "rsvp": "Pending"}]))
+
+        restarted = WriteBehindQueue(self.backend, Journal(self.queue.journal.path), delay=3600)
+        self.assertEqual([op["op"] for op in restarted.pending()], ["update_many"])
+        restarted.flush()
+        df = self.backend.tables["attendees"]
+        self.assertEqual(list(df["id"]), [1, 2, 3, 4])
+        self.assertEqual(df.loc[0, "rsvp"], "Declined")
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.backend = CountingBackend()
+        self.backend.tables["attendees"] = pd.DataFrame([{"event_id": 1, "name": "Ada"}, {"event_id": 2, "name": "Bob"}])
+        self.handler = DataHandler(backend=self.backend, cache=WorksheetCache(ttl=60))
+
+    def test_run_counts_round_trips_and_rows(self):
+        """A render's table shows each handler call and the backend round trips behind it."""
+        metrics.METRICS.begin_run("test")
+        self.handler.load_data("attendees")
+        self.handler.query_data("attendees", event_id=2)
+        table = metrics.METRICS.end_run()
+        self.assertEqual(table.loc["handler.load_data", "calls"], 1)
+        self.assertEqual(table.loc["handler.load_data", "rows"], 2)
+        self.assertEqual(table.loc["handler.query_data", "rows"], 1)
+        self.assertEqual(table.loc["backend.load", "calls"], 1)
+        self.assertEqual(metrics.round_trips(table), 1)
+        self.assertTrue(metrics.METRICS.current_run().empty)
+
+    def test_histogram_and_errors(self):
+        recorder = metrics.Metrics()
+        fail = metrics.timed("op", recorder)(lambda: 1 / 0)
+        with self.assertRaises(ZeroDivisionError): fail()
+        metrics.timed("op", recorder)(lambda: None)()
+        table = recorder.totals()
+        self.assertEqual((table.loc["op", "calls"], table.loc["op", "errors"]), (2, 1))
+        self.assertEqual(sum(recorder.histogram("op").values()), 2)
+
+
 if __name__ == "__main__":
     unittest.main()
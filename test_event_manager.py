@@ -0,0 +1,152 @@
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+from unittest import mock
+import pandas as pd
+import Event_Manager
+import reports
+from Event_Manager import EventManager, EventAnalyzer, Attendee, RecordTable
+
+
+class TestRecords(unittest.TestCase):
+    def test_records_read_like_dicts(self):
+        attendee = Attendee(id=1, event_id=2, name="Ada", email="a@x.com", rsvp="Pending", badge="VIP")
+        self.assertEqual(attendee["email"], "a@x.com")
+        self.assertNotIn("role", attendee)
+        self.assertEqual(attendee.to_dict(), {"id": 1, "event_id": 2, "name": "Ada", "email": "a@x.com", "rsvp": "Pending", "badge": "VIP"})
+        self.assertFalse(hasattr(attendee, "__dict__"))
+
+    def test_missing_csv_values_become_none(self):
+        df = pd.DataFrame([{"id": 1, "event_id": 1, "email": "a@x.com", "role": None}, {"id": 2, "event_id": 1, "email": "b@x.com", "role": "Speaker"}])
+        first, second = Attendee.from_frame(df)
+        self.assertIsNone(first.role)
+        self.assertIn("role", second)
+
+    def test_indexes_match_a_front_to_back_scan(self):
+        table = RecordTable([Attendee(id=1, event_id=1, email="a@x.com"), Attendee(id=2, event_id=2, email="a@x.com"),
+                             Attendee(id=3, event_id=1, email="c@x.com")],
+                            unique={"email": lambda a: a.email}, groups=("event_id",))
+        self.assertEqual(table.find("email", "a@x.com").id, 1)
+        self.assertEqual([a.id for a in table.group("event_id", 1)], [1, 3])
+        self.assertEqual(table.group("event_id", 9), [])
+
+
+class TestEventManager(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.files = [os.path.join(self.folder, f"{t}.csv") for t in ("events", "attendees", "tasks")]
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def run_inputs(self, method, *answers):
+        with mock.patch("builtins.input", side_effect=answers), mock.patch("builtins.print"):
+            method()
+
+    def test_changes_survive_a_restart(self):
+        manager = EventManager(*self.files)
+        self.run_inputs(manager.create_event, "Launch", "2030-01-01", "10:00", "Hall", "")
+        self.run_inputs(manager.add_attendee, "1", "Ada", "a@x.com", "Pending", "", "Vegan")
+        self.run_inputs(manager.update_rsvp, "a@x.com", "Confirmed")
+        self.run_inputs(lambda: manager.task_manager.create_task(1), "Venue", "Not Started", "2029-12-01", "", "High")
+        self.assertEqual(manager.task_manager.update_task_statuses({(1, "Venue"): "Completed"}), 1)
+
+        restarted = EventManager(*self.files)
+        attendee = restarted.attendees.find("email", "a@x.com")
+        self.assertEqual((attendee.rsvp, attendee.dietary, attendee.role), ("Confirmed", "Vegan", None))
+        self.assertEqual([e.name for e in restarted.events], ["Launch"])
+        self.assertEqual(restarted.task_manager.tasks.find("name", (1, "Venue")).status, "Completed")
+
+    def test_rows_saved_before_ids_are_updated_one_at_a_time(self):
+        # The same guest registered for two events, in a file from before ids
+        pd.DataFrame([{"event_id": 1, "name": "Ada", "email": "a@x.com", "rsvp": "Pending"},
+                      {"event_id": 2, "name": "Ada", "email": "a@x.com", "rsvp": "Pending"}]).to_csv(self.files[1], index=False)
+        manager = EventManager(*self.files)
+        self.assertEqual(sorted(a.id for a in manager.attendees), [1, 2])
+        self.run_inputs(manager.update_rsvp, "a@x.com", "Confirmed")
+
+        in_memory = [(a.event_id, a.rsvp) for a in manager.attendees]
+        on_disk = [(a.event_id, a.rsvp) for a in EventManager(*self.files).attendees]
+        self.assertEqual(in_memory, [(1, "Confirmed"), (2, "Pending")])
+        self.assertEqual(on_disk, in_memory)
+
+
+class TestAnalyzerData(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.files = [os.path.join(self.folder, f"{t}.csv") for t in ("events", "attendees", "tasks")]
+        pd.DataFrame([{"id": 1, "name": "Launch", "date": "2030-01-01", "time": "10:00", "location": "Hall"}]).to_csv(self.files[0], index=False)
+        pd.DataFrame([{"id": 1, "event_id": 1, "name": "Ada", "email": "a@x.com", "rsvp": "Confirmed", "role": "Guest"}]).to_csv(self.files[1], index=False)
+        pd.DataFrame([{"id": 1, "event_id": 1, "task_name": "Venue", "status": "Completed", "deadline": "2029-12-01"}]).to_csv(self.files[2], index=False)
+        self.analyzer = EventAnalyzer(*self.files)
+        self.reads = mock.patch.object(self.analyzer.data_handler, "load_from_csv", wraps=self.analyzer.data_handler.load_from_csv).start()
+        for patcher in (mock.patch.dict(os.environ, {"EVENT_PRO_HEADLESS": "1"}), mock.patch.object(Event_Manager, "WORKING_DIR", self.folder),
+                        mock.patch("builtins.print")):
+            patcher.start()
+
+    def tearDown(self):
+        mock.patch.stopall()
+        shutil.rmtree(self.folder)
+
+    def read_files(self):
+        return sorted(os.path.basename(call.args[0]) for call in self.reads.call_args_list)
+
+    def test_each_file_is_read_once_across_the_menu(self):
+        for _ in range(2):
+            self.analyzer.visualize_rsvp_status(1)
+            self.analyzer.visualize_attendee_categories(1)
+            self.analyzer.visualize_task_status(1)
+            self.analyzer.analyze_event_timeline(1)
+            self.analyzer.generate_event_report(1)
+        self.assertEqual(self.read_files(), ["attendees.csv", "events.csv", "tasks.csv"])
+
+    def test_only_the_changed_file_is_read_again(self):
+        self.analyzer.load_data()
+        self.analyzer.data_handler.append_record({"id": 2, "event_id": 1, "name": "Bob", "email": "b@x.com", "rsvp": "Pending"}, self.files[1])
+        _, attendees, _ = self.analyzer.load_data()
+        self.assertEqual(len(attendees), 2)
+        self.assertEqual(self.read_files(), ["attendees.csv", "attendees.csv", "events.csv", "tasks.csv"])
+
+
+class TestBatchReports(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        data = os.path.join(self.folder, "data")
+        os.makedirs(data)
+        pd.DataFrame([{"id": i, "name": f"Event {i}", "date": f"2030-0{i}-01", "time": "10:00", "location": "Hall"} for i in (1, 2, 3)]).to_csv(
+            os.path.join(data, "events.csv"), index=False)
+        pd.DataFrame([{"id": 1, "event_id": 1, "name": "Ada", "email": "a@x.com", "rsvp": "Confirmed"},
+                      {"id": 2, "event_id": 2, "name": "Bob", "email": "b@x.com", "rsvp": "Pending"}]).to_csv(os.path.join(data, "attendees.csv"), index=False)
+        pd.DataFrame([{"id": 1, "event_id": 1, "task_name": "Venue", "status": "Delayed", "deadline": "2030-01-05"}]).to_csv(
+            os.path.join(data, "tasks.csv"), index=False)
+        self.analyzer = EventAnalyzer(*(os.path.join(data, f"{t}.csv") for t in ("events", "attendees", "tasks")))
+        self.out = os.path.join(self.folder, "out")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_reports_for_every_event_in_worker_processes(self):
+        written = reports.generate(self.analyzer, self.out, formats=reports.FORMATS, workers=2)
+        self.assertEqual(sorted(os.listdir(self.out)), ["1-event-1", "2-event-2", "3-event-3"])
+        self.assertEqual(sorted(os.path.basename(p) for p in written[os.path.join(self.out, "1-event-1")]),
+                         ["report.html", "report.pdf", "report.txt", "rsvp.png", "tasks.png", "timeline.png"])
+        with open(os.path.join(self.out, "1-event-1", "report.txt"), encoding="utf-8") as f:
+            self.assertIn("1 tasks are scheduled too close to the event date", f.read())
+        # No guests or tasks: the report still goes out, without charts
+        self.assertEqual(sorted(os.listdir(os.path.join(self.out, "3-event-3"))), ["report.html", "report.pdf", "report.txt"])
+
+    def test_filters_pick_events(self):
+        with mock.patch("sys.stderr"):
+            reports.main(["-o", self.out, "-d", os.path.dirname(self.analyzer.event_file), "-e", "2", "-w", "1"])
+        self.assertEqual(os.listdir(self.out), ["2-event-2"])
+        reports.generate(self.analyzer, self.out, since="2030-03-01", workers=1)
+        self.assertEqual(sorted(os.listdir(self.out)), ["2-event-2", "3-event-3"])
+
+    def test_date_window_filters_once(self):
+        events, attendees, tasks = self.analyzer.load_data()
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            jobs = reports.build_jobs(events, attendees, tasks, self.out, ["txt"], since="2030-02-01", until="2030-02-28")
+        self.assertEqual([job["folder"] for job in jobs], [os.path.join(self.out, "2-event-2")])
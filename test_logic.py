@@ -0,0 +1,268 @@
+import os
+import shutil
+import tempfile
+import io
+import unittest
+from unittest import mock
+from datetime import date, timedelta
+from data_handler import DataHandler, WorksheetCache
+from storage import SQLiteBackend
+from logic import EventLogic
+import pandas as pd
+import charts
+import exporter
+import importer
+import schema
+import timeline
+
+
+class LogicTestCase(unittest.TestCase):
+    """EventLogic on a throwaway SQLite file with a private read cache"""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.backend = SQLiteBackend(os.path.join(self.folder, "events.db"))
+        self.logic = EventLogic(DataHandler(backend=self.backend, cache=WorksheetCache(ttl=60)))
+
+    def tearDown(self):
+        self.backend._db.close()
+        shutil.rmtree(self.folder)
+
+    def seed(self):
+        past = date.today() - timedelta(days=3)
+        future = date.today() + timedelta(days=3)
+        self.logic.add_event("Launch", "2025-06-01", "10:00", "Hall", "")
+        self.logic.add_event("Retro", "2025-07-01", "15:00", "Room 2", "")
+        for name, rsvp in [("Ada", "Confirmed"), ("Bob", "Pending"), ("Cy", "Confirmed")]:
+            self.logic.add_attendee(1, name, f"{name}@example.com", rsvp, "Guest", "")
+        self.logic.add_attendee(2, "Dee", "dee@example.com", "Declined", "Guest", "")
+        self.logic.add_task(1, "Venue", "Completed", past)
+        self.logic.add_task(1, "Catering", "In Progress", past)
+        self.logic.add_task(1, "Music", "Not Started", future)
+
+
+class TestEventSummary(LogicTestCase):
+    def test_single_event_summary(self):
+        self.seed()
+        summary = self.logic.get_event_summary(1)
+        self.assertEqual((summary['guests'], summary['confirmed']), (3, 2))
+        self.assertEqual((summary['tasks'], summary['completed'], summary['pending_tasks']), (3, 1, 2))
+        self.assertEqual(summary['overdue_tasks'], 1)
+        self.assertEqual(summary['rsvp_counts'].to_dict(), {"Confirmed": 2, "Pending": 1})
+
+    def test_event_without_data(self):
+        self.seed()
+        summary = self.logic.get_event_summary(2)
+        self.assertEqual((summary['guests'], summary['tasks']), (1, 0))
+        self.assertTrue(summary['task_counts'].empty)
+
+    def test_all_events_summary(self):
+        self.seed()
+        summaries = self.logic.get_event_summaries()
+        self.assertEqual(list(summaries.index), [1, 2])
+        self.assertEqual(summaries.loc[2, 'rsvp_Declined'], 1)
+        self.assertEqual(summaries.loc[1, 'status_Completed'], 1)
+
+
+class TestPortfolio(LogicTestCase):
+    def test_cross_event_tables(self):
+        self.seed()
+        portfolio = self.logic.get_portfolio()
+        per_event = portfolio['per_event'].set_index('id')
+        self.assertAlmostEqual(per_event.loc[1, 'confirmed_rate'], 2 / 3)
+        self.assertAlmostEqual(per_event.loc[1, 'completion_rate'], 1 / 3)
+        self.assertEqual(per_event.loc[2, 'tasks'], 0)
+        self.assertEqual(portfolio['by_location'].loc['Hall', 'guests'], 3)
+        self.assertEqual(portfolio['by_month'].loc['2025-07', 'guests'], 1)
+
+    def test_cached_until_a_sheet_changes(self):
+        self.seed()
+        first = self.logic.get_portfolio()
+        self.assertIs(self.logic.get_portfolio(), first)
+        self.logic.add_attendee(2, "Eve", "eve@example.com", "Confirmed", "Guest", "")
+        refreshed = self.logic.get_portfolio()
+        self.assertIsNot(refreshed, first)
+        self.assertEqual(refreshed['per_event'].set_index('id').loc[2, 'guests'], 2)
+
+
+class TestSchema(LogicTestCase):
+    def test_sheets_are_typed_once_on_load(self):
+        self.seed()
+        attendees = self.logic.get_attendees()
+        self.assertEqual(str(attendees['id'].dtype), "int32")
+        self.assertEqual(str(attendees['rsvp'].dtype), "category")
+        self.assertEqual(self.logic.get_events()['date'].dtype.kind, "M")
+        self.assertEqual(self.logic.get_tasks(1)['deadline'].dtype.kind, "M")
+        self.logic.get_tasks()
+        cached = self.logic.handler.cache.get(self.logic.handler._cache_key("tasks"))
+        self.assertEqual(str(cached['status'].dtype), "category")
+
+    def test_messy_sheet_values(self):
+        raw = pd.DataFrame({"id": ["1", 2.0, None], "event_id": [1, "x", 3], "name": ["A", None, "C"], "deadline": ["2025-01-02", "soon", ""]})
+        typed = schema.normalize(raw, "tasks")
+        self.assertEqual(list(typed.columns), list(schema.SCHEMAS["tasks"]) + ["name"])
+        self.assertEqual(list(typed['id']), [1, 2, 0])
+        self.assertEqual(list(typed['event_id']), [1, 0, 3])
+        self.assertEqual(list(typed['task_name']), ["", "", ""])
+        self.assertEqual(typed['deadline'].isna().tolist(), [False, True, True])
+        self.assertIs(schema.normalize(raw, "Sheet1"), raw)
+
+
+class TestEventsPage(LogicTestCase):
+    def setUp(self):
+        super().setUp()
+        today = date.today()
+        for offset in [5, -2, 30, -40, 1, 12]:
+            self.logic.add_event(f"Day {offset:+d}", today + timedelta(days=offset), "10:00", "Hall", "")
+        self.logic.add_event("Undated", "someday", "10:00", "Hall", "")
+
+    def names(self, page):
+        return list(page[0]['name']), page[1]
+
+    def test_upcoming_pages_in_date_order(self):
+        self.assertEqual(self.names(self.logic.get_events_page(1, 2, "upcoming")), (["Day +1", "Day +5"], 4))
+        self.assertEqual(self.names(self.logic.get_events_page(2, 2, "upcoming")), (["Day +12", "Day +30"], 4))
+
+    def test_past_is_newest_first(self):
+        self.assertEqual(self.names(self.logic.get_events_page(1, 10, "past")), (["Day -2", "Day -40"], 2))
+
+    def test_date_range_and_all(self):
+        today = date.today()
+        page = self.logic.get_events_page(1, 10, "all", today, today + timedelta(days=12))
+        self.assertEqual(self.names(page), (["Day +1", "Day +5", "Day +12"], 3))
+        everything = self.logic.get_events_page(1, 10, "all")
+        self.assertEqual(everything[1], 7)
+        self.assertEqual(everything[0]['name'].iloc[-1], "Undated")
+
+
+class TestCharts(LogicTestCase):
+    def test_charts_are_png_and_cached_by_counts(self):
+        self.seed()
+        charts.donut_chart.cache_clear()
+        first = self.logic.get_rsvp_pie_chart(1)
+        self.assertTrue(first.startswith(b"\x89PNG"))
+        self.assertIs(self.logic.get_rsvp_pie_chart(1), first)
+        self.assertEqual(charts.donut_chart.cache_info().hits, 1)
+
+    def test_no_chart_without_data(self):
+        self.assertIsNone(self.logic.get_task_status_chart(1))
+
+
+class TestTimeline(LogicTestCase):
+    def setUp(self):
+        super().setUp()
+        today = date.today()
+        self.logic.add_event("Launch", today + timedelta(days=10), "10:00", "Hall", "")
+        self.logic.add_task(1, "Venue", "Completed", today - timedelta(days=5))
+        self.logic.add_task(1, "Catering", "In Progress", today - timedelta(days=1))
+        self.logic.add_task(1, "Cleanup", "Not Started", today + timedelta(days=12))
+        self.logic.add_task(1, "Someday", "Not Started", "")
+
+    def test_schedule_columns(self):
+        event_date, table = self.logic.get_timeline(1)
+        self.assertEqual(list(table['task_name']), ["Venue", "Catering", "Cleanup", "Someday"])
+        self.assertEqual(table['days_left'].tolist()[:3], [-5, -1, 12])
+        self.assertEqual(table['lead_days'].tolist()[:3], [15, 11, -2])
+        self.assertTrue((table['days_to_event'] == 10).all())
+        self.assertEqual(table['late'].tolist(), [False, False, True, False])
+        self.assertEqual(table['overdue'].tolist(), [False, True, False, False])
+
+    def test_chart_draws_every_task_in_one_collection(self):
+        event_date, table = self.logic.get_timeline(1)
+        big = pd.concat([table] * 500, ignore_index=True)
+        fig = timeline.timeline_figure(big, event_date)
+        ax = fig.axes[0]
+        self.assertEqual(len(ax.collections), 2)  # the bars and the deadline markers
+        self.assertEqual((len(ax.patches), len(ax.texts)), (0, 0))
+        self.assertEqual(len(ax.collections[0].get_paths()), 1500)
+        self.assertTrue(self.logic.get_timeline_chart(1).startswith(b"\x89PNG"))
+
+
+class TestBulkImport(LogicTestCase):
+    def setUp(self):
+        super().setUp()
+        self.seed()
+        # Counts store appends so tests can check an import is one write
+        appends = mock.patch.object(self.backend, "append", wraps=self.backend.append)
+        self.append = appends.start()
+        self.addCleanup(appends.stop)
+
+    def test_attendees_validated_in_chunks_and_written_once(self):
+        csv = io.StringIO(
+            "Full Name,E-mail,RSVP\n"
+            "Eve,eve@example.com,confirmed\n"
+            ",nobody@example.com,Pending\n"
+            "Fay,not-an-email,\n"
+            "Gus,gus@example.com,maybe\n"
+            "Ada,Ada@example.com,Confirmed\n"
+            "Eve,eve@example.com,Pending\n")
+        report = importer.import_file(self.logic, csv, "attendees", event_id=1, chunksize=2)
+        self.assertEqual(report['imported'], 1)
+        self.assertEqual(report['skipped'], 2)
+        self.assertEqual(report['errors'], [(3, "missing name"), (4, "invalid email"), (5, "invalid rsvp")])
+        self.assertEqual(self.append.call_count, 1)
+        guests = self.logic.get_attendees(1).set_index('name')
+        self.assertEqual(guests.loc['Eve', 'rsvp'], "Confirmed")
+        self.assertEqual(guests.loc['Eve', 'role'], "Guest")
+        self.assertNotIn('Gus', guests.index)
+        self.assertEqual(guests['id'].is_unique, True)
+
+    def test_tasks_normalized_with_per_row_event(self):
+        csv = io.StringIO(
+            "event_id,task,due date,priority,status\n"
+            "2,Slides,2025-07-01,high,completed\n"
+            ",Badges,06/20/2025,,\n"
+            "1,Chairs,someday,Low,Not Started\n"
+            "x,Lights,,,\n"
+            "2.7,Stage,,,\n"
+            "9,Tables,,,\n"
+            "2,Posters,,urgent,\n")
+        report = importer.import_file(self.logic, csv, "tasks", event_id=1)
+        self.assertEqual(report['imported'], 2)
+        self.assertEqual(report['errors'], [(4, "invalid deadline"), (5, "missing or invalid event_id"),
+                                            (6, "missing or invalid event_id"), (7, "unknown event_id"), (8, "invalid priority")])
+        slides = self.logic.get_tasks(2).iloc[0]
+        self.assertEqual((slides['status'], slides['priority'], slides['deadline']), ("Completed", "High", pd.Timestamp("2025-07-01")))
+        badges = self.logic.get_tasks(1).set_index('task_name').loc['Badges']
+        self.assertEqual((badges['status'], badges['priority'], badges['deadline']), ("Not Started", "Medium", pd.Timestamp("2025-06-20")))
+        self.assertEqual(self.append.call_count, 1)
+
+    def test_empty_file_writes_nothing(self):
+        report = importer.import_file(self.logic, io.StringIO("name,email\n"), "attendees", event_id=1)
+        self.assertEqual((report['imported'], report['result']), (0, "Nothing to import"))
+        self.assertEqual(self.append.call_count, 0)
+
+
+class TestExport(LogicTestCase):
+    def test_joined_csv_carries_event_details(self):
+        self.seed()
+        out = io.StringIO()
+        rows = exporter.export(self.logic.handler, "joined", out, "csv", event_ids=[1], chunksize=2)
+        df = pd.read_csv(io.StringIO(out.getvalue()))
+        self.assertEqual(rows, 6)
+        self.assertEqual(list(df.columns), exporter.JOINED_COLUMNS)
+        self.assertEqual(df['record'].value_counts().to_dict(), {"attendee": 3, "task": 3})
+        self.assertEqual(set(df['event_name']), {"Launch"})
+
+    def test_parquet_projection_across_chunks(self):
+        self.seed()
+        path = os.path.join(self.folder, "guests.parquet")
+        rows = exporter.export(self.logic.handler, "attendees", path, "parquet", columns=['id', 'name', 'rsvp'], chunksize=1)
+        df = pd.read_parquet(path)
+        self.assertEqual(rows, 4)
+        self.assertEqual(list(df.columns), ['id', 'name', 'rsvp'])
+        self.assertEqual(list(df['name']), ["Ada", "Bob", "Cy", "Dee"])
+
+    def test_cli_writes_file(self):
+        self.seed()
+        path = os.path.join(self.folder, "tasks.csv")
+        os.environ["EVENT_PRO_STORAGE"] = f"sqlite:///{self.backend.path}"
+        try:
+            exporter.main(["tasks", "-o", path, "-c", "task_name,status"])
+        finally:
+            del os.environ["EVENT_PRO_STORAGE"]
+        self.assertEqual(list(pd.read_csv(path)['task_name']), ["Venue", "Catering", "Music"])
+
+
+if __name__ == "__main__":
+    unittest.main()
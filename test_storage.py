@@ -0,0 +1,382 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import unittest.mock
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import pandas as pd
+from storage import SQLiteBackend, CSVBackend, GSheetsBackend, JournaledCSV, backend_from_url
+from data_handler import DataHandler
+from logic import EventLogic
+import bench
+
+
+def allocate_in_new_process(folder, count):
+    """Ids one process gets from a CSV folder, one allocation at a time"""
+    backend = CSVBackend(folder)
+    return [backend.allocate_ids("events") for _ in range(count)]
+
+
+class BackendContract:
+    """Checks every storage backend must pass"""
+
+    def test_append_and_load(self):
+        self.backend.append("attendees", pd.DataFrame([{"event_id": 1, "name": "Ada", "rsvp": "Pending"}]))
+        self.backend.append("attendees", pd.DataFrame([{"event_id": 2, "name": "Bob", "rsvp": "Confirmed"}]))
+        df = self.backend.load("attendees")
+        self.assertEqual(list(df["name"]), ["Ada", "Bob"])
+
+    def test_query_by_key(self):
+        self.backend.save("tasks", pd.DataFrame([
+            {"event_id": 1, "task_name": "Venue", "status": "Completed"},
+            {"event_id": 2, "task_name": "Catering", "status": "Not Started"},
+        ]))
+        df = self.backend.query("tasks", {"event_id": 2})
+        self.assertEqual(list(df["task_name"]), ["Catering"])
+
+    def test_update_by_key(self):
+        self.backend.save("tasks", pd.DataFrame([
+            {"event_id": 1, "task_name": "Venue", "status": "Not Started"},
+            {"event_id": 1, "task_name": "Catering", "status": "Not Started"},
+        ]))
+        changed = self.backend.update("tasks", {"event_id": 1, "task_name": "Venue"}, {"status": "Completed"})
+        self.assertEqual(changed, 1)
+        df = self.backend.load("tasks")
+        self.assertEqual(list(df["status"]), ["Completed", "Not Started"])
+
+    def test_update_many_in_one_write(self):
+        self.backend.save("tasks", pd.DataFrame([
+            {"event_id": e, "task_name": f"T{t}", "status": "Not Started"} for e in (1, 2) for t in range(3)
+        ]))
+        updates = pd.DataFrame([
+            {"event_id": 1, "task_name": "T0", "status": "Completed"},
+            {"event_id": 2, "task_name": "T2", "status": "In Progress"},
+            {"event_id": 3, "task_name": "T0", "status": "Completed"},
+        ])
+        self.assertEqual(self.backend.update_many("tasks", ["event_id", "task_name"], updates), 2)
+        self.assertEqual(list(self.backend.load("tasks")["status"]),
+                         ["Completed", "Not Started", "Not Started", "Not Started", "Not Started", "In Progress"])
+
+    def test_delete_by_keys(self):
+        self.backend.save("events", pd.DataFrame([{"id": i, "name": f"E{i}"} for i in range(1, 5)]))
+        removed = self.backend.delete("events", "id", [2, 4])
+        self.assertEqual(removed, 2)
+        self.assertEqual(list(self.backend.load("events")["id"]), [1, 3])
+
+    def test_ids_are_not_reused_after_delete(self):
+        self.backend.save("events", pd.DataFrame([{"id": 7, "name": "Old"}]))
+        self.assertEqual(self.backend.allocate_ids("events"), 8)
+        self.backend.delete("events", "id", [7])
+        self.assertEqual(self.backend.allocate_ids("events", 3), 9)
+        self.assertEqual(self.backend.allocate_ids("events"), 12)
+
+    def test_concurrent_allocations_are_unique(self):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            ids = list(pool.map(lambda _: self.backend.allocate_ids("tasks"), range(40)))
+        self.assertEqual(sorted(ids), list(range(1, 41)))
+
+    def test_backfill_ids(self):
+        self.backend.save("attendees", pd.DataFrame([{"event_id": 1, "name": "Ada"}, {"event_id": 1, "name": "Bob"}]))
+        self.assertEqual(self.backend.backfill_ids("attendees"), 2)
+        self.assertEqual(sorted(self.backend.load("attendees")["id"]), [1, 2])
+        self.assertEqual(self.backend.backfill_ids("attendees"), 0)
+
+    def test_delete_many_across_tables(self):
+        self.backend.save("events", pd.DataFrame([{"id": i, "name": f"E{i}"} for i in range(1, 4)]))
+        self.backend.save("tasks", pd.DataFrame([{"event_id": i, "task_name": "T"} for i in [1, 2, 2, 3]]))
+        removed = self.backend.delete_many({"events": ("id", [2, 3]), "tasks": ("event_id", [2, 3])})
+        self.assertEqual(removed, {"events": 2, "tasks": 3})
+        self.assertEqual(list(self.backend.load("tasks")["event_id"]), [1])
+
+    def test_iter_chunks_filters_and_projects(self):
+        self.backend.save("attendees", pd.DataFrame([{"id": i, "event_id": i % 3, "name": f"G{i}", "email": ""} for i in range(1, 11)]))
+        chunks = list(self.backend.iter_chunks("attendees", columns=["name", "id"], where={"event_id": [1, 2]}, chunksize=3))
+        self.assertTrue(all(len(c) <= 3 for c in chunks))
+        df = pd.concat(chunks)
+        self.assertEqual(list(df.columns), ["name", "id"])
+        self.assertEqual(list(df["id"]), [1, 2, 4, 5, 7, 8, 10])
+
+
+class TestSQLiteBackend(BackendContract, unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.backend = SQLiteBackend(os.path.join(self.folder, "events.db"))
+
+    def tearDown(self):
+        self.backend._db.close()
+        shutil.rmtree(self.folder)
+
+    def test_key_indexes_exist(self):
+        names = {row[0] for row in self.backend._db.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+        self.assertTrue({"idx_events_id", "idx_attendees_event_id", "idx_tasks_event_id"}.issubset(names))
+
+    def test_new_columns_are_added(self):
+        self.backend.append("tasks", pd.DataFrame([{"event_id": 1, "task_name": "Venue", "assigned_to": "Ada"}]))
+        self.assertEqual(self.backend.load("tasks")["assigned_to"].iloc[0], "Ada")
+
+
+class TestCSVBackend(BackendContract, unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.backend = CSVBackend(self.folder)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_url_with_absolute_path(self):
+        url = f"csv://{self.folder}"  # mkdtemp gives an absolute path, so this is csv:///tmp/...
+        self.assertTrue(url.startswith("csv:///"))
+        self.backend.save("events", pd.DataFrame([{"id": 1, "name": "Launch"}]))
+        backend = backend_from_url(url)
+        self.assertEqual(backend.folder, self.folder)
+        self.assertEqual(backend.load("events")["name"].tolist(), ["Launch"])
+
+    def test_allocations_from_several_processes_are_unique(self):
+        # e.g. the CLI and a csv:// app sharing one folder
+        with ProcessPoolExecutor(max_workers=4) as pool:
+            ids = [i for batch in pool.map(allocate_in_new_process, [self.folder] * 4, [15] * 4) for i in batch]
+        self.assertEqual(sorted(ids), list(range(1, 61)))
+
+
+class TestJournaledCSV(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "attendees.csv")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_changes_are_journaled_not_rewritten(self):
+        csv = JournaledCSV(self.path)
+        csv.save(pd.DataFrame([{"id": 1, "email": "a@x.com", "rsvp": "Pending"}]))
+        before = os.path.getmtime(self.path), os.path.getsize(self.path)
+        csv.append({"id": 2, "email": "b@x.com", "rsvp": "Pending"})
+        csv.update([({"id": 1}, {"rsvp": "Confirmed"}), ({"id": 2}, {"rsvp": "Declined"})])
+        self.assertEqual((os.path.getmtime(self.path), os.path.getsize(self.path)), before)
+
+        # A fresh reader (the next start of the CLI) replays the journal
+        df = JournaledCSV(self.path).load()
+        self.assertEqual(df["rsvp"].tolist(), ["Confirmed", "Declined"])
+        self.assertEqual(CSVBackend(self.folder).load("attendees")["rsvp"].tolist(), ["Confirmed", "Declined"])
+
+    def test_compaction_folds_the_journal_into_the_snapshot(self):
+        csv = JournaledCSV(self.path, compact_every=3)
+        for i in range(1, 4):
+            csv.append({"id": i, "email": f"{i}@x.com", "rsvp": "Pending"})
+        self.assertFalse(csv.has_journal())
+        self.assertEqual(pd.read_csv(self.path)["id"].tolist(), [1, 2, 3])
+        self.assertFalse([f for f in os.listdir(self.folder) if f.endswith(".tmp")])
+
+    def test_replaying_after_a_crash_mid_compaction_is_harmless(self):
+        csv = JournaledCSV(self.path)
+        csv.append({"id": 1, "email": "a@x.com", "rsvp": "Pending"})
+        csv.update([({"id": 1}, {"rsvp": "Confirmed"})])
+        # Snapshot written, then the crash comes before the journal is cleared
+        df = csv.load()
+        df.to_csv(self.path, index=False)
+        reloaded = JournaledCSV(self.path).load()
+        self.assertEqual(reloaded["id"].tolist(), [1])
+        self.assertEqual(reloaded["rsvp"].tolist(), ["Confirmed"])
+
+    def test_cli_write_during_an_app_update_is_kept(self):
+        backend = CSVBackend(self.folder)
+        backend.replace("attendees", pd.DataFrame([{"id": 1, "email": "a@x.com", "rsvp": "Pending"},
+                                                   {"id": 2, "email": "b@x.com", "rsvp": "Pending"}]))
+        load = backend.load
+        cli = JournaledCSV(self.path)
+
+        def load_then_cli_write(table):
+            df = load(table)
+            if table == "attendees" and not cli.has_journal():
+                # The CLI journals a new guest between the app's read and its save
+                cli.append({"id": 3, "email": "c@x.com", "rsvp": "Pending"})
+            return df
+
+        with unittest.mock.patch.object(backend, "load", load_then_cli_write):
+            self.assertEqual(backend.update("attendees", {"id": 1}, {"rsvp": "Confirmed"}), 1)
+        df = JournaledCSV(self.path).load()
+        self.assertEqual(df["id"].tolist(), [1, 2, 3])
+        self.assertEqual(df["rsvp"].tolist(), ["Confirmed", "Pending", "Pending"])
+
+    def test_torn_last_line_is_ignored(self):
+        csv = JournaledCSV(self.path)
+        csv.append({"id": 1, "email": "a@x.com", "rsvp": "Pending"})
+        with open(self.path + ".journal", "a") as f:
+            f.write('{"op": "append", "row": {"id": 2')
+        self.assertEqual(JournaledCSV(self.path).load()["id"].tolist(), [1])
+
+
+class TestLocalSheetsBackend(BackendContract, unittest.TestCase):
+    """The benchmark's stand-in for the Google Sheets connection behaves like a real store"""
+
+    def setUp(self):
+        self.conn = bench.LocalSheetsConnection()
+        self.backend = GSheetsBackend(conn=self.conn)
+
+    def test_append_is_one_round_trip_for_the_rows(self):
+        self.backend.append("attendees", pd.DataFrame([{"event_id": 1, "name": "Ada"}]))
+        self.conn.calls.clear()
+        self.backend.append("attendees", pd.DataFrame([{"event_id": 1, "name": "Bob"}, {"event_id": 2, "name": "Cy"}]))
+        self.assertEqual(self.conn.calls["append_rows"], 1)
+        self.assertEqual(self.conn.calls["update"], 1)  # the revision bump
+
+    def test_delete_many_uploads_side_by_side(self):
+        for table, column in [("events", "id"), ("attendees", "event_id"), ("tasks", "event_id")]:
+            self.backend.replace(table, pd.DataFrame({column: [1, 2], "name": ["a", "b"]}))
+        before = {table: self.backend.revision(table) for table in ("events", "attendees", "tasks")}
+        in_flight, peak, guard = [0], [0], threading.Lock()
+        update = self.conn.update
+
+        def tracked_update(worksheet=None, data=None):
+            with guard:
+                in_flight[0] += worksheet != "meta"
+                peak[0] = max(peak[0], in_flight[0])
+            try:
+                update(worksheet=worksheet, data=data)
+            finally:
+                with guard: in_flight[0] -= worksheet != "meta"
+
+        self.conn.latency = 0.05
+        self.conn.calls.clear()
+        with unittest.mock.patch.object(self.conn, "update", tracked_update):
+            removed = self.backend.delete_many({"events": ("id", [1]), "attendees": ("event_id", [1]), "tasks": ("event_id", [1])})
+        self.assertEqual(removed, {"events": 1, "attendees": 1, "tasks": 1})
+        self.assertGreater(peak[0], 1)
+        self.assertEqual(self.conn.calls["update"], 4)  # three tables, then one meta write for all the bumps
+        self.assertEqual({table: self.backend.revision(table) - rev for table, rev in before.items()},
+                         {"events": 1, "attendees": 1, "tasks": 1})
+
+    def test_append_during_an_update_is_not_lost(self):
+        self.backend.save("attendees", pd.DataFrame([{"id": 1, "event_id": 1, "name": "Ada", "rsvp": "Pending"}]))
+        appended, replacing = threading.Event(), threading.Event()
+        append_rows, load, replace = bench.LocalWorksheet.append_rows, self.backend.load, self.backend.replace
+        pool = ThreadPoolExecutor(max_workers=2)
+        adding = []
+
+        def slow_append(worksheet, values, value_input_option=None):
+            # The rows are in the sheet, but the revision is bumped only once the update goes to save
+            append_rows(worksheet, values, value_input_option)
+            appended.set()
+            replacing.wait(5)
+
+        def load_then_append(table):
+            df = load(table)
+            if table == "attendees" and not adding:
+                # The update has read the sheet without Bob; now his append lands
+                adding.append(pool.submit(self.backend.append, "attendees", pd.DataFrame([{"id": 2, "event_id": 1, "name": "Bob", "rsvp": "Pending"}])))
+                appended.wait(5)
+            return df
+
+        def signalled_replace(*args, **kwargs):
+            replacing.set()
+            return replace(*args, **kwargs)
+
+        with unittest.mock.patch.object(bench.LocalWorksheet, "append_rows", slow_append), \
+                unittest.mock.patch.object(self.backend, "load", load_then_append), \
+                unittest.mock.patch.object(self.backend, "replace", signalled_replace), pool:
+            self.assertEqual(pool.submit(self.backend.update, "attendees", {"id": 1}, {"rsvp": "Confirmed"}).result(), 1)
+            adding[0].result()
+        df = self.backend.load("attendees").sort_values("id")
+        self.assertEqual(df["id"].tolist(), [1, 2])
+        self.assertEqual(df["rsvp"].tolist(), ["Confirmed", "Pending"])
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_small_run_reports_json_and_regressions(self):
+        folder = tempfile.mkdtemp()
+        try:
+            out = os.path.join(folder, "bench.json")
+            self.assertEqual(bench.main(["--sizes", "100", "--repeat", "1", "--ops", "add_attendee,get_attendees_event", "--output", out]), 0)
+            with open(out) as f: report = json.load(f)
+            self.assertEqual([(r["op"], r["mode"]) for r in report["results"]],
+                             [("add_attendee", "cold"), ("get_attendees_event", "cold"), ("get_attendees_event", "warm")])
+            self.assertEqual(report["results"][1]["calls_per_op"], {"read": 1.0})
+
+            # A baseline that claims everything used to be instant flags every operation
+            for r in report["results"]: r["median_s"] = 1e-9
+            with open(out, "w") as f: json.dump(report, f)
+            self.assertEqual(bench.main(["--sizes", "100", "--repeat", "1", "--ops", "add_attendee", "--baseline", out, "--output", out]), 1)
+        finally:
+            shutil.rmtree(folder)
+
+    def test_startup_does_not_load_plotting_or_gui(self):
+        for result in bench.startup_times(["Event_Manager", "logic"], repeat=1):
+            self.assertEqual(result["heavy_modules"], [], result["op"])
+
+    def test_headless_cli_charts_are_saved_as_png(self):
+        import Event_Manager
+        folder = tempfile.mkdtemp()
+        try:
+            pd.DataFrame([{"id": 1, "event_id": 1, "name": "Ada", "email": "a@x.com", "rsvp": "Confirmed"}]).to_csv(
+                os.path.join(folder, "attendees.csv"), index=False)
+            analyzer = Event_Manager.EventAnalyzer(*(os.path.join(folder, f"{t}.csv") for t in ("events", "attendees", "tasks")))
+            with unittest.mock.patch.dict(os.environ, {"EVENT_PRO_HEADLESS": "1"}), \
+                    unittest.mock.patch.object(Event_Manager, "WORKING_DIR", folder):
+                analyzer.visualize_rsvp_status(1)
+            self.assertTrue(os.path.exists(os.path.join(folder, "charts", "rsvp_status_distribution.png")))
+        finally:
+            shutil.rmtree(folder)
+
+
+class TestEventLogicOnSQLite(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.backend = SQLiteBackend(os.path.join(self.folder, "events.db"))
+        self.logic = EventLogic(DataHandler(backend=self.backend))
+
+    def tearDown(self):
+        self.backend._db.close()
+        shutil.rmtree(self.folder)
+
+    def test_event_lifecycle(self):
+        self.logic.add_event("Launch", "2025-06-01", "10:00", "Hall", "Kickoff")
+        self.logic.add_event("Retro", "2025-07-01", "15:00", "Room 2", "")
+        self.logic.add_attendee(2, "Ada", "ada@example.com", "Confirmed", "Guest", "")
+        self.logic.add_task(2, "Book room", "Not Started", "2025-06-20")
+
+        self.assertEqual(list(self.logic.get_events()["id"]), [1, 2])
+        self.assertEqual(list(self.logic.get_attendees(2)["name"]), ["Ada"])
+        self.assertTrue(self.logic.get_attendees(1).empty)
+
+        self.logic.update_task_status(2, "Book room", "Completed")
+        self.assertEqual(self.logic.get_tasks(2)["status"].iloc[0], "Completed")
+
+        self.logic.delete_event(2)
+        self.assertEqual(list(self.logic.get_events()["id"]), [1])
+        self.assertTrue(self.logic.get_tasks().empty)
+
+    def test_records_are_keyed_by_id(self):
+        self.logic.add_attendee(1, "Ada", "ada@example.com", "Pending", "Guest", "")
+        self.logic.add_attendee(1, "Ada", "ada@example.com", "Pending", "Guest", "")
+        attendees = self.logic.get_attendees(1)
+        self.assertEqual(list(attendees["id"]), [1, 2])
+
+        self.logic.update_rsvp(2, "Confirmed")
+        self.logic.delete_attendee(1)
+        attendees = self.logic.get_attendees(1)
+        self.assertEqual(list(zip(attendees["id"], attendees["rsvp"])), [(2, "Confirmed")])
+
+        self.logic.add_task(1, "Venue", "Not Started", "2025-06-20")
+        self.logic.update_task_statuses_by_id({1: "Completed"})
+        self.assertEqual(self.logic.get_tasks(1)["status"].iloc[0], "Completed")
+
+    def test_bulk_task_status_update(self):
+        for name in ["Venue", "Catering", "Music"]:
+            self.logic.add_task(1, name, "Not Started", "2025-06-20")
+        self.logic.update_task_statuses([(1, "Venue", "Completed"), (1, "Music", "In Progress")])
+        self.assertEqual(list(self.logic.get_tasks(1)["status"]), ["Completed", "Not Started", "In Progress"])
+        self.assertEqual(self.logic.update_task_status(1, "Missing", "Completed"), "Task not found.")
+
+    def test_bulk_delete_cascades(self):
+        for i in range(1, 5):
+            self.logic.add_event(f"E{i}", "2025-06-01", "10:00", "Hall", "")
+            self.logic.add_attendee(i, f"Guest {i}", f"g{i}@example.com", "Pending", "Guest", "")
+        self.logic.delete_events([1, 3, 4])
+        self.assertEqual(list(self.logic.get_events()["id"]), [2])
+        self.assertEqual(list(self.logic.get_attendees()["event_id"]), [2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+from charts import STATUS_COLORS
+
+# Statuses without a colour of their own (typos, blanks) are drawn like delayed tasks
+OTHER_COLOR = STATUS_COLORS["Delayed"]
+# Past this many tasks the row labels would overlap, so they are left off
+MAX_LABELS = 60
+
+
+def task_timeline(tasks, event_date, today=None):
+    """Schedule figures for one event's tasks, worked out a column at a time and sorted by deadline.
+
+    Returns task_name, status and deadline plus:
+      days_left      days from today to the deadline (negative once it has passed)
+      days_to_event  days from today to the event
+      lead_days      days between the deadline and the event (the task's buffer)
+      late           due on or after the event day
+      overdue        deadline passed and not Completed
+    """
+    today = pd.Timestamp(today if today is not None else pd.Timestamp.today()).normalize()
+    event_date = pd.to_datetime(event_date, errors='coerce')
+    deadline = pd.to_datetime(tasks['deadline'], errors='coerce', format='mixed') if len(tasks) else pd.Series(dtype='datetime64[ns]')
+    day = np.timedelta64(1, 'D')
+
+    timeline = pd.DataFrame({'task_name': tasks['task_name'], 'status': tasks['status'], 'deadline': deadline})
+    timeline['days_left'] = (timeline['deadline'] - today) / day
+    timeline['days_to_event'] = (event_date - today) / day if pd.notna(event_date) else np.nan
+    timeline['lead_days'] = (event_date - timeline['deadline']) / day if pd.notna(event_date) else np.nan
+    timeline['late'] = (timeline['lead_days'] <= 0).fillna(False).astype(bool)
+    timeline['overdue'] = ((timeline['days_left'] < 0) & (timeline['status'] != 'Completed')).fillna(False).astype(bool)
+    return timeline.sort_values('deadline', kind='stable', na_position='last').reset_index(drop=True)
+
+
+def timeline_figure(timeline, event_date, text_color=None):
+    """Gantt-style Figure of a task_timeline(): one bar per task from its deadline to the event.
+
+    Bars, deadline markers and row labels are each a single collection or call whatever
+    the number of tasks (barh would make one patch per task); late tasks get a red
+    outline. Undated tasks are left out.
+    """
+    from matplotlib import dates as mdates
+    from matplotlib.collections import PolyCollection
+    from matplotlib.colors import to_rgba_array
+    from matplotlib.figure import Figure
+
+    dated = timeline[timeline['deadline'].notna()]
+    rows = np.arange(len(dated))
+    fig = Figure(figsize=(12, min(max(3.0, 0.3 * len(dated) + 1.5), 20.0)))
+    ax = fig.subplots()
+
+    starts = mdates.date2num(dated['deadline'].to_numpy())
+    # RGBA per row by indexing a small palette with the status codes, not one lookup per task
+    palette = to_rgba_array(list(STATUS_COLORS.values()) + [OTHER_COLOR])
+    codes = pd.Categorical(dated['status'].astype(object), categories=list(STATUS_COLORS)).codes
+    colors = palette[np.where(codes < 0, len(STATUS_COLORS), codes)]
+    event_date = pd.to_datetime(event_date, errors='coerce')
+    if pd.notna(event_date):
+        ends = starts + dated['lead_days'].to_numpy()
+        low, high = rows - 0.3, rows + 0.3
+        bars = np.stack([np.column_stack(corner) for corner in ((starts, low), (starts, high), (ends, high), (ends, low))], axis=1)
+        ax.add_collection(PolyCollection(bars, facecolors=colors, edgecolors='none', alpha=0.35))
+        ax.axvline(x=mdates.date2num(event_date), color='r', linestyle='--', label='Event Date')
+    ax.scatter(starts, rows, c=colors, s=40, zorder=3,
+               edgecolors=np.where(dated['late'].to_numpy()[:, None], to_rgba_array('red'), 0.0), linewidths=1.5)
+
+    if len(dated) <= MAX_LABELS: ax.set_yticks(rows, labels=dated['task_name'].astype(str).tolist())
+    else: ax.set_yticks([])
+    ax.set_ylim(len(dated) - 0.5, -0.5)  # earliest deadline on top
+    ax.xaxis_date()
+    ax.set_title('Event Timeline and Task Deadlines')
+    ax.set_xlabel('Date')
+    fig.autofmt_xdate()
+    if text_color:
+        # Drawn for a themed page: transparent background, text in the page's colour
+        fig.patch.set_alpha(0.0)
+        ax.patch.set_alpha(0.0)
+        ax.title.set_color(text_color)
+        ax.xaxis.label.set_color(text_color)
+        ax.tick_params(colors=text_color)
+    return fig
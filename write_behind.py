@@ -0,0 +1,223 @@
+import atexit
+import hashlib
+import itertools
+import os
+import threading
+import time
+import pandas as pd
+from journal import Journal
+from storage import apply_update_many, apply_delete, to_records
+
+
+def apply_op(df, op):
+    """(table after the queued op, rows affected); df is left untouched"""
+    if op["op"] == "append":
+        rows = op_frame(op)
+        return pd.concat([df, rows], ignore_index=True) if not df.empty else rows, len(rows)
+    df = df.copy()
+    if op["op"] == "update_many":
+        updates = op_frame(op)
+        # Typed sheets hold categoricals, which refuse values they have not seen yet
+        for column in updates.columns:
+            if column in df.columns and isinstance(df[column].dtype, pd.CategoricalDtype): df[column] = df[column].astype(object)
+        new_df, affected = apply_update_many(df, op["keys"], updates)
+    else:
+        new_df, affected = apply_delete(df, op["column"], op["values"])
+    return (new_df if new_df is not None else df), affected
+
+
+def append_op(table, df):
+    return {"table": table, "op": "append", "columns": list(df.columns), "rows": to_records(df)}
+
+
+def update_op(table, keys, updates):
+    return {"table": table, "op": "update_many", "keys": list(keys), "columns": list(updates.columns), "rows": to_records(updates)}
+
+
+def delete_op(table, column, values):
+    return {"table": table, "op": "delete", "column": column, "values": [int(v) for v in values]}
+
+
+def op_frame(op):
+    return pd.DataFrame(op["rows"], columns=op["columns"])
+
+
+def _signature(op):
+    """Ops with the same signature on one table can be sent as a single backend call"""
+    if op["op"] == "update_many": return ("update_many", tuple(op["keys"]), tuple(sorted(set(op["columns"]) - set(op["keys"]))))
+    if op["op"] == "delete": return ("delete", op["column"])
+    return ("append",)
+
+
+def coalesce(ops):
+    """Queued ops as batches [(table, [op, ...])]: each table's runs of like ops, in order.
+
+    Tables are independent, so one table's batches never wait behind another's.
+    """
+    runs = {}
+    for op in ops:
+        table_runs = runs.setdefault(op["table"], [])
+        if table_runs and _signature(table_runs[-1][-1]) == _signature(op): table_runs[-1].append(op)
+        else: table_runs.append([op])
+    return [(table, batch) for table, table_runs in runs.items() for batch in table_runs]
+
+
+class WriteBehindQueue:
+    """Sends writes to the backend in the background, in coalesced batches.
+
+    A submitted write is journaled and returns at once. A worker thread waits `delay`
+    seconds so a burst of edits piles up, then sends each table's run of like writes
+    as one backend call: ten RSVP changes become one update_many, five new guests one
+    append. Until then load() shows queued writes on top of what the store returns.
+    Whatever is still queued at exit is flushed; after a crash the journal is
+    replayed on the next start.
+    """
+
+    def __init__(self, backend, journal=None, delay=0.5, retry_delay=5.0):
+        self.backend = backend
+        self.journal = journal
+        self.delay = delay
+        self.retry_delay = retry_delay
+        self.last_error = None
+        self.last_flush = None
+        self._pending = []
+        self._seq = itertools.count(1)
+        self._lock = threading.RLock()     # the pending list and the journal
+        # Held by writers while they apply a write to their cached copy and queue it
+        self.edit_lock = threading.RLock()
+        self._io_lock = threading.RLock()  # a flush against a load + overlay
+        self._wake = threading.Event()
+        self._closed = False
+        if journal is not None: self._recover()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # ----- submitting -----
+    def submit(self, op):
+        """Journal and queue an op built by append_op / update_op / delete_op"""
+        with self._lock:
+            op = {"seq": next(self._seq), **op}
+            if self.journal is not None: self.journal.append(op)
+            self._pending.append(op)
+        self._wake.set()
+        return op
+
+    # ----- reading -----
+    def pending(self, table=None):
+        with self._lock:
+            return [op for op in self._pending if table is None or op["table"] == table]
+
+    def overlay(self, table, df):
+        """df with the queued writes for table applied"""
+        for op in self.pending(table):
+            df, _ = apply_op(df, op)
+        return df
+
+    def load(self, table):
+        """The stored table plus the writes still queued for it"""
+        with self._io_lock:
+            return self.overlay(table, self.backend.load(table))
+
+    def status(self):
+        return {"pending": len(self.pending()), "last_error": self.last_error, "last_flush": self.last_flush}
+
+    # ----- flushing -----
+    def flush(self):
+        """Send everything queued now; returns the number of backend calls made. Raises the first failure"""
+        with self._io_lock:
+            ops = self.pending()
+            if not ops: return 0
+            calls, failed, error = 0, set(), None
+            try:
+                for table, batch in coalesce(ops):
+                    if table in failed: continue
+                    try:
+                        self._send(table, batch)
+                    except Exception as e:
+                        # Later writes to this table wait behind the failed one; other tables go ahead
+                        failed.add(table)
+                        error = error or e
+                        continue
+                    calls += 1
+                    done = {op["seq"] for op in batch}
+                    with self._lock:
+                        self._pending = [op for op in self._pending if op["seq"] not in done]
+            finally:
+                if self.journal is not None:
+                    with self._lock:
+                        self.journal.rewrite(self._pending)
+            self.last_flush = time.time()
+            if error is not None: raise error
+            return calls
+
+    def _send(self, table, batch):
+        kind = batch[0]["op"]
+        if kind == "append":
+            self.backend.append(table, pd.concat([op_frame(op) for op in batch], ignore_index=True))
+        elif kind == "update_many":
+            self.backend.update_many(table, batch[0]["keys"], pd.concat([op_frame(op) for op in batch], ignore_index=True))
+        else:
+            values = sorted({v for op in batch for v in op["values"]})
+            self.backend.delete(table, batch[0]["column"], values)
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            if self._closed: return
+            time.sleep(self.delay)
+            self._wake.clear()
+            try:
+                self.flush()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                time.sleep(self.retry_delay)
+                self._wake.set()
+
+    def close(self):
+        """Stop the worker and flush what is left; anything that still fails stays in the journal"""
+        if self._closed: return
+        self._closed = True
+        self._wake.set()
+        try:
+            self.flush()
+        except Exception as e:
+            self.last_error = str(e)
+
+    def _recover(self):
+        """Queue the journaled writes of a previous run that never reached the store"""
+        ops = self.journal.records()
+        if not ops: return
+        # A crash between a flush and its journal rewrite leaves appends that were already
+        # stored; rows carry their ids, so drop the ones the table already has
+        stored_ids = {}
+        for op in ops:
+            if op["op"] != "append" or "id" not in op["columns"]: continue
+            if op["table"] not in stored_ids:
+                try:
+                    df = self.backend.load(op["table"])
+                    stored_ids[op["table"]] = set(pd.to_numeric(df["id"], errors="coerce").dropna().astype(int)) if "id" in df.columns else set()
+                except Exception:
+                    stored_ids[op["table"]] = set()
+            position = op["columns"].index("id")
+            op["rows"] = [row for row in op["rows"] if row[position] is None or int(row[position]) not in stored_ids[op["table"]]]
+        self._pending = [op for op in ops if op["op"] != "append" or op["rows"]]
+        self._seq = itertools.count(max(op["seq"] for op in ops) + 1)
+        self.journal.rewrite(self._pending)
+        if self._pending: self._wake.set()
+
+
+_queues = {}
+_queues_guard = threading.Lock()
+
+
+def queue_for(backend, folder, delay=0.5):
+    """The process-wide queue for the store behind backend, journaled in folder"""
+    with _queues_guard:
+        queue = _queues.get(backend.name)
+        if queue is None:
+            digest = hashlib.sha1(backend.name.encode()).hexdigest()[:12]
+            queue = WriteBehindQueue(backend, Journal(os.path.join(folder, f"write-behind-{digest}.jsonl")), delay)
+            _queues[backend.name] = queue
+        return queue